@@ -54,6 +54,39 @@ exports.saveChatHistory = async (req, res, next) => {
   }
 };
 
+// Append-only variant of saveChatHistory: FastAPI sends only the messages
+// added since its last successful save, they are pushed onto chatHistory
+// and the array is capped to the newest CHAT_HISTORY_LIMIT entries.
+exports.appendChatHistory = async (req, res, next) => {
+  try {
+    const history_array = req.body.history;
+    if (!Array.isArray(history_array) || history_array.length === 0) {
+      return next(new AppError("Invalid chat history data", 400));
+    }
+    const newMessages = history_array.map(({ role, content }) => ({
+      role,
+      content,
+    }));
+    const limit = parseInt(process.env.CHAT_HISTORY_LIMIT, 10) || 50;
+
+    const result = await User.updateOne(
+      { _id: req.user.id },
+      { $push: { chatHistory: { $each: newMessages, $slice: -limit } } },
+      { runValidators: true }
+    );
+    if (result.matchedCount === 0) {
+      return next(new AppError("No User found", 404));
+    }
+
+    res.status(200).json({
+      status: "success",
+      data: `Appended ${newMessages.length} messages to chat history`,
+    });
+  } catch (err) {
+    next(err);
+  }
+};
+
 exports.setUserOAuthInfo = async (req, res, next) => {
   try {
     const {
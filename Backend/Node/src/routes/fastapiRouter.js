@@ -7,5 +7,6 @@ router.get('/getUserAuthDetails', protect, restrictTo('user','admin'), fastapiCo
 router.get('/getHistory', protect, restrictTo('user','admin'), fastapiController.getHistory);
 router.get('/getemail', protect, restrictTo('user','admin'), fastapiController.getemail);
 router.post('/save-chat-history', protect, restrictTo('user','admin'), fastapiController.saveChatHistory);
+router.post('/append-chat-history', protect, restrictTo('user','admin'), fastapiController.appendChatHistory);
 router.post('/setUserOAuthInfo', protect, restrictTo('user','admin'), fastapiController.setUserOAuthInfo);
 module.exports = router;
\ No newline at end of file
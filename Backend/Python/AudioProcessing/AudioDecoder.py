@@ -0,0 +1,158 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+AUDIO_DECODE_TIMEOUT = float(os.getenv("AUDIO_DECODE_TIMEOUT", "30"))  # seconds
+SAMPLE_RATE = 16000  # what Whisper expects
+STDIN_CHUNK = 64 * 1024  # bytes of an upload file handed to ffmpeg per write
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+def ffmpeg_command(source="pipe:0", sample_rate=SAMPLE_RATE):
+    # any container/codec ffmpeg knows → raw 32-bit float, mono, 16 kHz on stdout
+    return [
+        FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", source,
+        "-f", "f32le", "-acodec", "pcm_f32le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+
+
+def write_temp(data):
+    # delete=False: on Windows ffmpeg cannot open a file we still hold open
+    with tempfile.NamedTemporaryFile(suffix=".audio", delete=False) as f:
+        if isinstance(data, (bytes, bytearray)):
+            f.write(data)
+        else:
+            data.seek(0)  # file object: copied in chunks, never read whole
+            shutil.copyfileobj(data, f, STDIN_CHUNK)
+    return f.name
+
+
+def to_array(pcm: bytes):
+    if not pcm:
+        raise AudioDecodeError("no audio samples decoded")
+    return np.frombuffer(pcm, dtype=np.float32)
+
+
+# -------------------------------------------------------
+# 🔵 IN-MEMORY AUDIO DECODE
+# -------------------------------------------------------
+# Upload bytes → ffmpeg stdin → f32le 16 kHz mono on stdout →
+# NumPy array for the Whisper pipeline. Nothing touches disk
+# for streamable containers (webm/ogg/wav/mp3 — what browsers
+# record). Containers that need seeking (mp4/m4a with the moov
+# atom at the end) cannot be read from a pipe; for those the
+# bytes go to a uniquely named temp file and ffmpeg reads
+# that instead.
+# Blocking (subprocess.run): call it from a worker thread in
+# async handlers, which also works with the Windows selector loop.
+# -------------------------------------------------------
+def decode_audio(data: bytes, sample_rate=SAMPLE_RATE):
+    try:
+        result = subprocess.run(ffmpeg_command("pipe:0", sample_rate), input=data, capture_output=True, timeout=AUDIO_DECODE_TIMEOUT)
+        if result.returncode == 0 and result.stdout:
+            return to_array(result.stdout)
+        error = result.stderr.decode(errors="ignore").strip()
+        path = write_temp(data)  # seekable fallback
+        try:
+            result = subprocess.run(ffmpeg_command(path, sample_rate), capture_output=True, timeout=AUDIO_DECODE_TIMEOUT)
+        finally:
+            os.remove(path)
+        if result.returncode != 0:
+            raise AudioDecodeError(result.stderr.decode(errors="ignore").strip() or error)
+        return to_array(result.stdout)
+    except subprocess.TimeoutExpired as e:
+        raise AudioDecodeError(f"ffmpeg timed out after {AUDIO_DECODE_TIMEOUT}s") from e
+
+
+def read_chunks(process, chunk_bytes):
+    while True:
+        pcm = process.stdout.read(chunk_bytes)
+        if not pcm:
+            return
+        yield np.frombuffer(pcm[:len(pcm) - len(pcm) % 4], dtype=np.float32)
+
+
+def finish(process, decoded):
+    if process.wait(timeout=AUDIO_DECODE_TIMEOUT) != 0 or not decoded:
+        raise AudioDecodeError(process.stderr.read().decode(errors="ignore").strip() or "no audio samples decoded")
+
+
+def close(process):
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+    for pipe in (process.stdin, process.stdout, process.stderr):
+        if pipe is not None:
+            pipe.close()
+
+
+def iter_decode_file(path, chunk_seconds=1.0, sample_rate=SAMPLE_RATE):
+    """Decode a file in chunk_seconds pieces (ffmpeg → pipe), so long recordings never sit in memory whole."""
+    process = subprocess.Popen(ffmpeg_command(path, sample_rate), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        decoded = False
+        for chunk in read_chunks(process, int(chunk_seconds * sample_rate) * 4):
+            decoded = True
+            yield chunk
+        finish(process, decoded)
+    finally:
+        close(process)
+
+
+def iter_decode_audio(data, chunk_seconds=1.0, sample_rate=SAMPLE_RATE):
+    """
+    Streaming twin of decode_audio: upload bytes or a binary file object
+    (e.g. UploadFile.file, fed in STDIN_CHUNK pieces) → ffmpeg stdin, f32le
+    pieces of chunk_seconds read back while ffmpeg is still decoding, so
+    neither the whole upload nor the whole waveform is held in memory.
+    Same temp file fallback for containers that need seeking.
+    """
+    process = subprocess.Popen(ffmpeg_command("pipe:0", sample_rate), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write():
+        # separate thread: writing all of stdin before reading stdout would deadlock on full pipes
+        try:
+            if isinstance(data, (bytes, bytearray)):
+                process.stdin.write(data)
+            else:
+                while True:
+                    block = data.read(STDIN_CHUNK)
+                    if not block:
+                        break
+                    process.stdin.write(block)
+            process.stdin.close()
+        except OSError:
+            pass  # ffmpeg gave up early (unreadable input), reported below
+
+    writer = threading.Thread(target=write, name="ffmpeg-stdin", daemon=True)
+    writer.start()
+    decoded = False
+    try:
+        for chunk in read_chunks(process, int(chunk_seconds * sample_rate) * 4):
+            decoded = True
+            yield chunk
+        try:
+            finish(process, decoded)
+            return
+        except AudioDecodeError:
+            if decoded:
+                raise  # failed halfway, a retry would repeat the audio already yielded
+    finally:
+        close(process)
+        writer.join()
+    path = write_temp(data)  # seekable fallback
+    try:
+        yield from iter_decode_file(path, chunk_seconds, sample_rate)
+    finally:
+        os.remove(path)
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from dotenv import load_dotenv
+
+load_dotenv()
+STT_BATCH_MAX_SIZE = int(os.getenv("STT_BATCH_MAX_SIZE", "8"))        # items per model call
+STT_BATCH_MAX_WAIT_MS = float(os.getenv("STT_BATCH_MAX_WAIT_MS", "50"))  # how long the first item waits for company
+
+
+# -------------------------------------------------------
+# 🔵 MICRO-BATCHING SCHEDULER
+# -------------------------------------------------------
+# submit(item, key) → concurrent.futures.Future. One worker
+# thread takes the oldest pending item, then waits up to
+# max_wait_ms for more items with the same key (e.g. the
+# Whisper language, which is batch-wide) until max_batch is
+# reached, and calls process(items, key) once for the whole
+# batch. Results (or the exception) go back through each
+# caller's Future. Items with another key stay queued for
+# the next batch, in arrival order.
+#
+# Tradeoff: a larger max_batch / max_wait_ms gives more
+# throughput under load, at the cost of up to max_wait_ms
+# extra latency when traffic is light.
+# -------------------------------------------------------
+class MicroBatcher:
+    def __init__(self, process, max_batch=STT_BATCH_MAX_SIZE, max_wait_ms=STT_BATCH_MAX_WAIT_MS, name="stt-batcher"):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []  # (key, item, future, enqueued_at)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.stats = {"items": 0, "batches": 0, "max_batch_seen": 0}
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item, key=None) -> Future:
+        future = Future()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("batcher stopped")
+            self._pending.append((key, item, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _take_batch(self):
+        """Wait for the next batch; returns (key, [(item, future)]) or (None, None) once stopped."""
+        with self._cond:
+            while not self._pending:
+                if self._stopped:
+                    return None, None
+                self._cond.wait()
+            key, _, _, first_at = self._pending[0]
+            deadline = first_at + self.max_wait
+            while True:
+                same = sum(1 for entry in self._pending if entry[0] == key)
+                remaining = deadline - time.monotonic()
+                if same >= self.max_batch or remaining <= 0 or self._stopped:
+                    break
+                self._cond.wait(remaining)
+            batch, rest = [], []
+            for entry in self._pending:
+                if entry[0] == key and len(batch) < self.max_batch:
+                    batch.append((entry[1], entry[2]))
+                else:
+                    rest.append(entry)
+            self._pending = rest
+            return key, batch
+
+    def _run(self):
+        while True:
+            key, batch = self._take_batch()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            self.stats["items"] += len(items)
+            self.stats["batches"] += 1
+            self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(items))
+            try:
+                results = list(self.process(items, key))
+                if len(results) != len(batch):
+                    # a short result list would leave callers blocked on .result() forever
+                    raise RuntimeError(f"process returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,103 @@
+import os
+import torch
+from dotenv import load_dotenv
+
+load_dotenv()
+STT_BACKEND = os.getenv("STT_BACKEND", "transformers")  # transformers | transformers-int8 | faster-whisper
+STT_MODEL = os.getenv("STT_MODEL")                      # e.g. openai/whisper-small, or "small" for faster-whisper
+STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", "0"))  # 0 = library default
+
+DEFAULT_MODELS = {
+    "transformers": "openai/whisper-large-v3-turbo",
+    "transformers-int8": "openai/whisper-large-v3-turbo",
+    "faster-whisper": "large-v3-turbo",
+}
+
+# Whisper language names accepted by generate_response → ISO codes (faster-whisper wants codes)
+LANGUAGE_CODES = {
+    "english": "en", "arabic": "ar", "german": "de", "french": "fr", "spanish": "es", "italian": "it",
+    "portuguese": "pt", "dutch": "nl", "russian": "ru", "turkish": "tr", "chinese": "zh", "japanese": "ja",
+    "korean": "ko", "hindi": "hi", "urdu": "ur", "persian": "fa",
+}
+
+
+# -------------------------------------------------------
+# 🔵 STT BACKENDS
+# -------------------------------------------------------
+# Every backend exposes transcribe_batch(samples, language)
+# → list of texts, samples being {"array", "sampling_rate"}
+# dicts at 16 kHz, so STTTool / MicroBatcher stay the same.
+# - transformers       : HF pipeline, fp16 on GPU / fp32 on CPU
+# - transformers-int8  : same model, Linear layers dynamically
+#                        quantized to int8 (CPU only)
+# - faster-whisper     : CTranslate2 engine, int8 on CPU,
+#                        float16 on GPU
+# STT_MODEL picks a smaller checkpoint for any of them.
+# -------------------------------------------------------
+class TransformersBackend:
+    def __init__(self, model_id, quantize=False):
+        from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+        device = "cuda:0" if torch.cuda.is_available() and not quantize else "cpu"
+        torch_dtype = torch.float16 if device != "cpu" else torch.float32
+        if STT_CPU_THREADS:
+            torch.set_num_threads(STT_CPU_THREADS)
+
+        self.device = device
+        self.torch_dtype = torch_dtype
+        self.processor = AutoProcessor.from_pretrained(model_id)
+        self.model = AutoModelForSpeechSeq2Seq.from_pretrained(
+            model_id, torch_dtype=torch_dtype, low_cpu_mem_usage=True, use_safetensors=True
+        ).to(device)
+        if quantize:
+            # int8 weights for every nn.Linear, activations quantized on the fly
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        self.pipe = pipeline(
+            "automatic-speech-recognition",
+            model=self.model,
+            tokenizer=self.processor.tokenizer,
+            feature_extractor=self.processor.feature_extractor,
+            torch_dtype=torch_dtype,
+            device=device,
+        )
+
+    def transcribe_batch(self, samples, language=None):
+        kwargs = {}
+        if language:
+            kwargs["generate_kwargs"] = {"language": language}
+        results = self.pipe(samples, batch_size=len(samples), **kwargs)
+        return [result["text"] for result in results]
+
+
+class FasterWhisperBackend:
+    def __init__(self, model_id):
+        from faster_whisper import WhisperModel
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = device
+        self.model = WhisperModel(
+            model_id,
+            device=device,
+            compute_type="float16" if device == "cuda" else "int8",
+            cpu_threads=STT_CPU_THREADS,
+        )
+
+    def transcribe_batch(self, samples, language=None):
+        code = LANGUAGE_CODES.get(language.lower(), language) if language else None
+        texts = []
+        for sample in samples:
+            if sample["sampling_rate"] != 16000:
+                # model.transcribe takes a bare array and assumes 16 kHz mono
+                raise ValueError(f"faster-whisper needs 16 kHz audio, got {sample['sampling_rate']} Hz")
+            segments, _ = self.model.transcribe(sample["array"], language=code, beam_size=1)
+            texts.append("".join(segment.text for segment in segments).strip())
+        return texts
+
+
+def make_backend(name=STT_BACKEND, model_id=STT_MODEL):
+    if name not in DEFAULT_MODELS:
+        raise ValueError(f"Unknown STT_BACKEND '{name}', expected one of {sorted(DEFAULT_MODELS)}")
+    model_id = model_id or DEFAULT_MODELS[name]
+    print(f"🔊 STT backend: {name} ({model_id})")
+    if name == "faster-whisper":
+        return FasterWhisperBackend(model_id)
+    return TransformersBackend(model_id, quantize=(name == "transformers-int8"))
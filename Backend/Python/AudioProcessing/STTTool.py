@@ -1,52 +1,100 @@
-import torch
-from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
 # from datasets import load_dataset
 import torchaudio
+import numpy as np
 import os
 from .TTSTool import TTSTool
 from .Temp_TTSTool import TTSWrapper
+import itertools
+from .AudioDecoder import SAMPLE_RATE, AudioDecodeError, iter_decode_file, iter_decode_audio
+from .BatchScheduler import MicroBatcher, STT_BATCH_MAX_SIZE
+from .STTBackends import STT_BACKEND, STT_MODEL, make_backend
+from .StreamingSTT import StreamingTranscriber, transcribe_chunked, STT_CHUNK_THRESHOLD_S
 
 
 class STTTool:
-    def __init__(self):
-        device = "cuda:0" if torch.cuda.is_available() else "cpu"
-        torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
-        model_id = "openai/whisper-large-v3-turbo"
-
-        self.device = device
-        self.torch_dtype = torch_dtype
-        self.processor = AutoProcessor.from_pretrained(model_id)
-        self.model = AutoModelForSpeechSeq2Seq.from_pretrained(
-            model_id, torch_dtype=torch_dtype, low_cpu_mem_usage=True, use_safetensors=True
-        ).to(device)
-
-        self.pipe = pipeline(
-            "automatic-speech-recognition",
-            model=self.model,
-            tokenizer=self.processor.tokenizer,
-            feature_extractor=self.processor.feature_extractor,
-            torch_dtype=torch_dtype,
-            device=device,
-        )
-    def generate_response(self,uploaded_file_path: str, language: str = None):
+    def __init__(self, backend: str = STT_BACKEND, model_id: str = STT_MODEL):
+        # STT_BACKEND / STT_MODEL select the engine (see STTBackends.py)
+        self.backend = make_backend(backend, model_id)
+        self.device = self.backend.device
+        self.pipe = getattr(self.backend, "pipe", None)  # transformers backends only
+        # concurrent requests are transcribed together (see BatchScheduler.py)
+        self.batcher = MicroBatcher(self.transcribe_batch) if STT_BATCH_MAX_SIZE > 1 else None
+
+    def transcribe_batch(self, samples, language=None):
+        """Transcribe a list of {"array", "sampling_rate"} samples in one backend call (padded batch)."""
+        return self.backend.transcribe_batch(samples, language)
+
+    def transcribe_one(self, array, language=None):
+        """Transcribe one 16 kHz float32 array (batched with other waiting requests of the same language)."""
+        sample = {"array": array, "sampling_rate": SAMPLE_RATE}
+        if self.batcher is not None:
+            return self.batcher.submit(sample, key=language).result()
+        return self.transcribe_batch([sample], language)[0]
+
+    def streaming_transcriber(self, language=None, partials=True):
+        """Incremental transcriber for live audio frames (see StreamingSTT.py)."""
+        return StreamingTranscriber(lambda array: self.transcribe_one(array, language), partials=partials)
+
+    def transcribe_long(self, chunks, language=None):
+        """
+        Chunked mode: chunks is an iterable of 16 kHz float32 arrays. Audio is
+        split on pauses into ≤ STT_STREAM_MAX_SEGMENT_S windows (overlapping
+        on forced cuts), so memory stays flat for any recording length.
+        """
+        return transcribe_chunked(lambda array: self.transcribe_one(array, language), chunks)
+
+    def transcribe_stream(self, chunks, language=None):
+        """
+        Decoded pieces of unknown total length: short inputs (≤ STT_CHUNK_THRESHOLD_S)
+        are transcribed in one call, longer ones continue in chunked mode without
+        ever holding more than the threshold in memory.
+        """
+        chunks = iter(chunks)
+        head, size = [], 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size > STT_CHUNK_THRESHOLD_S * SAMPLE_RATE:
+                return self.transcribe_long(itertools.chain(head, chunks), language)
+        if not head:
+            raise AudioDecodeError("no audio samples decoded")
+        return self.transcribe_one(np.concatenate(head), language)
+
+    def generate_response(self,uploaded_file_path, language: str = None):
+        """
+        uploaded_file_path: path of an audio file, an upload as bytes or as a
+        binary file object (decoded through the ffmpeg pipe as it is
+        transcribed), or an already decoded float32 NumPy array at 16 kHz
+        mono (see AudioDecoder).
+        Inputs longer than STT_CHUNK_THRESHOLD_S use the chunked mode.
+        """
         # print("in whisper: "+user_audio_path)
         try:
+            if isinstance(uploaded_file_path, bytes) or hasattr(uploaded_file_path, "read"):
+                return self.transcribe_stream(iter_decode_audio(uploaded_file_path), language)
+
+            if isinstance(uploaded_file_path, np.ndarray):
+                if len(uploaded_file_path) > STT_CHUNK_THRESHOLD_S * SAMPLE_RATE:
+                    step = SAMPLE_RATE  # 1 s views, no copies
+                    return self.transcribe_long((uploaded_file_path[i:i + step] for i in range(0, len(uploaded_file_path), step)), language)
+                return self.transcribe_one(uploaded_file_path, language)
+
+            info = torchaudio.info(uploaded_file_path)
+            if info.num_frames > STT_CHUNK_THRESHOLD_S * info.sample_rate:
+                # long voice note: decode and transcribe piece by piece
+                return self.transcribe_long(iter_decode_file(uploaded_file_path), language)
+
             waveform, sample_rate = torchaudio.load(uploaded_file_path)
-            
-            # Hugging Face expects a dictionary like this:
-            sample = {
-                "array": waveform.squeeze().numpy(),  # Convert to 1D NumPy array
-                "sampling_rate": sample_rate
-            }
-
-            # Set language detection if not provided
-            kwargs = {}
-            if language:
-                kwargs["generate_kwargs"] = {"language": language}
-
-            # Transcribe
-            result = self.pipe(sample, **kwargs)
-            return result["text"]
+            # every backend gets 16 kHz mono, whatever the file was (44.1 kHz stereo, ...)
+            waveform = waveform.mean(dim=0)
+            if sample_rate != SAMPLE_RATE:
+                waveform = torchaudio.functional.resample(waveform, sample_rate, SAMPLE_RATE)
+
+            # Transcribe (batched with other waiting requests of the same language)
+            return self.transcribe_one(waveform.numpy(), language)
+        except AudioDecodeError as e:
+            print(f"❌ Error decoding audio: {e}")
+            return "❌ Error decoding audio, please try again"
         except Exception as e:
             print(f"❌ Error transcribing audio: {e}")
             return "❌ Error transcribing audio, please try again"
@@ -0,0 +1,218 @@
+import math
+import os
+from collections import deque
+import numpy as np
+from dotenv import load_dotenv
+from .AudioDecoder import SAMPLE_RATE
+
+load_dotenv()
+STT_STREAM_SILENCE_MS = int(os.getenv("STT_STREAM_SILENCE_MS", "600"))        # pause that closes a segment
+STT_STREAM_MAX_SEGMENT_S = float(os.getenv("STT_STREAM_MAX_SEGMENT_S", "25"))  # < Whisper's 30 s window
+STT_STREAM_OVERLAP_S = float(os.getenv("STT_STREAM_OVERLAP_S", "1"))           # carried over on forced cuts
+STT_STREAM_PARTIAL_S = float(os.getenv("STT_STREAM_PARTIAL_S", "2"))           # new audio between partials
+STT_CHUNK_THRESHOLD_S = float(os.getenv("STT_CHUNK_THRESHOLD_S", "30"))        # longer inputs use chunked mode
+STT_VAD_WINDOW_S = float(os.getenv("STT_VAD_WINDOW_S", "10"))                  # noise floor look-back
+
+FRAME = SAMPLE_RATE * 30 // 1000  # 30 ms VAD frames
+
+
+# -------------------------------------------------------
+# 🔵 ENERGY VAD
+# -------------------------------------------------------
+# Per 30 ms frame RMS against a noise floor = the quietest
+# frame of the last STT_VAD_WINDOW_S (speech always has dips
+# between words, noise does not), so it works for both quiet
+# rooms and noisy phone recordings without tuning. The window
+# starts filled with min_rms: audio that opens with speech is
+# judged against a low floor, not against itself.
+# -------------------------------------------------------
+class EnergyVAD:
+    def __init__(self, ratio=3.0, min_rms=0.005, window_s=STT_VAD_WINDOW_S):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        window = max(1, int(window_s * 1000 / 30))
+        self.history = deque([min_rms] * window, maxlen=window)
+        self.seen = 0
+
+    @property
+    def calibrated(self):
+        # the seeded values have all been replaced by real frames
+        return self.seen >= self.history.maxlen
+
+    def is_speech(self, frame):
+        rms = float(np.sqrt(np.mean(frame * frame))) if len(frame) else 0.0
+        self.history.append(rms)
+        self.seen += 1
+        return rms > max(self.min_rms, min(self.history) * self.ratio)
+
+
+def merge_overlap(previous, text, max_words=8):
+    """Drop the words at the start of text that repeat the end of previous (overlapping windows)."""
+    prev_words, words = previous.split(), text.split()
+    for n in range(min(max_words, len(prev_words), len(words)), 0, -1):
+        if [w.strip(".,!?").lower() for w in prev_words[-n:]] == [w.strip(".,!?").lower() for w in words[:n]]:
+            return " ".join(words[n:])
+    return text
+
+
+# -------------------------------------------------------
+# 🔵 STREAMING TRANSCRIBER
+# -------------------------------------------------------
+# feed(samples) with 16 kHz mono float32 audio in any chunk
+# size; returns the events produced by that chunk:
+#   {"type": "partial", "text": ...}  current segment so far,
+#                                     every STT_STREAM_PARTIAL_S
+#   {"type": "final", "text": ...}    a segment closed by a
+#                                     pause or by the length cap
+# Only the open segment (≤ STT_STREAM_MAX_SEGMENT_S) is kept,
+# so memory stays flat however long the user talks. Forced
+# cuts happen at the quietest frame of the last seconds and
+# keep STT_STREAM_OVERLAP_S of audio, whose repeated words are
+# removed from the next final.
+# transcribe(array) is STTTool.transcribe_one (batched).
+# -------------------------------------------------------
+class StreamingTranscriber:
+    def __init__(self, transcribe, partials=True):
+        self.transcribe = transcribe
+        self.partials = partials
+        self.vad = EnergyVAD()
+        self.segment = []          # frames of the open segment
+        self.frame_speech = []     # VAD decision per frame
+        self.pending = np.zeros(0, dtype=np.float32)  # < 1 frame left over
+        self.silence_frames = 0
+        self.since_partial = 0
+        self.finals = []
+        self.overlapped = False    # open segment starts with audio of the previous final
+        self.max_frames = int(STT_STREAM_MAX_SEGMENT_S * 1000 / 30)
+        self.overlap_frames = int(STT_STREAM_OVERLAP_S * 1000 / 30)
+        self.silence_limit = max(1, STT_STREAM_SILENCE_MS // 30)
+        self.partial_frames = int(STT_STREAM_PARTIAL_S * 1000 / 30)
+
+    @property
+    def text(self):
+        return " ".join(t for t in self.finals if t)
+
+    def feed(self, samples):
+        events = []
+        samples = np.concatenate([self.pending, np.asarray(samples, dtype=np.float32)])
+        usable = len(samples) - len(samples) % FRAME
+        self.pending = samples[usable:]
+        for start in range(0, usable, FRAME):
+            frame = samples[start:start + FRAME]
+            speech = self.vad.is_speech(frame)
+            if not self.segment and not speech and self.vad.calibrated:
+                continue  # leading silence is dropped (kept until the noise floor is known)
+            self.segment.append(frame)
+            self.frame_speech.append(speech)
+            self.silence_frames = 0 if speech else self.silence_frames + 1
+            self.since_partial += 1
+            if self.silence_frames >= self.silence_limit:
+                events += self._close(len(self.segment))
+            elif len(self.segment) >= self.max_frames:
+                events += self._close(self._cut_point(), keep_overlap=True)
+            elif self.partials and self.since_partial >= self.partial_frames:
+                self.since_partial = 0
+                text = self._transcribe(self.segment)
+                if text:
+                    events.append({"type": "partial", "text": text})
+        return events
+
+    def flush(self):
+        """End of stream: close the open segment. Returns the remaining events."""
+        if self.segment and len(self.pending):
+            self.segment.append(self.pending)
+            self.frame_speech.append(False)
+        self.pending = np.zeros(0, dtype=np.float32)
+        return self._close(len(self.segment)) if any(self.frame_speech) else []
+
+    def _cut_point(self):
+        # quietest frame in the last third of the segment, so words are rarely split
+        start = len(self.segment) * 2 // 3
+        energies = [float(np.mean(f * f)) for f in self.segment[start:]]
+        return start + int(np.argmin(energies)) + 1
+
+    def _close(self, cut, keep_overlap=False):
+        frames, speech = self.segment[:cut], self.frame_speech[:cut]
+        keep_from = max(0, cut - self.overlap_frames) if keep_overlap else cut
+        self.segment, self.frame_speech = self.segment[keep_from:], self.frame_speech[keep_from:]
+        self.silence_frames = 0
+        self.since_partial = len(self.segment)
+        overlapped, self.overlapped = self.overlapped, keep_overlap
+        if sum(speech) < 3:
+            return []  # clicks / noise bursts make Whisper hallucinate
+        text = self._transcribe(frames)
+        if overlapped and self.finals:
+            text = merge_overlap(self.finals[-1], text)
+        self.finals.append(text)
+        return [{"type": "final", "text": text}] if text else []
+
+    def _transcribe(self, frames):
+        return self.transcribe(np.concatenate(frames)).strip()
+
+
+def transcribe_chunked(transcribe, chunks):
+    """Chunked mode for long recordings: feeds an iterable of sample arrays, returns the full text."""
+    transcriber = StreamingTranscriber(transcribe, partials=False)
+    for chunk in chunks:
+        transcriber.feed(chunk)
+    transcriber.flush()
+    return transcriber.text
+
+
+# -------------------------------------------------------
+# 🔵 STREAMING RESAMPLER
+# -------------------------------------------------------
+# Rational polyphase resampler (up by L, low-pass, down by M,
+# e.g. 48 kHz → 16 kHz is L=1, M=3; 44.1 kHz is 160/441).
+# The Kaiser-windowed sinc low-pass cuts below the lower
+# Nyquist frequency, so 44.1/48 kHz input does not alias, and
+# the input history and output position carry over between
+# calls: frames of any size join without discontinuities.
+# -------------------------------------------------------
+class PolyphaseResampler:
+    def __init__(self, from_rate, to_rate=SAMPLE_RATE, taps_per_phase=32, beta=8.0):
+        divisor = math.gcd(int(from_rate), int(to_rate))
+        self.up, self.down = int(to_rate) // divisor, int(from_rate) // divisor
+        self.taps = taps_per_phase
+        length = taps_per_phase * self.up
+        cutoff = 0.5 / max(self.up, self.down) * 0.9  # of the upsampled rate, with a transition band
+        t = np.arange(length) - (length - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, beta)
+        h *= self.up / h.sum()
+        # phase p uses h[p], h[p + L], ... against the newest input sample backwards
+        self.phases = h.reshape(taps_per_phase, self.up).T.astype(np.float32)
+        self.history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self.start = -(taps_per_phase - 1)  # absolute input index of history[0]
+        self.next_out = 0                   # absolute index of the next output sample
+
+    def __call__(self, samples):
+        buffer = np.concatenate([self.history, np.asarray(samples, dtype=np.float32)])
+        end = self.start + len(buffer)  # absolute index after the last input sample
+        # outputs whose newest input sample is available: floor(n * M / L) < end
+        last = -(-end * self.up // self.down)  # ceil(end * L / M)
+        n = np.arange(self.next_out, last)
+        base = n * self.down // self.up
+        window = base[:, None] - np.arange(self.taps)[None, :] - self.start
+        out = np.einsum("ij,ij->i", self.phases[n * self.down % self.up], buffer[window]) if len(n) else np.zeros(0, dtype=np.float32)
+        self.next_out = last
+        keep_from = last * self.down // self.up - self.taps + 1 - self.start
+        self.history = buffer[max(0, keep_from):]
+        self.start += max(0, keep_from)
+        return out.astype(np.float32)
+
+
+class PCMDecoder:
+    """Raw PCM frames from a client (mono s16le or f32le, any rate) → 16 kHz float32 for the transcriber."""
+
+    def __init__(self, encoding="s16le", sample_rate=SAMPLE_RATE):
+        self.dtype, self.scale = (np.float32, 1.0) if encoding == "f32le" else (np.int16, 1 / 32768.0)
+        self.width = np.dtype(self.dtype).itemsize
+        self.rest = b""  # partial sample split across frames
+        self.resample = PolyphaseResampler(sample_rate) if sample_rate != SAMPLE_RATE else None
+
+    def __call__(self, data: bytes):
+        data = self.rest + data
+        usable = len(data) - len(data) % self.width
+        self.rest = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype).astype(np.float32) * self.scale
+        return self.resample(samples) if self.resample else samples
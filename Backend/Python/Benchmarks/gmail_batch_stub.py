@@ -0,0 +1,113 @@
+# -------------------------------------------------------
+# 🔵 GMAIL BATCH FETCH vs LOCAL GMAIL API STUB
+# -------------------------------------------------------
+# Starts a stub of the Gmail endpoints fetch_unread_emails
+# uses (messages.list, messages.get, /batch/gmail/v1) with a
+# fixed latency per HTTP round-trip, then reads 50 unread
+# messages the old way (one GET per message) and through
+# batch_get_messages, and compares round-trips and time.
+# A share of the batch parts answer 429 to exercise the
+# parallel fallback.
+# Run from Backend/Python:
+#   python Benchmarks/gmail_batch_stub.py
+# -------------------------------------------------------
+import json
+import os
+import sys
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+STUB_PORT = 5098
+os.environ["GMAIL_API_BASE"] = f"http://127.0.0.1:{STUB_PORT}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import HttpClient
+from Tools.GmailBatch import batch_get_messages, message_url
+
+MESSAGES = 50
+LATENCY = 0.08          # seconds per round-trip
+THROTTLED_EVERY = 10    # every 10th batch part answers 429
+
+round_trips = {"list": 0, "get": 0, "batch": 0}
+lock = threading.Lock()
+
+
+def message(msg_id):
+    return {
+        "id": msg_id,
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [{"name": "From", "value": "a@example.com"}, {"name": "Subject", "value": f"mail {msg_id}"}],
+            "body": {"data": "aGVsbG8="},
+        },
+    }
+
+
+class GmailStub(BaseHTTPRequestHandler):
+    def _reply(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        path = urlsplit(self.path).path
+        if path.endswith("/messages"):
+            with lock:
+                round_trips["list"] += 1
+            self._reply(200, json.dumps({"messages": [{"id": f"m{i}"} for i in range(MESSAGES)]}).encode())
+        else:
+            with lock:
+                round_trips["get"] += 1
+            self._reply(200, json.dumps(message(path.rsplit("/", 1)[-1])).encode())
+
+    def do_POST(self):
+        time.sleep(LATENCY)
+        with lock:
+            round_trips["batch"] += 1
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        request = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+        boundary = "stub_response"
+        parts = []
+        for n, part in enumerate(request.iter_parts()):
+            inner = part.get_payload(decode=True).decode()
+            msg_id = urlsplit(inner.split()[1]).path.rsplit("/", 1)[-1]
+            content_id = part["Content-ID"].strip("<>")
+            if n % THROTTLED_EVERY == THROTTLED_EVERY - 1:
+                status, payload = "429 Too Many Requests", "{}"
+            else:
+                status, payload = "200 OK", json.dumps(message(msg_id))
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n{payload}\r\n"
+            )
+        self._reply(200, ("".join(parts) + f"--{boundary}--\r\n").encode(), f"multipart/mixed; boundary={boundary}")
+
+    def log_message(self, *args):
+        pass
+
+
+def sequential(ids):
+    headers = {"Authorization": "Bearer stub"}
+    return [HttpClient.get(message_url(msg_id), headers=headers).json() for msg_id in ids]
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", STUB_PORT), GmailStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ids = [m["id"] for m in HttpClient.get(message_url(), params={"q": "is:unread"}).json()["messages"]]
+
+    for name, fetch in (("sequential GETs", sequential), ("batch + fallback", lambda ids: batch_get_messages("stub", ids))):
+        for key in round_trips:
+            round_trips[key] = 0
+        start = time.perf_counter()
+        messages = fetch(ids)
+        elapsed = time.perf_counter() - start
+        in_order = [m["id"] for m in messages] == ids
+        print(f"{name:17s}: {len(messages)} messages, in order {in_order}, {elapsed * 1e3:7.0f} ms, round-trips {dict(round_trips)}")
+    server.shutdown()
@@ -0,0 +1,127 @@
+# -------------------------------------------------------
+# 🔵 EMAIL BODY EXTRACTION BENCHMARK
+# -------------------------------------------------------
+# Per-email parse time and output size of the bounded
+# extractor (Tools/MailText.py) vs the old full decode +
+# BeautifulSoup path (if bs4 is installed).
+# Corpus: every *.eml file in the given directory (real
+# exported mails), or generated fixtures that mimic the
+# usual inbox mix: plain mails, multipart/alternative, and
+# large newsletters (inline CSS, tracking, nested tables).
+# Run from Backend/Python:
+#   python Benchmarks/mail_text_bench.py [path/to/eml_dir]
+# -------------------------------------------------------
+import base64
+import glob
+import os
+import random
+import sys
+import time
+from email import policy
+from email.parser import BytesParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Tools.MailText import MAIL_BODY_CHARS, body_text
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+
+def b64(text):
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+def gmail_payload(message):
+    """email.message.EmailMessage → Gmail API style payload (mimeType / body.data / parts)."""
+    payload = {"mimeType": message.get_content_type(), "headers": [{"name": k, "value": str(v)} for k, v in message.items()]}
+    if message.is_multipart():
+        payload["parts"] = [gmail_payload(part) for part in message.iter_parts()]
+        payload["body"] = {}
+    else:
+        data = message.get_payload(decode=True) or b""
+        payload["body"] = {"data": base64.urlsafe_b64encode(data).decode()}
+    return payload
+
+
+def newsletter(rows):
+    css = "".join(f".c{i}{{color:#{i:06x};padding:{i % 9}px}}" for i in range(400))
+    items = "".join(
+        f"<tr><td class='c{i % 400}'><table><tr><td><a href='https://t.example.com/{i}?utm=x'><img src='p{i}.png'></a></td>"
+        f"<td><h3>Story {i}: {'lorem ipsum ' * 5}</h3><p>{'Dolor sit amet &amp; more. ' * 12}</p></td></tr></table></td></tr>"
+        for i in range(rows)
+    )
+    return (f"<html><head><title>News</title><style>{css}</style><script>var t={list(range(200))};</script></head>"
+            f"<body><center><table>{items}</table></center><img src='https://t.example.com/open.gif'></body></html>")
+
+
+def generated_corpus(count=60):
+    random.seed(1)
+    corpus = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            text = "Hi,\n\n" + "Just checking in about the meeting tomorrow. " * random.randint(2, 40) + "\n\nThanks"
+            corpus.append(("plain", {"mimeType": "text/plain", "body": {"data": b64(text)}}))
+        elif kind == 1:
+            text = "Your order has shipped. " * random.randint(5, 30)
+            html = f"<html><body><p>{text}</p></body></html>"
+            corpus.append(("alternative", {"mimeType": "multipart/alternative", "body": {}, "parts": [
+                {"mimeType": "text/plain", "body": {"data": b64(text)}},
+                {"mimeType": "text/html", "body": {"data": b64(html)}},
+            ]}))
+        else:
+            corpus.append(("newsletter", {"mimeType": "multipart/mixed", "body": {}, "parts": [
+                {"mimeType": "text/html", "body": {"data": b64(newsletter(random.randint(50, 600)))}},
+            ]}))
+    return corpus
+
+
+def eml_corpus(directory):
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.eml"))):
+        with open(path, "rb") as f:
+            corpus.append((os.path.basename(path), gmail_payload(BytesParser(policy=policy.default).parse(f))))
+    return corpus
+
+
+def old_extract(payload):
+    # previous implementation: first part with data, full decode, BeautifulSoup on all of it
+    if "parts" in payload:
+        for part in payload["parts"]:
+            result = old_extract(part)
+            if result:
+                return result
+    data = payload.get("body", {}).get("data", "")
+    if not data:
+        return ""
+    decoded = base64.urlsafe_b64decode(data).decode(errors="ignore")
+    if payload.get("mimeType") == "text/plain":
+        return decoded
+    if payload.get("mimeType") == "text/html":
+        return BeautifulSoup(decoded, "html.parser").get_text(separator="\n")
+    return ""
+
+
+def measure(name, extract, corpus):
+    times, sizes = [], []
+    for _, payload in corpus:
+        start = time.perf_counter()
+        text = extract(payload)
+        times.append(time.perf_counter() - start)
+        sizes.append(len(text))
+    times.sort()
+    print(f"{name:9s}: mean {sum(times) / len(times) * 1e3:7.2f} ms, p95 {times[int(len(times) * 0.95)] * 1e3:7.2f} ms, "
+          f"max {times[-1] * 1e3:7.2f} ms | output mean {sum(sizes) / len(sizes):8.0f} chars, max {max(sizes)} chars")
+
+
+if __name__ == "__main__":
+    corpus = eml_corpus(sys.argv[1]) if len(sys.argv) > 1 else generated_corpus()
+    raw = sum(len(p.get("body", {}).get("data", "")) + sum(len(q.get("body", {}).get("data", "")) for q in p.get("parts", [])) for _, p in corpus)
+    print(f"{len(corpus)} emails, {raw / 1e6:.1f} MB base64, budget {MAIL_BODY_CHARS} chars/email")
+    measure("bounded", lambda payload: body_text(payload)[0], corpus)
+    if BeautifulSoup is not None:
+        measure("bs4 (old)", old_extract, corpus)
+    else:
+        print("bs4 not installed, skipping the old path")
@@ -0,0 +1,91 @@
+# -------------------------------------------------------
+# 🔵 WRITE-BEHIND QUEUE vs LOCAL NODE STUB
+# -------------------------------------------------------
+# Starts a stub of POST /api/v1/fastapi/append-chat-history
+# that is slow and fails a share of the requests, evicts a
+# batch of sessions through the queue and checks that:
+# - enqueue (eviction) cost does not depend on the backend
+# - every message is delivered once, in order, per user
+# - permanent failures end up in the dead-letter file
+# Run from Backend/Python:
+#   python Benchmarks/persistence_queue_stub.py
+# -------------------------------------------------------
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_PORT = 5099
+os.environ["HISTORY_APPEND_URL"] = f"http://127.0.0.1:{STUB_PORT}/api/v1/fastapi/append-chat-history"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PersistenceQueue import WriteBehindQueue
+
+SESSIONS = 200
+MESSAGES_PER_SESSION = 6
+FAILURE_RATE = 0.3
+LATENCY = 0.05
+
+stored = defaultdict(list)
+stored_lock = threading.Lock()
+
+
+class NodeStub(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        Token = self.headers["Authorization"]
+        time.sleep(LATENCY)
+        if Token.endswith("expired"):
+            status = 401
+        elif random.random() < FAILURE_RATE:
+            status = 503
+        else:
+            with stored_lock:
+                stored[Token].extend(body["history"])
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", STUB_PORT), NodeStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    dead_letter = os.path.join(tempfile.mkdtemp(), "dead_letter.jsonl")
+    queue = WriteBehindQueue(base_backoff=0.05, max_backoff=0.5, dead_letter_path=dead_letter)
+
+    expected = {}
+    start = time.perf_counter()
+    for i in range(SESSIONS):
+        Token = f"Bearer user-{i}" + ("-expired" if i % 50 == 0 else "")
+        messages = [{"role": "user" if j % 2 == 0 else "model", "content": f"{i}:{j}"} for j in range(MESSAGES_PER_SESSION)]
+        # two evictions per user: checkpoint + final sweep
+        queue.enqueue(Token, messages[:3])
+        queue.enqueue(Token, messages[3:])
+        expected[Token] = messages
+    enqueue_time = time.perf_counter() - start
+
+    delivered = queue.flush(timeout=60)
+    total_time = time.perf_counter() - start
+    server.shutdown()
+
+    ok = [t for t in expected if not t.endswith("expired")]
+    in_order = all(stored[t] == expected[t] for t in ok)
+    with open(dead_letter, encoding="utf-8") as f:
+        spilled = [json.loads(line) for line in f]
+
+    print(f"enqueue {2 * SESSIONS} batches : {enqueue_time * 1e3:.2f} ms ({enqueue_time / (2 * SESSIONS) * 1e6:.1f} µs each)")
+    print(f"drained                : {delivered} in {total_time:.2f} s")
+    print(f"delivered in order     : {in_order} ({len(ok)} users)")
+    print(f"dead-lettered users    : {len(spilled)} (expected {SESSIONS - len(ok)})")
+    print(f"queue stats            : {queue.stats}")
+    sys.exit(0 if delivered and in_order and len(spilled) == SESSIONS - len(ok) else 1)
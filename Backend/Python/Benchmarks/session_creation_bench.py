@@ -0,0 +1,52 @@
+# -------------------------------------------------------
+# 🔵 SESSION CREATION THROUGHPUT
+# -------------------------------------------------------
+# Compares creating a chat session the old way (a new
+# genai.Client + rebuilt tool declarations / config per
+# Model, and a new WeatherTool client per weather question)
+# with the shared client and prebuilt TOOLS / TOOL_CONFIG.
+# No network calls: genai.Client construction is local.
+# Run from Backend/Python:
+#   python Benchmarks/session_creation_bench.py
+# -------------------------------------------------------
+import os
+import sys
+import time
+
+os.environ.setdefault("LLM_API_KEY", "benchmark-key")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from google import genai
+import Model as model_module
+from Model import Model, build_tool_config
+
+SESSIONS = 2000
+
+
+def old_session():
+    instance = Model()
+    # what Model.__init__ and tool_call used to do per session
+    instance.__dict__["client"] = genai.Client(api_key=os.environ["LLM_API_KEY"])
+    instance.tools, instance.config = build_tool_config()
+    genai.Client(api_key=os.environ["LLM_API_KEY"])  # WeatherTool() on the first weather question
+    return instance
+
+
+def new_session():
+    instance = Model()
+    instance.LLMmodel  # shared client, created once
+    model_module.weather_tool.LLMmodel
+    return instance
+
+
+def bench(factory, n):
+    factory()  # warm-up
+    start = time.perf_counter()
+    sessions = [factory() for _ in range(n)]
+    elapsed = time.perf_counter() - start
+    return elapsed, len(sessions)
+
+
+if __name__ == "__main__":
+    for name, factory, n in (("per-session clients", old_session, SESSIONS // 10), ("shared client", new_session, SESSIONS)):
+        elapsed, count = bench(factory, n)
+        print(f"{name:20s}: {count / elapsed:10.0f} sessions/s ({elapsed / count * 1e6:8.1f} µs each)")
@@ -0,0 +1,74 @@
+# -------------------------------------------------------
+# 🔵 SESSION STORE MICRO-BENCHMARK
+# -------------------------------------------------------
+# Compares the old list-based registry (linear lookup +
+# list.remove sweep) against SessionStore at 10k / 100k
+# sessions. Run from Backend/Python:
+#   python Benchmarks/session_store_bench.py
+# -------------------------------------------------------
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SessionStore import SessionStore
+
+LOOKUPS = 2000
+TIMEOUT = timedelta(minutes=1)
+
+
+def build(n, expired_ratio=0.01):
+    now = datetime.now()
+    n_expired = int(n * expired_ratio)
+    tokens = [f"Bearer token-{i}" for i in range(n)]
+    # oldest first, the first n_expired are past the timeout
+    stamps = [now - timedelta(minutes=5) if i < n_expired else now for i in range(n)]
+    return tokens, stamps
+
+
+def bench_list(tokens, stamps):
+    sessions = [{"Token": t, "instance": None, "last_active": s} for t, s in zip(tokens, stamps)]
+    sample = random.sample(tokens, LOOKUPS)
+
+    start = time.perf_counter()
+    for Token in sample:
+        next((u for u in sessions if u["Token"] == Token), None)
+    lookup = (time.perf_counter() - start) / LOOKUPS
+
+    start = time.perf_counter()
+    now = datetime.now()
+    to_remove = [s for s in sessions if now - s["last_active"] > TIMEOUT]
+    for s in to_remove:
+        sessions.remove(s)
+    sweep = time.perf_counter() - start
+    return lookup, sweep
+
+
+def bench_store(tokens, stamps):
+    store = SessionStore()
+    for t, s in zip(tokens, stamps):
+        store.add(t, None, now=s)
+    sample = random.sample(tokens[len(tokens) // 100:], LOOKUPS)  # keep the expired head intact
+
+    start = time.perf_counter()
+    for Token in sample:
+        store.get(Token)
+    lookup = (time.perf_counter() - start) / LOOKUPS
+
+    start = time.perf_counter()
+    for s in store.expired(TIMEOUT):
+        store.remove(s["Token"])
+    sweep = time.perf_counter() - start
+    return lookup, sweep
+
+
+if __name__ == "__main__":
+    for n in (10_000, 100_000):
+        tokens, stamps = build(n)
+        list_lookup, list_sweep = bench_list(tokens, stamps)
+        store_lookup, store_sweep = bench_store(tokens, stamps)
+        print(f"--- {n} sessions (1% expired) ---")
+        print(f"list  : lookup {list_lookup * 1e6:10.2f} µs | sweep {list_sweep * 1e3:10.2f} ms")
+        print(f"store : lookup {store_lookup * 1e6:10.2f} µs | sweep {store_sweep * 1e3:10.2f} ms")
@@ -0,0 +1,124 @@
+# -------------------------------------------------------
+# 🔵 STT BACKENDS: WER + REAL-TIME FACTOR
+# -------------------------------------------------------
+# Transcribes the WAVs in TempAudioFils with each backend
+# (every backend in its own subprocess, so load time and
+# peak memory are measured separately) and reports:
+# - WER against TempAudioFils/references.json
+#   ({"temp_audioA.wav": "expected text", ...}); without that
+#   file the first backend's output is the reference, i.e.
+#   WER is relative to the current fp32 model
+# - RTF = transcription time / audio duration (< 1 = faster
+#   than real time), load time and peak RSS
+# Clips go through STTTool.generate_response(path, language)
+# like in production; a 44.1 kHz stereo copy of the first clip
+# must give the same text as the original ("44k stereo" WER).
+# Run from Backend/Python:
+#   python Benchmarks/stt_backend_bench.py [backend[:model] ...]
+#   e.g. transformers transformers-int8 faster-whisper faster-whisper:small transformers:openai/whisper-small
+# -------------------------------------------------------
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDIO_DIR = os.path.join(ROOT, "TempAudioFils")
+DEFAULT_RUNS = ["transformers", "transformers-int8", "faster-whisper", "faster-whisper:small"]
+# temp_audio<X>.wav → language of the sample
+LANGUAGES = {"A": "arabic", "E": "english", "G": "german"}
+
+
+def normalize(text):
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+
+def wer(reference, hypothesis):
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+
+def stereo_44k_copy(path, directory):
+    import torch
+    import torchaudio
+    waveform, sample_rate = torchaudio.load(path)
+    waveform = torchaudio.functional.resample(waveform.mean(dim=0), sample_rate, 44100)
+    copy = os.path.join(directory, os.path.basename(path).replace(".wav", "_44k_stereo.wav"))
+    torchaudio.save(copy, torch.stack([waveform, waveform]), 44100)
+    return copy
+
+
+def worker(spec):
+    """Runs inside the subprocess: load one backend, transcribe every clip, print JSON."""
+    import tempfile
+    os.environ["STT_BATCH_MAX_SIZE"] = "1"  # no micro-batching wait in the timings
+    sys.path.insert(0, ROOT)
+    import torchaudio
+    from AudioProcessing.STTTool import STTTool
+    name, _, model_id = spec.partition(":")
+    start = time.perf_counter()
+    tool = STTTool(name, model_id or None)
+    load_time = time.perf_counter() - start
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = sorted(glob.glob(os.path.join(AUDIO_DIR, "*.wav")))
+        paths += [stereo_44k_copy(paths[0], directory)] if paths else []
+        for path in paths:
+            clip = os.path.basename(path)
+            language = LANGUAGES.get(os.path.splitext(clip)[0].replace("_44k_stereo", "")[-1])
+            info = torchaudio.info(path)
+            tool.generate_response(path, language)  # warm-up
+            start = time.perf_counter()
+            text = tool.generate_response(path, language)
+            results[clip] = {
+                "text": text,
+                "seconds": time.perf_counter() - start,
+                "duration": info.num_frames / info.sample_rate,
+            }
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else 0  # KiB on Linux
+    print(json.dumps({"load_time": load_time, "peak_rss_mb": peak_rss_mb, "clips": results}))
+
+
+def main(specs):
+    references = None
+    ref_path = os.path.join(AUDIO_DIR, "references.json")
+    if os.path.exists(ref_path):
+        with open(ref_path, encoding="utf-8") as f:
+            references = json.load(f)
+    print(f"WER reference: {'references.json' if references else specs[0] + ' output (relative WER)'}")
+    for spec in specs:
+        run = subprocess.run([sys.executable, __file__, "--worker", spec], capture_output=True, text=True)
+        if run.returncode != 0:
+            print(f"{spec:35s}: failed ({run.stderr.strip().splitlines()[-1] if run.stderr.strip() else run.returncode})")
+            continue
+        report = json.loads(run.stdout.strip().splitlines()[-1])
+        clips = report["clips"]
+        if references is None:
+            references = {name: clip["text"] for name, clip in clips.items()}
+        errors = [wer(references[name], clip["text"]) for name, clip in clips.items() if name in references]
+        rtf = sum(c["seconds"] for c in clips.values()) / sum(c["duration"] for c in clips.values())
+        copies = [wer(clips[name.replace("_44k_stereo", "")]["text"], clip["text"]) for name, clip in clips.items() if "_44k_stereo" in name]
+        print(f"{spec:35s}: WER {sum(errors) / len(errors):6.1%} | RTF {rtf:5.2f} | "
+              f"load {report['load_time']:5.1f} s | peak RSS {report['peak_rss_mb']:7.0f} MB | "
+              f"44k stereo WER {sum(copies) / len(copies) if copies else 0:6.1%}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--worker":
+        worker(sys.argv[2])
+    else:
+        main(sys.argv[1:] or DEFAULT_RUNS)
@@ -0,0 +1,81 @@
+# -------------------------------------------------------
+# 🔵 STT MICRO-BATCHING: THROUGHPUT vs LATENCY
+# -------------------------------------------------------
+# CLIENTS concurrent callers each transcribe REQUESTS clips
+# through MicroBatcher, for a grid of max batch sizes and
+# max waits; prints throughput and p50 / p95 latency per
+# setting. Batch size 1 is the old one-by-one behaviour.
+# Default model: the real Whisper pipeline (STTTool) on the
+# clips in TempAudioFils. --synthetic replaces it with a cost
+# model (fixed per-call overhead + per-item cost) to check the
+# scheduler itself without torch.
+# Run from Backend/Python:
+#   python Benchmarks/stt_batch_bench.py [--synthetic]
+# -------------------------------------------------------
+import glob
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from AudioProcessing.BatchScheduler import MicroBatcher
+
+CLIENTS = 8
+REQUESTS = 4
+GRID = [(1, 0), (4, 20), (8, 50), (8, 150), (16, 100)]  # (max_batch, max_wait_ms)
+
+
+def synthetic_model():
+    # per call: 300 ms overhead (encoder launch, decoding loop) + 40 ms per clip
+    def process(items, key):
+        time.sleep(0.3 + 0.04 * len(items))
+        return [f"text {item}" for item in items]
+    return process, list(range(CLIENTS * REQUESTS))
+
+
+def whisper_model():
+    import torchaudio
+    from AudioProcessing.STTTool import STTTool
+    stt = STTTool()
+    if stt.batcher is not None:
+        stt.batcher.stop()
+    clips = []
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TempAudioFils", "*.wav"))):
+        waveform, sample_rate = torchaudio.load(path)
+        waveform = torchaudio.functional.resample(waveform.mean(dim=0), sample_rate, 16000)
+        clips.append({"array": waveform.numpy(), "sampling_rate": 16000})
+    return (lambda items, key: stt.transcribe_batch([dict(item) for item in items], key)), clips
+
+
+def run(process, clips, max_batch, max_wait_ms):
+    batcher = MicroBatcher(process, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    latencies = []
+    lock = threading.Lock()
+
+    def client(i):
+        for r in range(REQUESTS):
+            start = time.perf_counter()
+            batcher.submit(clips[(i * REQUESTS + r) % len(clips)]).result()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CLIENTS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    batcher.stop()
+    latencies.sort()
+    print(f"batch ≤{max_batch:2d}, wait {max_wait_ms:3.0f} ms: {len(latencies) / elapsed:6.2f} clips/s | "
+          f"p50 {latencies[len(latencies) // 2] * 1e3:6.0f} ms, p95 {latencies[int(len(latencies) * 0.95)] * 1e3:6.0f} ms | "
+          f"{batcher.stats['batches']} model calls")
+
+
+if __name__ == "__main__":
+    process, clips = synthetic_model() if "--synthetic" in sys.argv else whisper_model()
+    print(f"{CLIENTS} concurrent clients × {REQUESTS} requests")
+    for max_batch, max_wait_ms in GRID:
+        run(process, clips, max_batch, max_wait_ms)
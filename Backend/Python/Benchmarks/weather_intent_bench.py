@@ -0,0 +1,126 @@
+# -------------------------------------------------------
+# 🔵 WEATHER INTENT: LOCAL EXTRACTOR vs GEMINI
+# -------------------------------------------------------
+# Runs the labeled prompts below through the local extractor
+# (Tools/WeatherIntent.py) and reports coverage (share that
+# needs no LLM call), accuracy on the prompts it decided and
+# latency. With --llm it also runs the WeatherRequestSchema
+# Gemini call on every prompt (needs LLM_API_KEY) to compare.
+# Run from Backend/Python:
+#   python Benchmarks/weather_intent_bench.py [--llm]
+# -------------------------------------------------------
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Tools.WeatherIntent import WeatherIntentExtractor, CITIES, canonical_country
+
+# (prompt, has_city, city, country, forecast_type)
+LABELED = [
+    ("What's the weather like?", False, "", "", "current"),
+    ("how hot is it outside right now", False, "", "", "current"),
+    ("Is it raining now?", False, "", "", "current"),
+    ("what's the temperature", False, "", "", "current"),
+    ("Do I need an umbrella tomorrow?", False, "", "", "daily"),
+    ("weather forecast for the next 5 days", False, "", "", "daily"),
+    ("will it rain this weekend", False, "", "", "daily"),
+    ("what's the weather going to be on Friday", False, "", "", "daily"),
+    ("hourly forecast please", False, "", "", "hourly"),
+    ("will it be cold tonight?", False, "", "", "hourly"),
+    ("what will the temperature be at 6 pm", False, "", "", "hourly"),
+    ("is it going to rain in the next few hours", False, "", "", "hourly"),
+    ("How's the weather this evening?", False, "", "", "hourly"),
+    ("weather in Cairo", True, "cairo", "Egypt", "current"),
+    ("What's the weather in London right now?", True, "london", "United Kingdom", "current"),
+    ("how hot is it in dubai", True, "dubai", "United Arab Emirates", "current"),
+    ("Is it snowing in Moscow?", True, "moscow", "Russia", "current"),
+    ("Weather in Alexandria tomorrow", True, "alexandria", "Egypt", "daily"),
+    ("forecast for Paris this week", True, "paris", "France", "daily"),
+    ("Will it rain in Tokyo on Saturday?", True, "tokyo", "Japan", "daily"),
+    ("7 day forecast for New York", True, "new york", "United States", "daily"),
+    ("what's the weather in Sharm El Sheikh for the next 3 days", True, "sharm el sheikh", "Egypt", "daily"),
+    ("Luxor weather tonight", True, "luxor", "Egypt", "hourly"),
+    ("hourly weather in Berlin", True, "berlin", "Germany", "hourly"),
+    ("temperature in Riyadh at 3pm", True, "riyadh", "Saudi Arabia", "hourly"),
+    ("How cold will Toronto be this afternoon?", True, "toronto", "Canada", "hourly"),
+    ("weather in São Paulo", True, "sao paulo", "Brazil", "current"),
+    ("is it sunny in Barcelona, Spain", True, "barcelona", "Spain", "current"),
+    ("weather for Manchester, UK tomorrow", True, "manchester", "United Kingdom", "daily"),
+    ("what's the forecast in hurghada for the weekend", True, "hurghada", "Egypt", "daily"),
+    ("current weather in Amman", True, "amman", "Jordan", "current"),
+    ("is it windy in Istanbul today", True, "istanbul", "Turkey", "daily"),
+    ("Nice weather today, isn't it?", False, "", "", "daily"),
+    ("weather in Nice tomorrow", True, "nice", "France", "daily"),
+    ("What's the weather in Giza at the moment?", True, "giza", "Egypt", "current"),
+    ("Will I need a jacket in Seattle later?", True, "seattle", "United States", "hourly"),
+    ("rain chances in Mumbai next week", True, "mumbai", "India", "daily"),
+    ("How humid is Singapore right now", True, "singapore", "Singapore", "current"),
+    # the extractor should hand these to Gemini
+    ("weather in Smallville", True, "smallville", "United States", "current"),
+    ("what's the weather in Paris, Texas", True, "paris", "United States", "current"),
+    ("compare the weather in Cairo and London", True, "cairo", "Egypt", "current"),
+    ("weather in Egypt", True, "egypt", "Egypt", "current"),
+    ("is it raining now or later tonight", False, "", "", "hourly"),
+    ("weather for tomorrow in Kafr El Dawwar", True, "kafr el dawwar", "Egypt", "daily"),
+]
+
+
+def correct(result, label):
+    _, has_city, city, country, forecast_type = label
+    if result["has_city"] != has_city or result["forecast_type"] != forecast_type:
+        return False
+    if has_city:
+        return result["city_name"].lower() == city and canonical_country(result["country"]) == canonical_country(country)
+    return True
+
+
+def run_local():
+    extractor = WeatherIntentExtractor(dict(CITIES))  # built-in gazetteer only, reproducible
+    decided = right = 0
+    wrong = []
+    start = time.perf_counter()
+    results = [extractor.extract(label[0]) for label in LABELED]
+    elapsed = time.perf_counter() - start
+    for label, result in zip(LABELED, results):
+        if result is None:
+            continue
+        decided += 1
+        if correct(result, label):
+            right += 1
+        else:
+            wrong.append((label[0], result))
+    print(f"local coverage : {decided}/{len(LABELED)} ({decided / len(LABELED):.0%}) answered without Gemini")
+    print(f"local accuracy : {right}/{decided} ({right / decided:.0%}) on the prompts it decided")
+    print(f"local latency  : {elapsed / len(LABELED) * 1e6:.1f} µs per prompt")
+    for text, result in wrong:
+        print(f"  ✗ {text!r} → {result}")
+
+
+def run_llm():
+    from google.genai import types
+    import GeminiClient
+    from Tools.WeatherTool import WEATHER_INTENT_CONFIG
+    client = GeminiClient.get_client()
+    right, latencies = 0, []
+    for label in LABELED:
+        start = time.perf_counter()
+        response = client.models.generate_content(
+            model="gemini-2.5-flash",
+            contents=[types.Content(role="user", parts=[types.Part.from_text(text=label[0])])],
+            config=WEATHER_INTENT_CONFIG,
+        )
+        latencies.append(time.perf_counter() - start)
+        result = json.loads(response.text)
+        result["city_name"] = result.get("city_name") or ""
+        right += correct(result, label)
+    latencies.sort()
+    print(f"gemini accuracy: {right}/{len(LABELED)} ({right / len(LABELED):.0%})")
+    print(f"gemini latency : p50 {latencies[len(latencies) // 2] * 1e3:.0f} ms, max {latencies[-1] * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    run_local()
+    if "--llm" in sys.argv:
+        run_llm()
@@ -0,0 +1,55 @@
+import os
+from functools import lru_cache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------------------------------
+# 🔵 TOKEN BUDGETS PER CALL TYPE
+# -------------------------------------------------------
+# router → only needs the latest turn(s) to classify
+# tool   → enough recent context to fill function arguments
+# chat   → conversational replies, the largest window
+# -------------------------------------------------------
+TOKEN_BUDGETS = {
+    "router": int(os.getenv("CONTEXT_BUDGET_ROUTER", "256")),
+    "tool": int(os.getenv("CONTEXT_BUDGET_TOOL", "2048")),
+    "chat": int(os.getenv("CONTEXT_BUDGET_CHAT", "6000")),
+}
+MESSAGE_OVERHEAD = 4  # role / turn separators
+
+
+# Gemini averages ~4 characters per token for English text; good
+# enough for budgeting and costs nothing compared to countTokens.
+# Cached by text, so every message is only measured once.
+@lru_cache(maxsize=65536)
+def count_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def message_tokens(content) -> int:
+    return MESSAGE_OVERHEAD + sum(count_tokens(part.text or "") for part in content.parts)
+
+
+def build_context(messages, call_type="chat", summary=None):
+    """
+    Returns the system prompt (+ the running summary, if any) and the
+    newest messages that fit the call type's token budget. The latest
+    message is always kept, even if it alone exceeds the budget.
+    """
+    if not messages:
+        return messages
+    budget = TOKEN_BUDGETS[call_type]
+    head = [messages[0]]
+    if summary is not None and call_type != "router":
+        head.append(summary)
+    used = sum(message_tokens(content) for content in head)
+    selected = []
+    for content in reversed(messages[1:]):
+        tokens = message_tokens(content)
+        if selected and used + tokens > budget:
+            break
+        selected.append(content)
+        used += tokens
+    selected.reverse()
+    return head + selected
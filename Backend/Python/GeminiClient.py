@@ -0,0 +1,32 @@
+import os
+import threading
+from google import genai
+from dotenv import load_dotenv
+
+load_dotenv()
+api_key = os.getenv("LLM_API_KEY")
+
+
+# -------------------------------------------------------
+# 🔵 SHARED GEMINI CLIENT
+# -------------------------------------------------------
+# One genai.Client per process instead of one per session /
+# per weather question. Created on first use (so importing
+# Model or the tools stays cheap) under a lock, and shared by
+# Model, WeatherTool and the summarizer threads; the client
+# keeps no per-conversation state, the history is passed in
+# on every call.
+# -------------------------------------------------------
+_client = None
+_lock = threading.Lock()
+
+
+def get_client() -> genai.Client:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                if not api_key:
+                    raise ValueError("Missing LLM_API_KEY. Did you forget to set it in your .env file?")
+                _client = genai.Client(api_key=api_key)
+    return _client
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))  # seconds
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))          # seconds
+POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "16"))                 # per-host pools kept alive
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))                   # keep-alive connections per host
+
+
+# -------------------------------------------------------
+# 🔵 SHARED HTTP LAYER
+# -------------------------------------------------------
+# One process-wide keep-alive client for every outbound call
+# (Node backend, Open-Meteo, Gmail, Google OAuth):
+# - sync: requests.Session with a pooled HTTPAdapter
+# - async: httpx.AsyncClient with the same limits
+# - explicit connect/read timeouts on every call
+# - per-upstream metrics (count, errors, latency) → stats()
+# Use HttpClient.get/post (sync) or HttpClient.aget/apost.
+# -------------------------------------------------------
+class UpstreamMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = defaultdict(lambda: {"requests": 0, "errors": 0, "total_latency": 0.0, "max_latency": 0.0, "status": defaultdict(int)})
+
+    def record(self, url, latency, status=None):
+        host = urlsplit(url).netloc
+        with self._lock:
+            entry = self._hosts[host]
+            entry["requests"] += 1
+            entry["total_latency"] += latency
+            entry["max_latency"] = max(entry["max_latency"], latency)
+            if status is None or status >= 500:
+                entry["errors"] += 1
+            entry["status"][f"{status // 100}xx" if status else "failed"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                host: {
+                    "requests": entry["requests"],
+                    "errors": entry["errors"],
+                    "avg_latency_ms": 1000 * entry["total_latency"] / entry["requests"] if entry["requests"] else 0.0,
+                    "max_latency_ms": 1000 * entry["max_latency"],
+                    "status": dict(entry["status"]),
+                }
+                for host, entry in self._hosts.items()
+            }
+
+
+metrics = UpstreamMetrics()
+_session = None
+_async_client = None
+_lock = threading.Lock()
+
+
+def session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                new_session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE)
+                new_session.mount("http://", adapter)
+                new_session.mount("https://", adapter)
+                _session = new_session
+    return _session
+
+
+def async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=POOL_HOSTS * POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+        )
+    return _async_client
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    start = time.perf_counter()
+    try:
+        response = session().request(method, url, **kwargs)
+    except Exception:
+        metrics.record(url, time.perf_counter() - start)
+        raise
+    metrics.record(url, time.perf_counter() - start, response.status_code)
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+async def arequest(method, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await async_client().request(method, url, **kwargs)
+    except Exception:
+        metrics.record(url, time.perf_counter() - start)
+        raise
+    metrics.record(url, time.perf_counter() - start, response.status_code)
+    return response
+
+
+async def aget(url, **kwargs):
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url, **kwargs):
+    return await arequest("POST", url, **kwargs)
+
+
+async def aclose():
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+
+
+def stats():
+    return metrics.stats()
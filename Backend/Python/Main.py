@@ -1,25 +1,32 @@
 import base64
 from datetime import datetime, timedelta, timezone
-from fastapi import FastAPI, UploadFile, File, Form, Request, Header
+from fastapi import FastAPI, UploadFile, File, Form, Request, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from Model import Model 
+from Model import Model, local_router, routing_stats
 from AudioProcessing.STTTool import STTTool
 from AudioProcessing.TTSTool import TTSTool
+from AudioProcessing.StreamingSTT import PCMDecoder
 # from AudioProcessing.Temp_TTSTool import TTSWrapper
 import os
 from dotenv import load_dotenv
-import shutil
-from pydub import AudioSegment
 # from RAG.Chunking import Chunking
 import json
 from Session import Session
 from apscheduler.schedulers.background import BackgroundScheduler
 from ImageProcessing.ImageProcessing import ImageProcessing
 
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
-import requests
+import HttpClient
+from Tools.CredentialCache import credential_cache, get_auth_details_async
+from Tools.TokenManager import token_manager
+from Tools.GeocodeCache import geocode_cache
+from Tools.ForecastCache import forecast_cache
+from Tools.MailboxCache import MailboxCache
+from Tools.WeatherTool import prewarm_geocode_cache
+import threading
 
 
 load_dotenv()
@@ -46,14 +53,40 @@ scheduler = BackgroundScheduler()
 def cleanup_sessions():
     Session.remove_idle_sessions()
 
+def checkpoint_sessions():
+    Session.checkpoint_sessions()
+
 # def Read_Emails():
 #     Session.remove_idle_sessions()
 
 scheduler.add_job(cleanup_sessions, "interval", minutes=1)
+scheduler.add_job(token_manager.refresh_due, "interval", minutes=1)  # refresh active users' Gmail tokens before expiry
+scheduler.add_job(MailboxCache.purge_idle, "interval", minutes=5)  # drop cached mailboxes of idle users
+scheduler.add_job(checkpoint_sessions, "interval", minutes=int(os.getenv("HISTORY_CHECKPOINT_MINUTES", "5")))
 scheduler.start()
 
 
 
+@app.on_event("startup")
+def prewarm_geocode():
+    # GEOCODE_PREWARM_FILE: one "City" or "City, Country" per line
+    path = os.getenv("GEOCODE_PREWARM_FILE")
+    if path:
+        threading.Thread(target=prewarm_geocode_cache, args=(path,), name="geocode-prewarm", daemon=True).start()
+
+@app.on_event("shutdown")
+def flush_history():
+    # hand every unsaved delta to the write-behind queue and give it a moment to drain
+    scheduler.shutdown(wait=False)
+    Session.checkpoint_sessions()
+    if not Session.history_queue.flush(timeout=10):
+        print(f"❌ {Session.history_queue.backlog()} messages not saved before shutdown")
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await HttpClient.aclose()
+
+
 # Allow frontend to access backend
 app.add_middleware(
     CORSMiddleware,
@@ -84,34 +117,131 @@ async def chat(request: Request,authorization: str = Header(None)):
     # print(f"Received token: '{authorization}'")
     # for s in Session.sessions:
     #     print(f"Existing token: '{s['Token']}'")
-    model_instance = Session.user_chatBot_instance(authorization,location)
-    # Access the model instance from app.state
-    response = model_instance.generate_response(user_text,location,authorization)
+    # same-user turns are serialized, different users run in parallel
+    async with Session.user_session(authorization,location) as model_instance:
+        response = await model_instance.generate_response_async(user_text,location,authorization)
 
     return {"response": response}  # ✅ Ensure the correct response field
 
 
-#⚠️⚠️to do: file names should use userid for files to be unique
+# -------------------------------------------------------
+# 🔵 STREAMING CHAT (Server-Sent Events)
+# -------------------------------------------------------
+# Same body as /chat. Emits:
+#   data: {"token": "..."}        for every generated chunk
+#   event: done / data: {}        once the reply is complete
+# -------------------------------------------------------
+@app.post("/chat/stream")
+async def chat_stream(request: Request,authorization: str = Header(None)):
+    if authorization is None:
+        return {"status_code":401, "response": "Missing token"}
+    data = await request.json()
+    user_text = data.get("text")
+    if not user_text:
+        return {"error": "No input text provided."}
+    location = data.get("location")
+
+    async def event_stream():
+        # the user's lock is held until the stream ends, so the next turn sees the full reply
+        async with Session.user_session(authorization,location) as model_instance:
+            async for token in model_instance.stream_response_async(user_text,location,authorization):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/router/stats")
+def router_stats():
+    # hit-rate / latency of the local intent router vs the Gemini router,
+    # plus per-mode turn latency for the router vs single_call A/B test
+    return {**local_router.stats(), "routing_modes": routing_stats()}
+
+@app.get("/http/stats")
+def http_stats():
+    # per-upstream request count / errors / latency of the shared HTTP client
+    return HttpClient.stats()
+
+@app.get("/weather/stats")
+def weather_stats():
+    # geocode cache hit ratio (memory / SQLite / API), forecast cache hits / coalesced fetches
+    return {"geocode": geocode_cache.stats(), "forecast": forecast_cache.stats()}
+
+# upload file → ffmpeg stdin in 64 KB pieces → 16 kHz mono float32 pieces → Whisper (chunked when long)
 @app.post("/audio")  # ✅ Change to POST
 async def chat(audio: UploadFile = File(...),authorization: str = Header(None)):
     if authorization is None:
         return {"status_code":401, "response": "Missing token"}
     
-    input_path = "temp_input"  + authorization + ".webm" # Save raw uploaded file
-    wav_path = "temp_audio"   + authorization + ".wav" # Will convert to this
-    with open(input_path, "wb") as buffer:
-        shutil.copyfileobj(audio.file, buffer)
-    audio_segment = AudioSegment.from_file(input_path)
-    audio_segment = audio_segment.set_frame_rate(16000).set_channels(1)  # Ensure 16kHz mono for Whisper
-    audio_segment.export(wav_path, format="wav")
-    text = whisper_instance.generate_response(wav_path)
+    # audio.file is Starlette's spooled temp file: read in chunks by the decoder, never copied whole
+    text = await run_in_threadpool(whisper_instance.generate_response, audio.file)
     # is_voice_generated = TTSTool_instance.elevenlabs_tts(text,wav_path)
     # if not is_voice_generated :
     #     slow_TTS_instance.generate_speech(text,wav_path,"en","speaker.wav") #⚠️⚠️language to be input instead of hard coded
-    os.remove(input_path)
-    os.remove(wav_path)
     return {"Transcription": text}  # ✅ Ensure the correct response field
 
+# -------------------------------------------------------
+# 🔵 STREAMING TRANSCRIPTION
+# -------------------------------------------------------
+# ws://.../audio/stream?token=...&language=...&sample_rate=48000&encoding=s16le
+# The token (query param, or Authorization header) must belong
+# to a live chat session or be accepted by the Node backend.
+# client → binary frames of raw mono PCM (s16le or f32le, any
+#          sample rate, resampled to 16 kHz with carried state),
+#          then the text message "end"
+# server → {"type": "partial", "text"} while the user speaks,
+#          {"type": "final", "text"} per pause-delimited segment,
+#          {"type": "done", "text": full transcript} after "end"
+# Only the open segment is buffered, so memory is flat for any
+# length; Whisper runs in the threadpool (batched with /audio).
+# -------------------------------------------------------
+async def is_authorized(authorization):
+    # a live session was created for this token already; otherwise ask Node (cached)
+    if authorization in Session.sessions:
+        return True
+    try:
+        status, _ = await get_auth_details_async(authorization)
+    except Exception as e:
+        print(f"❌ Error checking audio stream token: {e}")
+        return False
+    return status == 200
+
+@app.websocket("/audio/stream")
+async def audio_stream(websocket: WebSocket, token: str = None, language: str = None, sample_rate: int = 16000, encoding: str = "s16le"):
+    # browsers cannot set headers on WebSockets, so the token may come as a query param
+    authorization = websocket.headers.get("authorization")
+    if authorization is None and token:
+        authorization = token if token.startswith("Bearer ") else f"Bearer {token}"
+    if authorization is None or not await is_authorized(authorization):
+        await websocket.close(code=1008, reason="Missing or invalid token")
+        return
+    await websocket.accept()
+    transcriber = whisper_instance.streaming_transcriber(language)
+    decode = PCMDecoder(encoding, sample_rate)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                samples = decode(message["bytes"])
+                events = await run_in_threadpool(transcriber.feed, samples)
+            elif (message.get("text") or "").strip().lower() == "end":
+                events = await run_in_threadpool(transcriber.flush)
+                for event in events:
+                    await websocket.send_json(event)
+                await websocket.send_json({"type": "done", "text": transcriber.text})
+                await websocket.close()
+                return
+            else:
+                continue
+            for event in events:
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"❌ Error in audio stream: {e}")
+        await websocket.close(code=1011)
+
 #⚠️⚠️to do: file names should use userid for files to be unique
 # @app.post("/audio")
 # async def process_audio(request: Request): # audio: UploadFile = File(...)
@@ -159,15 +289,14 @@ async def process_image(request: Request, authorization: str = Header(None)):
 
     if not user_text or not image_path:
         return {"error": "No input text or image path provided."}
-    response = ImageProcessing.generate_response(image_path,user_text)
+    response = await run_in_threadpool(ImageProcessing.generate_response,image_path,user_text)
 
     # ⚠️⚠️ check if this is a new session if yes retrive history first
     # location = data.get("location") ⚠️⚠️To-do fetch location from frontEnd
     location = { "latitude": 29.9866, "longitude": 31.4406 } #⚠️⚠️To-do remove this line when location is fetched from frontend
-    model_instance = Session.user_chatBot_instance(authorization, location)
-
-    model_instance.add_message("user", user_text)
-    model_instance.add_message("model", response)
+    async with Session.user_session(authorization, location) as model_instance:
+        model_instance.add_message("user", user_text)
+        model_instance.add_message("model", response)
 
     return {"caption": response}  # ✅ Ensure the correct response field
 
@@ -203,7 +332,7 @@ def auth(request: Request):
     }
 
 
-    response = requests.get(url,headers=headers)  #headers=headers, data=json.dumps(payload)
+    response = HttpClient.get(url,headers=headers)  #headers=headers, data=json.dumps(payload)
     if response.status_code == 200 :
         print("✅ Retrieved email from Node.js backend.:", response.json())
         data = response.json()
@@ -268,7 +397,7 @@ def auth_callback(request: Request):
     # -------------------------------------------------------
     # ✅ STEP 1: Get authenticated Google email
     # -------------------------------------------------------
-    userinfo = requests.get(
+    userinfo = HttpClient.get(
         "https://www.googleapis.com/oauth2/v1/userinfo?alt=json",
         headers={"Authorization": f"Bearer {credentials.token}"}
     ).json()
@@ -315,7 +444,9 @@ def auth_callback(request: Request):
         "access_token_expiry": expiry_utc.isoformat(),  # UTC ISO string with Z
         "is_authenticated": True
     }
-    response = requests.post(url,headers=headers,json=payload)  #headers=headers, data=json.dumps(payload)
+    response = HttpClient.post(url,headers=headers,json=payload)  #headers=headers, data=json.dumps(payload)
+    # new tokens (or a failed write) → next email turn re-reads them from Node
+    credential_cache.invalidate(user_token)
     if response.status_code == 200 :
         print("✅ User OAuth info set successfully in Node.js backend.")
     else:
@@ -7,7 +7,9 @@
 from google import genai
 from google.genai import types
 from pydantic import BaseModel, Field
-import requests
+import HttpClient
+import GeminiClient
+import asyncio
 from typing import Literal
 import os
 from dotenv import load_dotenv
@@ -15,11 +17,30 @@ import json
 from Tools.WeatherTool import WeatherTool
 # from Tools.MailTool import MailTool
 from Tools.Ooth2MailTool import MailToolOAuth
+from Tools.CredentialCache import get_auth_details, get_auth_details_async
+from Routing.LocalRouter import LocalRouter
+from ContextBuilder import build_context
+from Summarizer import summary_prompt
 from datetime import datetime
+from collections import Counter, defaultdict
+import threading
+import random
+import time
 
 load_dotenv()
 api_key = os.getenv("LLM_API_KEY")
 node_port = os.getenv("NODE_PORT")
+local_router_enabled = os.getenv("LOCAL_ROUTER_ENABLED", "true").lower() == "true"
+# "router"      → classify with the router LLM call, then run tool_call / direct reply
+# "single_call" → one generation with the tool declarations decides both
+# "ab"          → each new session picks one of the two (ROUTING_AB_RATIO = share of single_call)
+routing_mode = os.getenv("ROUTING_MODE", "router")
+routing_ab_ratio = float(os.getenv("ROUTING_AB_RATIO", "0.5"))
+
+# process-wide: rules + classifier trained on logged LLM decisions
+local_router = LocalRouter()
+# stateless apart from the shared client, one instance serves every session
+weather_tool = WeatherTool()
 
 # -------------------------------------------------------
 # 🔵 REQUEST TYPE SCHEMA (for routing decisions)
@@ -55,143 +76,149 @@ class RequestType(BaseModel):
 
 
 # -------------------------------------------------------
-# 🔵 MODEL CLASS INITIALIZATION
+# 🔵 WEATHER TOOL DECLARATION
 # -------------------------------------------------------
-# Creates:
-# - Gemini client
-# - Tool schemas (weather + email tools)
-# - Tool configuration passed to Gemini
-# - In-memory message history
+# Schema describing the weather_request tool.
+# Gemini uses this to understand function parameters.
+# Dummy arg is required by the API but ignored.
 # -------------------------------------------------------
-class Model:
-    if not api_key:
-        raise ValueError("Missing LLM_API_KEY. Did you forget to set it in your .env file?")
-    def __init__(self):
-        self.LLMmodel = genai.Client(api_key=api_key)
-        self.messages = []
-        # -------------------------------------------------------
-        # 🔵 WEATHER TOOL DECLARATION
-        # -------------------------------------------------------
-        # Schema describing the weather_request tool.
-        # Gemini uses this to understand function parameters.
-        # Dummy arg is required by the API but ignored.
-        # -------------------------------------------------------
-        weather_request = {
-            "name": "weather_request",
-            "description": (
-                "Fetches the weather forecast (current, hourly, or daily) for a specified city or location. "
-                "The user input may or may not explicitly mention the forecast type or location. "
-                "If no forecast type is mentioned, default to 'current'. If no city is mentioned, default to a fallback location. "
-                "The function automatically handles geocoding if a city name is present in the input."
-            ),
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "dummy": { 
-                        # Placeholder field
-                        "type": "boolean",
-                        "description": "This is a placeholder and should be ignored"
-                    },
-                },
-                # "required": [],
+WEATHER_REQUEST = {
+    "name": "weather_request",
+    "description": (
+        "Fetches the weather forecast (current, hourly, or daily) for a specified city or location. "
+        "The user input may or may not explicitly mention the forecast type or location. "
+        "If no forecast type is mentioned, default to 'current'. If no city is mentioned, default to a fallback location. "
+        "The function automatically handles geocoding if a city name is present in the input."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "dummy": { 
+                # Placeholder field
+                "type": "boolean",
+                "description": "This is a placeholder and should be ignored"
             },
-        }
+        },
+        # "required": [],
+    },
+}
 
-        # -------------------------------------------------------
-        # 🔵 EMAIL TOOL DECLARATION
-        # -------------------------------------------------------
-        # Supports:
-        # - Send email
-        # - Read email
-        # Gemini extracts:
-        # - to_email
-        # - subject
-        # - body
-        # No need for the user to repeat them.
-        # -------------------------------------------------------
-        email_requests  = {
-            "name": "email_requests",
+# -------------------------------------------------------
+# 🔵 EMAIL TOOL DECLARATION
+# -------------------------------------------------------
+# Supports:
+# - Send email
+# - Read email
+# Gemini extracts:
+# - to_email
+# - subject
+# - body
+# No need for the user to repeat them.
+# -------------------------------------------------------
+EMAIL_REQUESTS = {
+    "name": "email_requests",
+    "description": (
+        "Performs various email operations: send, read.\n\n"
+        "The 'send' functionality allows the assistant to send an email using the inputs provided "
+        "by the user, including the recipient (to_email), subject, and body.\n\n"
+        "You do not need to ask the user to re-enter this information — it will be passed to the function directly. "
+        "Proceed to extract these values and call the function accordingly."
+        "note this feature needs authentication first. so tell the user to authenticate if not done yet."
+    ),
+    "parameters": {
+      "type": "object",
+      "properties": {
+        "functionality": {
+          "type": "string",
+          "enum": ["send", "read"] # "delete", "search"
+        },
+        "num_of_mails": { 
+            "type": "integer",
+            "description": "The number of emails the user wants to retrieve. Defaults to 10 if not provided."
+        },
+        "to_email": {
+            "type": "string",
+            "description": "The recipient’s email address extracted from the user's message."
+        },
+        "subject": {
+            "type": "string",
             "description": (
-                "Performs various email operations: send, read.\n\n"
-                "The 'send' functionality allows the assistant to send an email using the inputs provided "
-                "by the user, including the recipient (to_email), subject, and body.\n\n"
-                "You do not need to ask the user to re-enter this information — it will be passed to the function directly. "
-                "Proceed to extract these values and call the function accordingly."
-                "note this feature needs authentication first. so tell the user to authenticate if not done yet."
-            ),
-            "parameters": {
-              "type": "object",
-              "properties": {
-                "functionality": {
-                  "type": "string",
-                  "enum": ["send", "read"] # "delete", "search"
-                },
-                "num_of_mails": { 
-                    "type": "integer",
-                    "description": "The number of emails the user wants to retrieve. Defaults to 10 if not provided."
-                },
-                "to_email": {
-                    "type": "string",
-                    "description": "The recipient’s email address extracted from the user's message."
-                },
-                "subject": {
-                    "type": "string",
-                    "description": (
-                        "The subject line of the email. If not explicitly stated by the user, "
-                        "infer an appropriate subject based on the context of the message."
-                    )
-                },
-                "body": {
-                    "type": "string",
-                    "description": (
-                        "The main content of the email. This may not always be explicitly mentioned — for example, "
-                        "the user might say: 'Send a congratulations mail to example@example.com for his graduation'. "
-                        "In such cases, infer the full body and format it clearly, using appropriate spacing and line breaks."
-                    )
-                }
-              },
-              "required": ["functionality"]
-            }
+                "The subject line of the email. If not explicitly stated by the user, "
+                "infer an appropriate subject based on the context of the message."
+            )
+        },
+        "body": {
+            "type": "string",
+            "description": (
+                "The main content of the email. This may not always be explicitly mentioned — for example, "
+                "the user might say: 'Send a congratulations mail to example@example.com for his graduation'. "
+                "In such cases, infer the full body and format it clearly, using appropriate spacing and line breaks."
+            )
         }
+      },
+      "required": ["functionality"]
+    }
+}
 
 # -------------------------------------------------------
 # 🔵 Gemini TOOLS CONFIGURATION
 # -------------------------------------------------------
 # Combine weather_request + email_requests into a single
-# tool object that Gemini can call.
+# tool object that Gemini can call. Built once per process
+# and shared by every session (read-only after import).
 # -------------------------------------------------------
-        self.tools = types.Tool(
-            function_declarations=[
-                weather_request,
-                email_requests
-            ]
-        )
-        self.config = types.GenerateContentConfig(tools=[self.tools])
+def build_tool_config():
+    tools = types.Tool(
+        function_declarations=[
+            WEATHER_REQUEST,
+            EMAIL_REQUESTS
+        ]
+    )
+    return tools, types.GenerateContentConfig(tools=[tools])
+
+
+TOOLS, TOOL_CONFIG = build_tool_config()
 
 # -------------------------------------------------------
-# 🔵 SAVE CHAT HISTORY TO NODE SERVER
+# 🔵 MODEL CLASS INITIALIZATION
 # -------------------------------------------------------
-# Sends the last N messages (except system prompt)
-# to your Node backend for persistent storage.
+# Creates:
+# - In-memory message history
+# - Per-session locks and routing mode
+# The Gemini client, tool schemas and tool configuration are
+# process-wide (GeminiClient.get_client / TOOLS / TOOL_CONFIG),
+# so a new session only allocates its own state.
 # -------------------------------------------------------
-    def save_history(self,Bearer_TOKEN):
-        url = f"http://localhost:{node_port}/api/v1/fastapi/save-chat-history" 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": Bearer_TOKEN
-        }
-        #⚠️⚠️ could be further modified if needed in terms of time complixity
-        payload = {
-            "history": [
-                {
-                    "role": msg.role,
-                    "content": "".join([part.text for part in msg.parts])  # flatten parts into a string
-                }
-                for msg in self.messages[1:]  # skip the first message
-            ]
-        }
-        response = requests.post(url, data=json.dumps(payload) , headers=headers)
-        return response.status_code   
+class Model:
+    if not api_key:
+        raise ValueError("Missing LLM_API_KEY. Did you forget to set it in your .env file?")
+    def __init__(self):
+        self.messages = []
+        self.summary = ""                   # running summary of turns folded out of self.messages
+        self.pending_history = []           # messages appended since the last successful save
+        self.history_lock = threading.Lock()
+        self.routing_mode = pick_routing_mode()
+        self.decided_locally = False        # last turn was routed by the local router (see record_turn)
+        self.tools = TOOLS                  # shared, built once at import
+        self.config = TOOL_CONFIG
+
+    @property
+    def LLMmodel(self):
+        return GeminiClient.get_client()
+
+# -------------------------------------------------------
+# 🔵 SAVE CHAT HISTORY TO NODE SERVER (append-only)
+# -------------------------------------------------------
+# Only messages added since the last save are sent; Node
+# $push-es them onto chatHistory. take_pending() hands the
+# delta over atomically to the write-behind queue in
+# PersistenceQueue.py (session eviction and checkpoints),
+# which batches, retries and dead-letters it.
+# -------------------------------------------------------
+    def take_pending(self):
+        with self.history_lock:
+            batch, self.pending_history = self.pending_history, []
+        return batch
 
 
 # -------------------------------------------------------
@@ -210,36 +237,40 @@ class Model:
             "Content-Type": "application/json",
             "Authorization": Bearer_TOKEN
         }
-        response = requests.get(url,headers=headers)  #headers=headers, data=json.dumps(payload)
-        if response.status_code == 200 :
+        response = HttpClient.get(url,headers=headers)  #headers=headers, data=json.dumps(payload)
+        self.load_history(response.status_code, response.json() if response.status_code == 200 else None, location, current_datetime)
+
+    async def init_user_history_async(self,location,current_datetime,Bearer_TOKEN):
+        url = f"http://localhost:{node_port}/api/v1/fastapi/user-data"  
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": Bearer_TOKEN
+        }
+        response = await HttpClient.aget(url,headers=headers)
+        self.load_history(response.status_code, response.json() if response.status_code == 200 else None, location, current_datetime)
+
+    def load_history(self,status_code,temp,location,current_datetime):
+        # If you want dynamic location/time each request, consider inserting SYSTEM_INSTRUCTION every request, or always append a "system/user context" message first.
+        SYSTEM_INSTRUCTION =(
+                                f"Your name is ZakAi and you are a daily personal assistant. Forget about being an llm trained by google. The user’s location is: {location}, current time is: {current_datetime}"
+                                f"Use this location, date, and time to improve the accuracy, relevance, and personalization of your responses. "
+                                f"If the user's request benefits from local context (e.g. suggestions, history, culture, language, events), "
+                                f"adapt the answer accordingly. Only skip using location if it’s clearly unrelated to the query."
+                                f"Note: Do not include or mention the user's location in your response unless the user explicitly asks for it."
+                            )
+        if status_code == 200 :
             print("fetched user history successfully")
-            temp = response.json()
             data = temp['data']['user']
             chatHistory = data.get("chatHistory", [])
             # medicalHistory = data.get("medicalHistory", [])
-            # If you want dynamic location/time each request, consider inserting SYSTEM_INSTRUCTION every request, or always append a "system/user context" message first.
-            SYSTEM_INSTRUCTION =(
-                                    f"Your name is ZakAi and you are a daily personal assistant. Forget about being an llm trained by google. The user’s location is: {location}, current time is: {current_datetime}"
-                                    f"Use this location, date, and time to improve the accuracy, relevance, and personalization of your responses. "
-                                    f"If the user's request benefits from local context (e.g. suggestions, history, culture, language, events), "
-                                    f"adapt the answer accordingly. Only skip using location if it’s clearly unrelated to the query."
-                                    f"Note: Do not include or mention the user's location in your response unless the user explicitly asks for it."
-                                )
             # ⚠️⚠️ make sure system prompt should me model or user role according to gemini docs
             self.messages = [
                 types.Content(role="model", parts=[types.Part.from_text(text=SYSTEM_INSTRUCTION)])
             ]
             for message in chatHistory:
-                self.add_message(message["role"], message["content"])
+                self.add_message(message["role"], message["content"], persist=False)  # already stored
         else:
-            print(f"❌ Error fetching user history: {response.status_code}")
-            SYSTEM_INSTRUCTION =(
-                                    f"Your name is ZakAi and you are a daily personal assistant. Forget about being an llm trained by google. The user’s location is: {location}, current time is: {current_datetime}"
-                                    f"Use this location, date, and time to improve the accuracy, relevance, and personalization of your responses. "
-                                    f"If the user's request benefits from local context (e.g. suggestions, history, culture, language, events), "
-                                    f"adapt the answer accordingly. Only skip using location if it’s clearly unrelated to the query."
-                                    f"Note: Do not include or mention the user's location in your response unless the user explicitly asks for it."
-                                )
+            print(f"❌ Error fetching user history: {status_code}")
             self.messages = [
                 types.Content(role="user", parts=[types.Part.from_text(text=SYSTEM_INSTRUCTION)])
             ]
@@ -249,18 +280,70 @@ class Model:
 # -------------------------------------------------------
 # Appends new messages and trims old ones
 # while always keeping the system message intact.
-# Future: you can add summarization instead of trimming.
+# Every pipeline appends through here, so the in-memory
+# history is bounded on all paths.
+# Trimming is only the hard cap: Summarizer.py folds old
+# turns into a running summary well before it is reached.
+# -------------------------------------------------------
+    def add_message(self, role, content, max_history=50, persist=True):
+        with self.history_lock:
+            self.messages.append(
+                types.Content(role=role, parts=[types.Part.from_text(text=content)])
+            )
+            if persist:
+                self.pending_history.append({"role": role, "content": content})
+            # Keep the first message (system) and trim the rest if needed
+            # (the background summarizer normally folds old turns before this limit is hit)
+            if len(self.messages) > max_history:
+                print("trimming history")
+                self.messages.pop(1)  # remove oldest
+
+# -------------------------------------------------------
+# 🔵 ROLLING SUMMARY
 # -------------------------------------------------------
-    def add_message(self, role, content, max_history=50):
-        self.messages.append(
-            types.Content(role=role, parts=[types.Part.from_text(text=content)])
+# Called by the background summarizer (Summarizer.py), never
+# on the request path. Folds everything except the newest
+# keep_recent messages into self.summary. The LLM call runs
+# without holding the lock; the result is only applied if the
+# folded messages are still at the head of the history.
+# -------------------------------------------------------
+    def summarize_history(self, keep_recent):
+        with self.history_lock:
+            old = self.messages[1:len(self.messages) - keep_recent]
+            previous_summary = self.summary
+        if not old:
+            return False
+        transcript = "\n".join(
+            f"{msg.role}: " + "".join([part.text or "" for part in msg.parts]) for msg in old
+        )
+        response = self.LLMmodel.models.generate_content(
+            model="gemini-2.5-flash",
+            contents = summary_prompt(previous_summary, transcript),
         )
-        # Keep the first message (system) and trim the rest if needed
-        # ⚠️⚠️ summary messages could be added here instead of removing old messages
-        if len(self.messages) > max_history:
-            print("trimming history")
-            self.messages.pop(1)  # remove oldest
-            print(f"make sure system prompt is still there: {self.messages[0]}")
+        with self.history_lock:
+            current = self.messages[1:1 + len(old)]
+            if len(current) != len(old) or any(a is not b for a, b in zip(current, old)):
+                print("history changed while summarizing, skipping")
+                return False
+            del self.messages[1:1 + len(old)]
+            self.summary = response.text
+        print(f"folded {len(old)} messages into the running summary")
+        return True
+
+    def summary_message(self):
+        if not self.summary:
+            return None
+        return types.Content(role="user", parts=[types.Part.from_text(text=f"Summary of the earlier conversation: {self.summary}")])
+
+# -------------------------------------------------------
+# 🔵 CONTEXT WINDOW PER CALL
+# -------------------------------------------------------
+# Gemini calls never send the full history: the system prompt
+# plus the newest messages that fit the call type's token
+# budget (router / tool / chat, see ContextBuilder.py).
+# -------------------------------------------------------
+    def context(self, call_type="chat"):
+        return build_context(self.messages, call_type, self.summary_message())
 
 # -------------------------------------------------------
 # 🔵 TOOL CALL EXECUTION (Weather / Email)
@@ -271,79 +354,74 @@ class Model:
 #    - WeatherTool → get_weather_response()
 #    - MailTool    → fetch_unread_emails(), send_email_tool()
 # -------------------------------------------------------
+    def call_function(self, name, args, userInput, current_datetime, lat, lon, Bearer_TOKEN):
+
+        # -------------------------------------------------------
+        # 🔵 WEATHER TOOL EXECUTION
+        # -------------------------------------------------------
+        if name.lower() == "weather_request" :
+            weatherTool_instance = weather_tool
+            return weatherTool_instance.get_weather_response(userInput,current_datetime,lat,lon)
+        
+        # -------------------------------------------------------
+        # 🔵 EMAIL TOOL EXECUTION
+        # -------------------------------------------------------
+        # credentials come from the per-session cache; Node is only
+        # asked on a miss (see Tools/CredentialCache.py)
+        elif name.lower() == "email_requests":
+            status, auth = get_auth_details(Bearer_TOKEN)
+            if status == 200 :
+                return self.email_request(auth, args, Bearer_TOKEN)
+            else:
+                print(f"❌ Error fetching user email auth status: {status}")
+                return "❌ Error fetching user email auth status."
+            
+        # if name == "search_DB":
+        #     return Retrieval.search_db()
+
+    def email_request(self, auth, args, Bearer_TOKEN):
+        print(f"fetched user email auth successfully")
+        is_authenticated = auth['is_authenticated']
+        email = auth['email']
+        access_token = auth['access_token']
+        refresh_token = auth['refresh_token']
+        access_token_expiry = auth['access_token_expiry']
+        
+        if not is_authenticated:
+            url = f"http://127.0.0.1:8000/auth"  
+            return f"❌ You need to authenticate your email account first. Please visit the {url} to authorize."
+        else:
+            functionality=args.get("functionality")
+ 
+            MailTool_instance = MailToolOAuth(access_token,refresh_token,access_token_expiry,Bearer_TOKEN,user_email=email)
+            if functionality=="read" :
+                num_of_mails=int(args.get("num_of_mails", 10))
+                return MailTool_instance.fetch_unread_emails(num_of_mails)
+            elif functionality == "send":
+                sender_email = email
+                to_email=args.get("to_email")
+                subject=args.get("subject")
+                body=args.get("body")
+                return MailTool_instance.send_email(sender_email,to_email,subject,body) #userInput
+
     def tool_call(self,userInput,current_datetime,lat,lon,Bearer_TOKEN):
         try:
             response = self.LLMmodel.models.generate_content(
                 model="gemini-2.5-flash",
-                contents = self.messages,
+                contents = self.context("tool"),
                 config=self.config
             )
             # print(f"⚠️💔 debugging",response)
             if not response.candidates[0].content.parts[0].function_call:
                 raise ValueError("Tool call predicted but not present in model response")
 
-            def call_function(name, args, Bearer_TOKEN):
-
-                # -------------------------------------------------------
-                # 🔵 WEATHER TOOL EXECUTION
-                # -------------------------------------------------------
-                if name.lower() == "weather_request" :
-                    weatherTool_instance = WeatherTool()
-                    return weatherTool_instance.get_weather_response(userInput,current_datetime,lat,lon)
-                
-                # -------------------------------------------------------
-                # 🔵 EMAIL TOOL EXECUTION
-                # -------------------------------------------------------
-                # ⚠️⚠️ repeated GET request 
-                elif name.lower() == "email_requests":
-                    url = f"http://localhost:{node_port}/api/v1/fastapi/getUserAuthDetails"  
-                    headers = {
-                        "Content-Type": "application/json",
-                        "Authorization": Bearer_TOKEN
-                    }
-                    response = requests.get(url,headers=headers)  #headers=headers, data=json.dumps(payload)
-
-                    if response.status_code == 200 :
-                        print(f"fetched user email auth successfully")
-                        temp = response.json()
-                        is_authenticated = temp['data']['is_authenticated']
-                        email = temp['data']['email']
-                        access_token = temp['data']['access_token']
-                        refresh_token = temp['data']['refresh_token']
-                        access_token_expiry = temp['data']['access_token_expiry']
-                        
-                        if not is_authenticated:
-                            url = f"http://127.0.0.1:8000/auth"  
-                            return f"❌ You need to authenticate your email account first. Please visit the {url} to authorize."
-                        else:
-                            response = requests.get(url,headers=headers)  # ❌ WHY CALL AGAIN?! #headers=headers, data=json.dumps(payload) 
-                            functionality=args.get("functionality")
-             
-                            MailTool_instance = MailToolOAuth(access_token,refresh_token,access_token_expiry,Bearer_TOKEN)
-                            if functionality=="read" :
-                                num_of_mails=int(args.get("num_of_mails", 10))
-                                return MailTool_instance.fetch_unread_emails(num_of_mails)
-                            elif functionality == "send":
-                                sender_email = email
-                                to_email=args.get("to_email")
-                                subject=args.get("subject")
-                                body=args.get("body")
-                                return MailTool_instance.send_email(sender_email,to_email,subject,body) #userInput
-                    else:
-                        print(f"❌ Error fetching user email auth status: {response.status_code}")
-                        return "❌ Error fetching user email auth status."
-                    
-                # if name == "search_DB":
-                #     return Retrieval.search_db()
-
-            if response.candidates[0].content.parts[0].function_call:
-                function_call = response.candidates[0].content.parts[0].function_call
-                name = function_call.name
-                args = function_call.args
-                result = call_function(name,args,Bearer_TOKEN)
-                self.messages.append(types.Content(role="model", parts=[types.Part.from_text(text=result)]))
-                reply = result
-                return reply
+            function_call = response.candidates[0].content.parts[0].function_call
+            name = function_call.name
+            args = function_call.args
+            result = self.call_function(name,args,userInput,current_datetime,lat,lon,Bearer_TOKEN)
+            self.add_message("model", result)
+            reply = result
+            return reply
         # -------------------------------------------------------
         # 🔵 TOOL CALL FALLBACK
         # -------------------------------------------------------
@@ -352,25 +430,16 @@ class Model:
             try:
                 # Take the raw tool_call fallback text
                 fallback_text = response.candidates[0].content.parts[0].text
-                # Prepare a rephrase instruction for the LLM
-                rephrase_prompt = (
-                    f"The following response was generated as a fallback from a tool call:\n\n{fallback_text}\n\n"
-                    f"Your task: Either improve and rephrase this message to sound natural, conversational, and helpful, "
-                    f"OR if you are able to answer the user's query more accurately yourself, do so instead of just rephrasing. "
-                    f"Make sure the response is friendly and clear."
-                )
                 # Add the rephrase instruction as user message
-                self.messages.append(
-                    types.Content(role="user", parts=[types.Part.from_text(text=rephrase_prompt)])
-                )
+                self.add_message("user", rephrase_prompt(fallback_text))
                 # Generate a more natural reply using the LLM
                 response = self.LLMmodel.models.generate_content(
                     model="gemini-2.5-flash",
-                    contents=self.messages,
+                    contents = self.context("chat"),
                 )
                 reply = response.text
                 # Save the model's refined reply in memory
-                self.messages.append(types.Content(role="model", parts=[types.Part.from_text(text=reply)]))
+                self.add_message("model", reply)
                 return reply 
             except Exception as e:
                 print(f"❌ Error in fallback response: {e}")
@@ -387,46 +456,85 @@ class Model:
     def direct_model_response(self):
         response = self.LLMmodel.models.generate_content(
             model="gemini-2.5-flash",
-            contents = self.messages,
+            contents = self.context("chat"),
         )
         reply = response.text
-        self.messages.append(types.Content(role="model", parts=[types.Part.from_text(text=reply)]))
+        self.add_message("model", reply)
+        return reply
+
+# -------------------------------------------------------
+# 🔵 SINGLE-CALL ROUTING (ROUTING_MODE=single_call)
+# -------------------------------------------------------
+# One generation with the tool declarations replaces the
+# router call + tool call pair: Gemini either returns a
+# function call (→ run the tool) or answers directly.
+# -------------------------------------------------------
+    def single_call_response(self,userInput,current_datetime,lat,lon,Bearer_TOKEN):
+        response = self.LLMmodel.models.generate_content(
+            model="gemini-2.5-flash",
+            contents = self.context("chat"),
+            config=self.config
+        )
+        function_call = response.candidates[0].content.parts[0].function_call
+        if function_call:
+            print(f"[Routing Decision]: tool_call | single call ({function_call.name})")
+            try:
+                reply = self.call_function(function_call.name,function_call.args,userInput,current_datetime,lat,lon,Bearer_TOKEN)
+            except Exception as e:
+                print(f"[Fallback Triggered]: {e}")
+                return self.direct_model_response()
+            if reply is None:
+                # unknown / undeclared function name: answer directly instead
+                print(f"[Fallback Triggered]: no tool named {function_call.name}")
+                return self.direct_model_response()
+        else:
+            print(f"[Routing Decision]: direct_model_response | single call")
+            reply = response.text
+        self.add_message("model", reply)
         return reply
 
 # -------------------------------------------------------
 # 🔵 ROUTER LLM CALL
 # -------------------------------------------------------
-# Sends entire conversation to Gemini with a JSON schema.
+# Sends the latest turn(s) to Gemini with a JSON schema.
 # Gemini classifies input:
 #   → "tool_call"
 #   → "direct_model_response"
 # Based on the classification, the message is routed.
 # -------------------------------------------------------
 
-    def route_request(self,user_input: str,current_datetime,lat,lon,Bearer_TOKEN):
-        """Router LLM call to determine the type of request, and route it to start execution"""
-        print(f"in Router:")
-        # ❌ router shouldn't see the whole history to avoid hullucinations
-        temp = []
-        temp.append(types.Content(role="user", parts=[types.Part.from_text(text=user_input)]))
+    def route_decision(self,user_input: str):
+        """Local fast path first; the Gemini router is only called when it is not confident."""
+        self.decided_locally = False
+        if local_router_enabled:
+            request_type, confidence, source = local_router.route(user_input)
+            if request_type:
+                print(f"[Routing Decision]: {request_type} | Confidence: {confidence} | local {source}")
+                self.decided_locally = True  # same in both modes: not part of the A/B numbers
+                return request_type
+        if self.routing_mode == "single_call":
+            # the tool-call generation itself decides: function call or direct answer
+            return "single_call"
+        start = time.perf_counter()
+        # router only sees the latest turn(s) (CONTEXT_BUDGET_ROUTER) to avoid hullucinations
         response = self.LLMmodel.models.generate_content(
             model="gemini-2.5-flash",
-            contents = self.messages,
-            config={
-                # "system_instruction"=SYSTEM_INSTRUCTION
-                "response_mime_type": "application/json",
-                "response_schema": RequestType,
-            }
+            contents = self.context("router"),
+            config=ROUTER_CONFIG
         )
-        result = json.loads(response.text)
-        print(f"result "+str(result))
-        request_type = result.get("request_type")
-        description = result.get("description", "No description provided")
-        confidence_score = result.get("confidence_score")
-        print(f"[Routing Decision]: {request_type} | Confidence: {confidence_score}")
+        request_type, confidence = parse_routing_decision(response.text)
+        local_router.record(user_input, request_type, confidence, time.perf_counter() - start)
+        return request_type
+
+    def route_request(self,user_input: str,current_datetime,lat,lon,Bearer_TOKEN):
+        """Router call to determine the type of request, and route it to start execution"""
+        print(f"in Router:")
+        request_type = self.route_decision(user_input)
 
         if(request_type=="tool_call"):
             reply = self.tool_call(user_input,current_datetime,lat,lon,Bearer_TOKEN)
+        elif(request_type=="single_call"):
+            reply = self.single_call_response(user_input,current_datetime,lat,lon,Bearer_TOKEN)
         # elif(request_type=="rag_response"):
         #     reply = self.RAG_Response(user_input)   
         else:
@@ -449,13 +557,311 @@ class Model:
             #     print("initializing user history")
             #     self.init_user_history(location,current_datetime,Bearer_TOKEN)
             try:
-                self.messages.append(types.Content(role="user", parts=[types.Part.from_text(text=user_message)]))
+                start = time.perf_counter()
+                self.add_message("user", user_message)
                 result = self.route_request(user_message,current_datetime,location.get("latitude"),location.get("longitude"),Bearer_TOKEN)
+                if not self.decided_locally:
+                    record_turn(self.routing_mode, time.perf_counter() - start)
                 return result
             except Exception as e:
                 print(f"❌error:",e)
                 return "error, please try again"
 
+# -------------------------------------------------------
+# 🔵 ASYNC PIPELINE
+# -------------------------------------------------------
+# Same flow as above, but every Gemini call goes through the
+# async client (self.LLMmodel.aio) and Node calls through
+# the shared async HTTP client, so a slow LLM round-trip never blocks the event loop.
+# Blocking tools (Gmail) run in a worker thread.
+# -------------------------------------------------------
+    async def call_function_async(self, name, args, userInput, current_datetime, lat, lon, Bearer_TOKEN):
+        if name.lower() == "weather_request" :
+            weatherTool_instance = weather_tool
+            return await weatherTool_instance.get_weather_response_async(userInput,current_datetime,lat,lon)
+
+        elif name.lower() == "email_requests":
+            status, auth = await get_auth_details_async(Bearer_TOKEN)
+
+            if status == 200 :
+                return await asyncio.to_thread(self.email_request, auth, args, Bearer_TOKEN)
+            else:
+                print(f"❌ Error fetching user email auth status: {status}")
+                return "❌ Error fetching user email auth status."
+
+    async def tool_call_async(self,userInput,current_datetime,lat,lon,Bearer_TOKEN):
+        try:
+            response = await self.LLMmodel.aio.models.generate_content(
+                model="gemini-2.5-flash",
+                contents = self.context("tool"),
+                config=self.config
+            )
+            if not response.candidates[0].content.parts[0].function_call:
+                raise ValueError("Tool call predicted but not present in model response")
+
+            function_call = response.candidates[0].content.parts[0].function_call
+            result = await self.call_function_async(function_call.name,function_call.args,userInput,current_datetime,lat,lon,Bearer_TOKEN)
+            self.add_message("model", result)
+            return result
+        except Exception as e:
+            print(f"[Fallback Triggered]: {e}")
+            try:
+                fallback_text = response.candidates[0].content.parts[0].text
+                self.add_message("user", rephrase_prompt(fallback_text))
+                response = await self.LLMmodel.aio.models.generate_content(
+                    model="gemini-2.5-flash",
+                    contents = self.context("chat"),
+                )
+                reply = response.text
+                self.add_message("model", reply)
+                return reply 
+            except Exception as e:
+                print(f"❌ Error in fallback response: {e}")
+                return await self.direct_model_response_async()
+
+    async def direct_model_response_async(self):
+        response = await self.LLMmodel.aio.models.generate_content(
+            model="gemini-2.5-flash",
+            contents = self.context("chat"),
+        )
+        reply = response.text
+        self.add_message("model", reply)
+        return reply
+
+    async def single_call_response_async(self,userInput,current_datetime,lat,lon,Bearer_TOKEN):
+        response = await self.LLMmodel.aio.models.generate_content(
+            model="gemini-2.5-flash",
+            contents = self.context("chat"),
+            config=self.config
+        )
+        function_call = response.candidates[0].content.parts[0].function_call
+        if function_call:
+            print(f"[Routing Decision]: tool_call | single call ({function_call.name})")
+            try:
+                reply = await self.call_function_async(function_call.name,function_call.args,userInput,current_datetime,lat,lon,Bearer_TOKEN)
+            except Exception as e:
+                print(f"[Fallback Triggered]: {e}")
+                return await self.direct_model_response_async()
+            if reply is None:
+                print(f"[Fallback Triggered]: no tool named {function_call.name}")
+                return await self.direct_model_response_async()
+        else:
+            print(f"[Routing Decision]: direct_model_response | single call")
+            reply = response.text
+        self.add_message("model", reply)
+        return reply
+
+    async def route_decision_async(self,user_input: str):
+        self.decided_locally = False
+        if local_router_enabled:
+            request_type, confidence, source = local_router.route(user_input)
+            if request_type:
+                print(f"[Routing Decision]: {request_type} | Confidence: {confidence} | local {source}")
+                self.decided_locally = True  # same in both modes: not part of the A/B numbers
+                return request_type
+        if self.routing_mode == "single_call":
+            return "single_call"
+        start = time.perf_counter()
+        response = await self.LLMmodel.aio.models.generate_content(
+            model="gemini-2.5-flash",
+            contents = self.context("router"),
+            config=ROUTER_CONFIG
+        )
+        request_type, confidence = parse_routing_decision(response.text)
+        local_router.record(user_input, request_type, confidence, time.perf_counter() - start)
+        return request_type
+
+    async def route_request_async(self,user_input: str,current_datetime,lat,lon,Bearer_TOKEN):
+        """Async router call, same routing as route_request"""
+        print(f"in Router:")
+        request_type = await self.route_decision_async(user_input)
+
+        if(request_type=="tool_call"):
+            return await self.tool_call_async(user_input,current_datetime,lat,lon,Bearer_TOKEN)
+        if(request_type=="single_call"):
+            return await self.single_call_response_async(user_input,current_datetime,lat,lon,Bearer_TOKEN)
+        return await self.direct_model_response_async()
+
+    async def generate_response_async(self, user_message,location,Bearer_TOKEN):
+            current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            try:
+                start = time.perf_counter()
+                self.add_message("user", user_message)
+                result = await self.route_request_async(user_message,current_datetime,location.get("latitude"),location.get("longitude"),Bearer_TOKEN)
+                if not self.decided_locally:
+                    record_turn(self.routing_mode, time.perf_counter() - start)
+                return result
+            except Exception as e:
+                print(f"❌error:",e)
+                return "error, please try again"
+
+
+# -------------------------------------------------------
+# 🔵 STREAMING PIPELINE (/chat/stream)
+# -------------------------------------------------------
+# Same routing as the async pipeline, but the final generation
+# (direct reply or weather summary) is streamed chunk by chunk.
+# The full reply is appended to self.messages once the stream
+# is finished, so history looks exactly like a normal turn.
+# The append sits in a finally: when the client disconnects the
+# generator is cancelled mid-loop, and whatever was generated so
+# far still answers the user message (no dangling user turn).
+# -------------------------------------------------------
+    def add_streamed_reply(self, reply):
+        self.add_message("model", reply or "(reply interrupted)")
+
+    async def stream_direct_model_response_async(self):
+        reply = ""
+        try:
+            async for chunk in await self.LLMmodel.aio.models.generate_content_stream(
+                model="gemini-2.5-flash",
+                contents = self.context("chat"),
+            ):
+                if chunk.text:
+                    reply += chunk.text
+                    yield chunk.text
+        finally:
+            self.add_streamed_reply(reply)
+
+    async def stream_tool_call_async(self,userInput,current_datetime,lat,lon,Bearer_TOKEN):
+        response = await self.LLMmodel.aio.models.generate_content(
+            model="gemini-2.5-flash",
+            contents = self.context("tool"),
+            config=self.config
+        )
+        part = response.candidates[0].content.parts[0]
+        function_call = part.function_call
+        if not function_call:
+            # 🔵 TOOL CALL FALLBACK → stream a rephrased answer
+            print(f"[Fallback Triggered]: Tool call predicted but not present in model response")
+            self.add_message("user", rephrase_prompt(part.text or userInput))
+            async for token in self.stream_direct_model_response_async():
+                yield token
+            return
+
+        async for token in self.stream_function_call_async(function_call,userInput,current_datetime,lat,lon,Bearer_TOKEN):
+            yield token
+
+    async def stream_function_call_async(self,function_call,userInput,current_datetime,lat,lon,Bearer_TOKEN):
+        if function_call.name.lower() == "weather_request":
+            reply = ""
+            try:
+                async for token in weather_tool.stream_weather_response_async(userInput,current_datetime,lat,lon):
+                    reply += token
+                    yield token
+            finally:
+                self.add_streamed_reply(reply)
+            return
+        # Gmail results are not generated token by token, send them in one piece
+        try:
+            reply = await self.call_function_async(function_call.name,function_call.args,userInput,current_datetime,lat,lon,Bearer_TOKEN)
+        except BaseException:
+            self.add_streamed_reply("")
+            raise
+        if reply is None:
+            print(f"[Fallback Triggered]: no tool named {function_call.name}")
+            async for token in self.stream_direct_model_response_async():
+                yield token
+            return
+        # in history before the yield, a disconnect can't lose it
+        self.add_message("model", reply)
+        yield reply
+
+    async def stream_single_call_async(self,userInput,current_datetime,lat,lon,Bearer_TOKEN):
+        # direct answers stream straight through; a function call switches to the tool
+        reply = ""
+        function_call = None
+        try:
+            async for chunk in await self.LLMmodel.aio.models.generate_content_stream(
+                model="gemini-2.5-flash",
+                contents = self.context("chat"),
+                config=self.config
+            ):
+                parts = chunk.candidates[0].content.parts if chunk.candidates and chunk.candidates[0].content else None
+                function_call = next((p.function_call for p in parts or [] if p.function_call), None)
+                if function_call:
+                    break
+                if chunk.text:
+                    reply += chunk.text
+                    yield chunk.text
+        finally:
+            if not function_call:
+                self.add_streamed_reply(reply)
+        if function_call:
+            # the tool stream records its own reply
+            print(f"[Routing Decision]: tool_call | single call ({function_call.name})")
+            async for token in self.stream_function_call_async(function_call,userInput,current_datetime,lat,lon,Bearer_TOKEN):
+                yield token
+
+    async def stream_response_async(self, user_message,location,Bearer_TOKEN):
+        """Async generator yielding the reply to user_message as text chunks."""
+        current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        lat, lon = location.get("latitude"), location.get("longitude")
+        try:
+            self.add_message("user", user_message)
+            print(f"in Router:")
+            request_type = await self.route_decision_async(user_message)
+            if request_type == "tool_call":
+                stream = self.stream_tool_call_async(user_message,current_datetime,lat,lon,Bearer_TOKEN)
+            elif request_type == "single_call":
+                stream = self.stream_single_call_async(user_message,current_datetime,lat,lon,Bearer_TOKEN)
+            else:
+                stream = self.stream_direct_model_response_async()
+            async for token in stream:
+                yield token
+        except Exception as e:
+            print(f"❌error:",e)
+            yield "error, please try again"
+
+
+# -------------------------------------------------------
+# 🔵 SHARED HELPERS (sync + async pipelines)
+# -------------------------------------------------------
+ROUTER_CONFIG = {
+    # "system_instruction"=SYSTEM_INSTRUCTION
+    "response_mime_type": "application/json",
+    "response_schema": RequestType,
+}
+
+# turns + total latency per routing mode, for A/B comparison (/router/stats)
+routing_mode_stats = defaultdict(Counter)
+
+def pick_routing_mode():
+    if routing_mode == "ab":
+        return "single_call" if random.random() < routing_ab_ratio else "router"
+    return routing_mode
+
+def record_turn(mode, latency):
+    routing_mode_stats[mode]["turns"] += 1
+    routing_mode_stats[mode]["total_latency"] += latency
+
+def routing_stats():
+    return {
+        mode: {
+            "turns": stats["turns"],
+            "avg_turn_latency_ms": 1000 * stats["total_latency"] / stats["turns"] if stats["turns"] else 0.0,
+        }
+        for mode, stats in list(routing_mode_stats.items())
+    }
+
+def parse_routing_decision(text):
+    result = json.loads(text)
+    print(f"result "+str(result))
+    request_type = result.get("request_type")
+    description = result.get("description", "No description provided")
+    confidence_score = result.get("confidence_score")
+    print(f"[Routing Decision]: {request_type} | Confidence: {confidence_score}")
+    return request_type, confidence_score
+
+def rephrase_prompt(fallback_text):
+    # Prepare a rephrase instruction for the LLM
+    return (
+        f"The following response was generated as a fallback from a tool call:\n\n{fallback_text}\n\n"
+        f"Your task: Either improve and rephrase this message to sound natural, conversational, and helpful, "
+        f"OR if you are able to answer the user's query more accurately yourself, do so instead of just rephrasing. "
+        f"Make sure the response is friendly and clear."
+    )
+
 # user_message = input("enter you request: ")
 # location = { "latitude": 29.9866, "longitude": 31.4406 }            
-# print(Model().generate_response(user_message,location))
\ No newline at end of file
+# print(Model().generate_response(user_message,location))
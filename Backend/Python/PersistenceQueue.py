@@ -0,0 +1,249 @@
+import hashlib
+import heapq
+import json
+import os
+import random
+import threading
+import sys
+import time
+from datetime import datetime
+import HttpClient
+from dotenv import load_dotenv
+
+load_dotenv()
+node_port = os.getenv("NODE_PORT")
+HISTORY_URL = os.getenv("HISTORY_APPEND_URL", f"http://localhost:{node_port}/api/v1/fastapi/append-chat-history")
+QUEUE_WORKERS = int(os.getenv("HISTORY_QUEUE_WORKERS", "4"))
+QUEUE_MAX_RETRIES = int(os.getenv("HISTORY_QUEUE_MAX_RETRIES", "6"))
+QUEUE_BASE_BACKOFF = float(os.getenv("HISTORY_QUEUE_BASE_BACKOFF", "2"))   # seconds
+QUEUE_MAX_BACKOFF = float(os.getenv("HISTORY_QUEUE_MAX_BACKOFF", "300"))  # seconds
+# outside the source tree: the file holds chat content (owner-only permissions, see _dead_letter)
+DEAD_LETTER_PATH = os.getenv("HISTORY_DEAD_LETTER", os.path.join(os.path.expanduser("~"), ".ai_assistant", "history_dead_letter.jsonl"))
+
+# retrying these cannot help (bad payload / expired or invalid Bearer token)
+PERMANENT_FAILURES = {400, 401, 403, 404}
+
+
+def token_id(Token):
+    """Stable, non-reversible id of a Bearer token: what the dead-letter file stores instead of the token."""
+    return hashlib.sha256(Token.encode()).hexdigest()[:32]
+
+
+def post_history(Bearer_TOKEN, batch):
+    """POST a batch of {"role", "content"} messages to the Node append endpoint, returns the status."""
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": Bearer_TOKEN
+    }
+    response = HttpClient.post(HISTORY_URL, data=json.dumps({"history": batch}), headers=headers)
+    return response.status_code
+
+
+# -------------------------------------------------------
+# 🔵 WRITE-BEHIND HISTORY QUEUE
+# -------------------------------------------------------
+# enqueue(Token, messages) is O(1) and never touches the
+# network, so session eviction can drop the session at once.
+# - batching: everything queued for one token is coalesced
+#   into a single request (one in flight per token, which
+#   also keeps the messages in order)
+# - bounded worker pool sends the batches
+# - retry with exponential backoff + jitter on failures
+# - after QUEUE_MAX_RETRIES (or a permanent 4xx) the batch is
+#   spilled to a JSONL dead-letter file instead of kept in RAM
+#
+# Dead letters store token_id(Token) (a hash), never the
+# token, in an owner-only (0600) file at HISTORY_DEAD_LETTER.
+# Replay them once a valid token of that user is available:
+#   python PersistenceQueue.py replay "Bearer <token>"
+#     → records of that very token
+#   python PersistenceQueue.py replay "Bearer <new token>" <token_id>
+#     → records of an older token of the same user
+# Replayed records go through the queue again; what still
+# fails is dead-lettered again, the rest leaves the file.
+# -------------------------------------------------------
+class WriteBehindQueue:
+    def __init__(self, send=post_history, workers=QUEUE_WORKERS, max_retries=QUEUE_MAX_RETRIES,
+                 base_backoff=QUEUE_BASE_BACKOFF, max_backoff=QUEUE_MAX_BACKOFF, dead_letter_path=DEAD_LETTER_PATH):
+        self.send = send
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.dead_letter_path = dead_letter_path
+        # Token -> {"messages": queued, "in_flight": being sent, "attempts": failures so far, "scheduled": in heap}
+        self._records = {}
+        self._ready = []  # heap of (ready_at, seq, Token)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._dead_letter_lock = threading.Lock()
+        self.stats = {"enqueued": 0, "sent_batches": 0, "sent_messages": 0, "retries": 0, "dead_lettered": 0}
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"history-writer-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def enqueue(self, Token, messages):
+        if not messages:
+            return
+        with self._cond:
+            record = self._records.setdefault(Token, {"messages": [], "in_flight": None, "attempts": 0, "scheduled": False})
+            record["messages"].extend(messages)
+            self.stats["enqueued"] += len(messages)
+            if record["in_flight"] is None and not record["scheduled"]:
+                self._schedule(Token, record, 0)
+
+    def pending(self, Token):
+        """Messages for Token that are not persisted yet (in flight or queued), oldest first."""
+        with self._cond:
+            record = self._records.get(Token)
+            if record is None:
+                return []
+            return list(record["in_flight"] or []) + list(record["messages"])
+
+    def backlog(self):
+        with self._cond:
+            return sum(len(r["messages"]) + len(r["in_flight"] or []) for r in self._records.values())
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far was delivered or dead-lettered."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._records:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    # ---- internals (call with self._cond held) ----
+    def _schedule(self, Token, record, delay):
+        record["scheduled"] = True
+        self._seq += 1
+        heapq.heappush(self._ready, (time.monotonic() + delay, self._seq, Token))
+        self._cond.notify_all()  # flush() waits on the same condition
+
+    def _backoff(self, attempts):
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _next_batch(self):
+        while not self._stopped:
+            if self._ready:
+                ready_at, _, Token = self._ready[0]
+                wait = ready_at - time.monotonic()
+                if wait <= 0:
+                    heapq.heappop(self._ready)
+                    record = self._records[Token]
+                    record["scheduled"] = False
+                    record["in_flight"], record["messages"] = record["messages"], []
+                    return Token, record
+                self._cond.wait(wait)
+            else:
+                self._cond.wait()
+        return None, None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                Token, record = self._next_batch()
+            if Token is None:
+                return
+            batch = record["in_flight"]
+            try:
+                status = self.send(Token, batch)
+            except Exception as e:
+                print(f"❌ Error saving history batch: {e}")
+                status = None
+            self._finish(Token, record, batch, status)
+
+    def _finish(self, Token, record, batch, status):
+        spill = None
+        with self._cond:
+            record["in_flight"] = None
+            if status == 200:
+                record["attempts"] = 0
+                self.stats["sent_batches"] += 1
+                self.stats["sent_messages"] += len(batch)
+            else:
+                record["attempts"] += 1
+                record["messages"][:0] = batch  # keep order for the retry
+                if status in PERMANENT_FAILURES or record["attempts"] > self.max_retries:
+                    spill, record["messages"] = record["messages"], []
+                    record["in_flight"] = []  # busy until written, so flush() waits for the file
+                    record["attempts"] = 0
+                    self.stats["dead_lettered"] += len(spill)
+                else:
+                    self.stats["retries"] += 1
+                    print(f"history save failed ({status}), retry {record['attempts']}/{self.max_retries}")
+                    self._schedule(Token, record, self._backoff(record["attempts"]))
+                    return
+            if not spill:
+                self._settle(Token, record)
+                return
+        self._dead_letter(Token, spill, status)
+        with self._cond:
+            record["in_flight"] = None
+            self._settle(Token, record)
+
+    def _settle(self, Token, record):
+        """Nothing in flight: send what was queued meanwhile, or forget the token. Call with self._cond held."""
+        if record["messages"]:
+            self._schedule(Token, record, 0)
+        else:
+            del self._records[Token]
+            self._cond.notify_all()  # wake flush()
+
+    def _dead_letter(self, Token, messages, status):
+        print(f"❌ history batch of {len(messages)} messages moved to dead letter ({status})")
+        try:
+            with self._dead_letter_lock, self._open_dead_letter("a") as f:
+                f.write(json.dumps({
+                    "user": token_id(Token),
+                    "status": status,
+                    "failed_at": datetime.now().isoformat(),
+                    "history": messages,
+                }) + "\n")
+        except OSError as e:
+            print(f"❌ Error writing dead letter file: {e}")
+
+    def _open_dead_letter(self, mode):
+        directory = os.path.dirname(os.path.abspath(self.dead_letter_path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if mode == "a" else os.O_TRUNC)
+        return os.fdopen(os.open(self.dead_letter_path, flags, 0o600), mode, encoding="utf-8")
+
+    def replay(self, Token, user=None):
+        """Re-enqueue the dead letters of token_id(Token) (or of user, an older token of the same user) under Token."""
+        user = user or token_id(Token)
+        with self._dead_letter_lock:
+            try:
+                with open(self.dead_letter_path, encoding="utf-8") as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+            except FileNotFoundError:
+                return 0
+            keep = [r for r in records if r.get("user") != user]
+            replayed = [r for r in records if r.get("user") == user]
+            if replayed:
+                with self._open_dead_letter("w") as f:
+                    f.writelines(json.dumps(r) + "\n" for r in keep)
+        for record in replayed:
+            self.enqueue(Token, record["history"])
+        return sum(len(r["history"]) for r in replayed)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4) or sys.argv[1] != "replay":
+        print('usage: python PersistenceQueue.py replay "Bearer <token>" [token_id]')
+        sys.exit(2)
+    queue = WriteBehindQueue()
+    count = queue.replay(sys.argv[2], sys.argv[3] if len(sys.argv) == 4 else None)
+    delivered = queue.flush(timeout=QUEUE_MAX_BACKOFF * QUEUE_MAX_RETRIES)
+    print(f"replayed {count} messages, {'all delivered or dead-lettered again' if delivered else 'still pending (timeout)'}")
@@ -0,0 +1,210 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dotenv import load_dotenv
+
+load_dotenv()
+ROUTER_THRESHOLD = float(os.getenv("LOCAL_ROUTER_THRESHOLD", "0.85"))
+# opt-in: the log holds raw user messages, so it is only written when a path is set
+# (keep it outside the source tree, e.g. ~/.ai_assistant/router_decisions.jsonl; created 0600)
+ROUTER_LOG_PATH = os.getenv("LOCAL_ROUTER_LOG") or None
+ROUTER_LOG_MAX_LINES = int(os.getenv("LOCAL_ROUTER_LOG_MAX_LINES", "5000"))  # oldest half dropped beyond this
+ROUTER_MIN_TRAINING = int(os.getenv("LOCAL_ROUTER_MIN_TRAINING", "50"))
+
+
+# -------------------------------------------------------
+# 🔵 KEYWORD / REGEX RULES
+# -------------------------------------------------------
+# (pattern, request_type, confidence). First match wins, so
+# the tool rules come first: "hi, what's the weather?" is a
+# tool call even though it starts with a greeting.
+# Words with everyday meanings (degrees, cold, rain, mail)
+# only count in a weather / email phrasing: "I have a cold
+# today" or "mail the package" stay with the other stages.
+# -------------------------------------------------------
+RULES = [
+    # weather tool
+    (re.compile(r"\b(weather|forecast|temperature|humidity|celsius|fahrenheit)\b", re.I), "tool_call", 0.95),
+    (re.compile(r"\b(how many degrees|degrees (outside|today|tomorrow|tonight|now)|need an umbrella)\b", re.I), "tool_call", 0.95),
+    (re.compile(r"\b(will it|is it|going to|gonna)\s+(be\s+)?(rain(ing|y)?|snow(ing|y)?|sunny|windy|humid|hot|cold|warm|chilly)\b", re.I), "tool_call", 0.9),
+    (re.compile(r"\b(hot|cold|warm|chilly|raining|snowing|sunny|windy)\s+outside\b", re.I), "tool_call", 0.9),
+    # email tool
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "tool_call", 0.97),
+    (re.compile(r"\b(e-?mails?|inbox|gmail)\b", re.I), "tool_call", 0.95),
+    (re.compile(r"\b(my|new|unread|any|latest|last|check|read)\s+(new\s+|unread\s+)?mails?\b", re.I), "tool_call", 0.9),
+    # questions about the assistant's own tools / features
+    (re.compile(r"\b(what can you do|what are you able to|your (capabilities|features|tools|abilities)|what (features|tools) do you have)\b", re.I), "tool_call", 0.95),
+    # pure conversation
+    (re.compile(r"^\s*(hi|hello|hey|hiya|yo|salam|assalamu alaikum|good (morning|afternoon|evening|night))\b[\s!.,?]*(there|zakai)?[\s!.,?]*$", re.I), "direct_model_response", 0.97),
+    (re.compile(r"^\s*(thanks|thank you|thx|ok(ay)?|cool|great|nice|bye|goodbye|see you)\b[\w\s!.,]{0,25}$", re.I), "direct_model_response", 0.95),
+    (re.compile(r"\b(how are you|who are you|what('?s| is) your name|tell me a joke|make me laugh)\b", re.I), "direct_model_response", 0.9),
+]
+
+
+# -------------------------------------------------------
+# 🔵 N-GRAM NAIVE BAYES CLASSIFIER
+# -------------------------------------------------------
+# Trained on the decisions the LLM router logged before.
+# Features: lowercase word unigrams + bigrams. Only used once
+# it has seen ROUTER_MIN_TRAINING examples.
+# -------------------------------------------------------
+def ngrams(text):
+    words = re.findall(r"[\w']+", text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class NGramClassifier:
+    def __init__(self):
+        self.class_counts = Counter()
+        self.feature_counts = defaultdict(Counter)
+        self.feature_totals = Counter()
+        self.vocabulary = set()
+
+    def __len__(self):
+        return sum(self.class_counts.values())
+
+    def learn(self, text, label):
+        features = ngrams(text)
+        self.class_counts[label] += 1
+        self.feature_counts[label].update(features)
+        self.feature_totals[label] += len(features)
+        self.vocabulary.update(features)
+
+    def predict(self, text):
+        """Return (label, posterior probability) or (None, 0.0) if untrained."""
+        if not self.class_counts:
+            return None, 0.0
+        features = ngrams(text)
+        total = len(self)
+        vocab = len(self.vocabulary) + 1
+        scores = {}
+        for label, count in self.class_counts.items():
+            score = math.log(count / total)
+            denominator = self.feature_totals[label] + vocab
+            for feature in features:
+                score += math.log((self.feature_counts[label][feature] + 1) / denominator)
+            scores[label] = score
+        best = max(scores, key=scores.get)
+        # softmax over log scores → posterior of the best class
+        top = scores[best]
+        norm = sum(math.exp(s - top) for s in scores.values())
+        return best, 1.0 / norm
+
+
+# -------------------------------------------------------
+# 🔵 LOCAL ROUTER
+# -------------------------------------------------------
+# route(text) → (request_type, confidence, source) where source
+# is "rule" or "classifier"; request_type is None when the local
+# stage is not confident enough and the LLM router must decide.
+# record(text, request_type) logs an LLM decision for training.
+# -------------------------------------------------------
+class LocalRouter:
+    def __init__(self, log_path=ROUTER_LOG_PATH, threshold=ROUTER_THRESHOLD, min_training=ROUTER_MIN_TRAINING):
+        self.log_path = log_path
+        self.threshold = threshold
+        self.min_training = min_training
+        self.classifier = NGramClassifier()
+        self._lock = threading.Lock()
+        self.counters = Counter()
+        self.latency = Counter()  # total seconds per stage
+        self._log_lines = 0
+        self._load_log()
+
+    def _load_log(self):
+        if not self.log_path or not os.path.exists(self.log_path):
+            return
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._log_lines += 1
+                    try:
+                        entry = json.loads(line)
+                        self.classifier.learn(entry["text"], entry["request_type"])
+                    except (ValueError, KeyError):
+                        continue
+            print(f"[Local Router]: trained on {len(self.classifier)} logged decisions")
+        except OSError as e:
+            print(f"❌ Error loading router log: {e}")
+
+    def route(self, text):
+        start = time.perf_counter()
+        decision, confidence, source = None, 0.0, None
+        for pattern, request_type, rule_confidence in RULES:
+            if pattern.search(text):
+                decision, confidence, source = request_type, rule_confidence, "rule"
+                break
+        if decision is None:
+            with self._lock:
+                if len(self.classifier) >= self.min_training:
+                    decision, confidence = self.classifier.predict(text)
+                    source = "classifier"
+        if confidence < self.threshold:
+            decision, source = None, None
+
+        with self._lock:
+            self.counters["turns"] += 1
+            self.counters[f"hits_{source}" if source else "llm_fallbacks"] += 1
+            self.latency["local"] += time.perf_counter() - start
+        return decision, confidence, source
+
+    def record(self, text, request_type, confidence=None, llm_latency=None):
+        """Log a decision made by the LLM router and learn from it."""
+        with self._lock:
+            if llm_latency is not None:
+                self.counters["llm_calls"] += 1
+                self.latency["llm"] += llm_latency
+            if request_type not in ("tool_call", "direct_model_response"):
+                return
+            # only learn from decisions the LLM itself was sure about
+            if confidence is not None and confidence < self.threshold:
+                return
+            self.classifier.learn(text, request_type)
+            if not self.log_path:
+                return
+            try:
+                with self._open_log("a") as f:
+                    f.write(json.dumps({"text": text, "request_type": request_type}) + "\n")
+                self._log_lines += 1
+                if self._log_lines > ROUTER_LOG_MAX_LINES:
+                    self._trim_log()
+            except OSError as e:
+                print(f"❌ Error writing router log: {e}")
+
+    def _open_log(self, mode):
+        # owner-only: the log contains what users typed
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), mode=0o700, exist_ok=True)
+        flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if mode == "a" else os.O_TRUNC)
+        return os.fdopen(os.open(self.log_path, flags, 0o600), mode, encoding="utf-8")
+
+    def _trim_log(self):
+        """Keep the newest half of ROUTER_LOG_MAX_LINES. Call with self._lock held."""
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()[-(ROUTER_LOG_MAX_LINES // 2):]
+        with self._open_log("w") as f:
+            f.writelines(lines)
+        self._log_lines = len(lines)
+
+    def stats(self):
+        with self._lock:
+            turns = self.counters["turns"]
+            local_hits = self.counters["hits_rule"] + self.counters["hits_classifier"]
+            fallbacks = self.counters["llm_fallbacks"]
+            llm_calls = self.counters["llm_calls"]  # fallbacks in single_call mode skip the router call
+            return {
+                "turns": turns,
+                "rule_hits": self.counters["hits_rule"],
+                "classifier_hits": self.counters["hits_classifier"],
+                "llm_fallbacks": fallbacks,
+                "hit_rate": local_hits / turns if turns else 0.0,
+                # every local hit is one Gemini router call saved
+                "router_calls_saved_per_turn": local_hits / turns if turns else 0.0,
+                "avg_local_latency_ms": 1000 * self.latency["local"] / turns if turns else 0.0,
+                "llm_router_calls": llm_calls,
+                "avg_llm_latency_ms": 1000 * self.latency["llm"] / llm_calls if llm_calls else 0.0,
+                "training_examples": len(self.classifier),
+            }
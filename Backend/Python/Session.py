@@ -1,52 +1,83 @@
 from Model import Model
+from SessionStore import SessionStore
+from Summarizer import summarizer
+from PersistenceQueue import WriteBehindQueue
+from Tools.CredentialCache import credential_cache
 from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
 
 
 class Session:
 
-    sessions = []
+    # Token -> {"Token", "instance", "last_active", "lock", "in_use", "ready"}, ordered by last_active
+    sessions = SessionStore()
+    # unsaved history deltas on their way to the Node backend
+    history_queue = WriteBehindQueue()
 
+    # -------------------------------------------------------
+    # 🔵 USER SESSION (per-token locking)
+    # -------------------------------------------------------
+    # Usage:
+    #   async with Session.user_session(token, location) as model_instance:
+    #       ...
+    # Turns of the same user are serialized on the entry lock,
+    # different users run fully in parallel. History is loaded
+    # once, by whoever gets the lock first.
+    # -------------------------------------------------------
     @staticmethod
-    def user_chatBot_instance(Token,location = { "latitude": 29.9866, "longitude": 31.4406 }):
-        # Find if user already exists
+    @asynccontextmanager
+    async def user_session(Token,location = { "latitude": 29.9866, "longitude": 31.4406 }):
         # Token = Token.strip().replace("Bearer ", "")
-        user_session = next((u for u in Session.sessions if u["Token"] == Token), None)
-        if user_session is None :
+        user_session, created = Session.sessions.checkout(Token, Model)
+        if created:
             print("creating new instance")
-            new_instance = {"Token": Token, "instance": Model(), "last_active": datetime.now()}
-            Session.sessions.append(new_instance)
+        try:
+            async with user_session["lock"]:
+                if not user_session["ready"]:
+                    current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    await user_session["instance"].init_user_history_async(location, current_datetime, Token)
+                    # messages of an evicted session that are still queued for saving
+                    for message in Session.history_queue.pending(Token):
+                        user_session["instance"].add_message(message["role"], message["content"], persist=False)
+                    user_session["ready"] = True
+                yield user_session["instance"]
+        finally:
+            Session.sessions.release(user_session)
+            if user_session["ready"]:
+                # fold old turns into the running summary in the background
+                summarizer.schedule(user_session["instance"])
 
-            # ⚠️⚠️ Initialize user history from DB could be done here insted of in Model class
-            current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-            status = new_instance["instance"].init_user_history(location,current_datetime,Token)
-            # print(sessions[0])
-            return new_instance["instance"]
-        else:
-            # Update last_active timestamp
-            user_session["last_active"] = datetime.now()
-            return user_session["instance"]
-
-
-    # ⚠️⚠️ could be modified for better time complexity by remvoing the final loop 
+    # Only sessions that actually expired are visited: the store is
+    # ordered by last_active so the scan stops at the first active one.
+    # Sessions in use by a request are skipped and retried next sweep.
+    # Eviction is O(1): the unsaved delta goes to the write-behind
+    # queue and memory is reclaimed even if the Node backend is down.
     @staticmethod
     def remove_idle_sessions():
         print("in")
-        now = datetime.now()
         timeout_minutes=1
-        to_remove = []
-        for s in Session.sessions: 
-            if now - s["last_active"] > timedelta(minutes=timeout_minutes): #seconds
-                chatBot_instance = s["instance"]
-                Bearer_TOKEN = s["Token"]
-                # token = authorization.split(" ")[1]  # If format is "Bearer <token>"
-
-                # ⚠️⚠️to be done save history before removal
-                status = chatBot_instance.save_history(Bearer_TOKEN)
-                print(status)
-                if status==200:
-                    to_remove.append(s)
-        for s in to_remove:
-            Session.sessions.remove(s)
+        for s in Session.sessions.claim_expired(timedelta(minutes=timeout_minutes)): #seconds
+            try:
+                if s["ready"]:  # history never loaded → nothing to save
+                    Session.history_queue.enqueue(s["Token"], s["instance"].take_pending())
+            finally:
+                # dropped only if no request picked the session up meanwhile
+                if Session.sessions.release(s, touch=False, evict=True):
+                    credential_cache.invalidate(s["Token"])
         print(len(Session.sessions))
-        
+
+
+    # Periodic checkpoint: queue the not-yet-saved messages of every
+    # live session, so a crash loses at most one interval of chat.
+    @staticmethod
+    def checkpoint_sessions():
+        queued = 0
+        for s in Session.sessions.snapshot():
+            if not s["ready"]:
+                continue
+            batch = s["instance"].take_pending()
+            if batch:
+                Session.history_queue.enqueue(s["Token"], batch)
+                queued += 1
+        print(f"checkpointed {queued} sessions")
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+# -------------------------------------------------------
+# 🔵 SESSION STORE
+# -------------------------------------------------------
+# Hash-indexed registry of live chat sessions:
+# - dict lookup by Bearer token → O(1) per request
+# - insertion order == last_active order (touch moves the
+#   entry to the end), so the oldest session is always first
+# - the sweep walks from the front and stops at the first
+#   session that is still active → O(expired) per sweep
+#
+# Thread safety:
+# - every structural change happens under one RLock, so the
+#   APScheduler thread and the FastAPI handlers can share it
+# - each entry carries an asyncio.Lock that serializes the
+#   turns of one user, and an in_use counter so the sweeper
+#   never evicts a session that a request is working on
+# -------------------------------------------------------
+class SessionStore:
+    def __init__(self):
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, Token):
+        return Token in self._sessions
+
+    def get(self, Token, touch=True):
+        """Return the session entry for Token (or None), refreshing last_active."""
+        with self._lock:
+            entry = self._sessions.get(Token)
+            if entry is not None and touch:
+                self.touch(Token)
+            return entry
+
+    def add(self, Token, instance, now=None):
+        with self._lock:
+            entry = {
+                "Token": Token,
+                "instance": instance,
+                "last_active": now or datetime.now(),
+                "lock": asyncio.Lock(),  # serializes turns of the same user
+                "in_use": 0,             # requests (or the sweeper) currently holding the entry
+                "ready": False,          # history loaded from the Node backend
+            }
+            self._sessions[Token] = entry
+            self._sessions.move_to_end(Token)
+            return entry
+
+    def touch(self, Token, now=None):
+        with self._lock:
+            entry = self._sessions[Token]
+            entry["last_active"] = now or datetime.now()
+            self._sessions.move_to_end(Token)
+
+    def remove(self, Token):
+        with self._lock:
+            return self._sessions.pop(Token, None)
+
+    # -------------------------------------------------------
+    # 🔵 CHECKOUT / RELEASE
+    # -------------------------------------------------------
+    # A request checks an entry out before awaiting its lock and
+    # releases it when done; the sweeper claims expired entries
+    # the same way, so neither side can drop the other's session.
+    # -------------------------------------------------------
+    def checkout(self, Token, factory):
+        """Get or create the entry for Token and mark it in use. Returns (entry, created)."""
+        with self._lock:
+            entry = self._sessions.get(Token)
+            created = entry is None
+            if created:
+                entry = self.add(Token, factory())
+            else:
+                self.touch(Token)
+            entry["in_use"] += 1
+            return entry, created
+
+    def release(self, entry, touch=True, evict=False):
+        """Undo a checkout. With evict=True the entry is dropped if nobody else holds it; returns whether it was."""
+        with self._lock:
+            entry["in_use"] -= 1
+            Token = entry["Token"]
+            if self._sessions.get(Token) is not entry:
+                return False
+            if evict and entry["in_use"] == 0:
+                self._sessions.pop(Token)
+                return True
+            if touch:
+                self.touch(Token)
+            return False
+
+    def snapshot(self):
+        """Return a list of all entries (for periodic jobs such as history checkpoints)."""
+        with self._lock:
+            return list(self._sessions.values())
+
+    def expired(self, timeout: timedelta, now=None):
+        """Return idle entries older than timeout, oldest first, without removing them."""
+        now = now or datetime.now()
+        result = []
+        with self._lock:
+            for entry in self._sessions.values():
+                if now - entry["last_active"] <= timeout:
+                    break
+                if entry["in_use"] == 0:
+                    result.append(entry)
+        return result
+
+    def claim_expired(self, timeout: timedelta, now=None):
+        """Like expired(), but checks every returned entry out; release each one afterwards."""
+        with self._lock:
+            entries = self.expired(timeout, now)
+            for entry in entries:
+                entry["in_use"] += 1
+            return entries
@@ -0,0 +1,62 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+SUMMARY_TRIGGER_MESSAGES = int(os.getenv("SUMMARY_TRIGGER_MESSAGES", "30"))
+SUMMARY_KEEP_RECENT = int(os.getenv("SUMMARY_KEEP_RECENT", "10"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+
+
+def summary_prompt(previous_summary, transcript):
+    return (
+        "You maintain a running summary of a conversation between a user and ZakAi, their personal assistant.\n"
+        "Merge the previous summary and the new messages into one updated summary. Keep facts about the user "
+        "(names, preferences, plans, dates, places, email addresses), open tasks and decisions. Drop small talk. "
+        "Write at most 200 words in the third person, no preamble.\n\n"
+        f"--- Previous Summary ---\n{previous_summary or '(none)'}\n\n"
+        f"--- New Messages ---\n{transcript}"
+    )
+
+
+# -------------------------------------------------------
+# 🔵 BACKGROUND CONVERSATION SUMMARIZER
+# -------------------------------------------------------
+# Once a session's history crosses SUMMARY_TRIGGER_MESSAGES,
+# the oldest turns (all but the SUMMARY_KEEP_RECENT newest)
+# are folded into Model.summary by a worker thread, off the
+# request path. At most one job per session is in flight.
+# -------------------------------------------------------
+class ConversationSummarizer:
+    def __init__(self, workers=SUMMARY_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summarizer")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def needs_summary(model):
+        return len(model.messages) - 1 > SUMMARY_TRIGGER_MESSAGES
+
+    def schedule(self, model):
+        """Queue a summarization for model if it needs one and none is running."""
+        if not self.needs_summary(model):
+            return False
+        with self._lock:
+            if id(model) in self._in_flight:
+                return False
+            self._in_flight.add(id(model))
+        self.executor.submit(self._run, model)
+        return True
+
+    def _run(self, model):
+        try:
+            model.summarize_history(SUMMARY_KEEP_RECENT)
+        except Exception as e:
+            print(f"❌ Error summarizing history: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(id(model))
+
+
+summarizer = ConversationSummarizer()
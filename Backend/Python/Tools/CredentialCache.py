@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+import HttpClient
+from dotenv import load_dotenv
+
+load_dotenv()
+node_port = os.getenv("NODE_PORT")
+AUTH_DETAILS_URL = f"http://localhost:{node_port}/api/v1/fastapi/getUserAuthDetails"
+CREDENTIAL_CACHE_TTL = float(os.getenv("CREDENTIAL_CACHE_TTL", "900"))  # seconds, safety net only
+
+
+# -------------------------------------------------------
+# 🔵 CREDENTIAL CACHE (getUserAuthDetails)
+# -------------------------------------------------------
+# Keyed by the session's Bearer token. Holds what the email
+# tool needs from Node: is_authenticated, email, access_token,
+# refresh_token, access_token_expiry. Credentials only change
+# when Python writes them, so the writers keep the cache in
+# sync instead of every email turn asking Node again:
+# - /auth/callback            → invalidate(Token)
+# - refresh_google_token()    → update(Token, new access token)
+# - session eviction          → invalidate(Token)
+# The TTL only guards against changes made outside this process.
+# -------------------------------------------------------
+class CredentialCache:
+    def __init__(self, ttl=CREDENTIAL_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}  # Token -> (details, cached_at)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, Token):
+        with self._lock:
+            entry = self._entries.get(Token)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self._entries.pop(Token, None)
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return dict(entry[0])
+
+    def put(self, Token, details):
+        with self._lock:
+            self._entries[Token] = (dict(details), time.monotonic())
+
+    def update(self, Token, **fields):
+        """Patch a cached entry in place (e.g. after a token refresh); no-op if nothing is cached."""
+        with self._lock:
+            entry = self._entries.get(Token)
+            if entry is not None:
+                entry[0].update(fields)
+
+    def invalidate(self, Token):
+        with self._lock:
+            self._entries.pop(Token, None)
+
+
+credential_cache = CredentialCache()
+
+
+def _auth_headers(Bearer_TOKEN):
+    return {
+        "Content-Type": "application/json",
+        "Authorization": Bearer_TOKEN
+    }
+
+
+def get_auth_details(Bearer_TOKEN):
+    """Returns (status_code, details); a cache hit reports 200 without calling Node."""
+    details = credential_cache.get(Bearer_TOKEN)
+    if details is not None:
+        return 200, details
+    response = HttpClient.get(AUTH_DETAILS_URL, headers=_auth_headers(Bearer_TOKEN))
+    if response.status_code != 200:
+        return response.status_code, None
+    details = response.json()["data"]
+    credential_cache.put(Bearer_TOKEN, details)
+    return 200, details
+
+
+async def get_auth_details_async(Bearer_TOKEN):
+    details = credential_cache.get(Bearer_TOKEN)
+    if details is not None:
+        return 200, details
+    response = await HttpClient.aget(AUTH_DETAILS_URL, headers=_auth_headers(Bearer_TOKEN))
+    if response.status_code != 200:
+        return response.status_code, None
+    details = response.json()["data"]
+    credential_cache.put(Bearer_TOKEN, details)
+    return 200, details
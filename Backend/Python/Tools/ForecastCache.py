@@ -0,0 +1,139 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dotenv import load_dotenv
+
+load_dotenv()
+FORECAST_GRID_DEG = float(os.getenv("FORECAST_GRID_DEG", "0.05"))      # ~5 km cells
+FORECAST_TTL_CURRENT = float(os.getenv("FORECAST_TTL_CURRENT", "600"))  # seconds
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "2048"))     # entries
+
+
+def snap(value, grid=FORECAST_GRID_DEG):
+    return round(round(value / grid) * grid, 4)
+
+
+def expires_at(forecast_type, utc_offset_seconds=0, now=None):
+    """
+    current → now + FORECAST_TTL_CURRENT
+    hourly  → start of the next hour (location's local time)
+    daily   → next local midnight
+    """
+    now = time.time() if now is None else now
+    if forecast_type == "current":
+        return now + FORECAST_TTL_CURRENT
+    period = 3600 if forecast_type == "hourly" else 86400
+    local = now + utc_offset_seconds
+    return local - (local % period) + period - utc_offset_seconds
+
+
+# -------------------------------------------------------
+# 🔵 FORECAST CACHE
+# -------------------------------------------------------
+# Key: (lat, lon snapped to FORECAST_GRID_DEG, forecast_type,
+# timezone). Users in the same city share one entry, so the
+# Open-Meteo traffic follows the number of distinct places,
+# not the number of users.
+#
+# Single flight: the first caller for a missing key becomes
+# the leader and fetches; everyone else arriving meanwhile
+# waits on the leader's concurrent.futures.Future (sync
+# callers with .result(), async ones via asyncio.wrap_future).
+# Errors are passed to the waiters but never cached.
+# -------------------------------------------------------
+class ForecastCache:
+    def __init__(self, capacity=FORECAST_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = OrderedDict()  # key -> (payload, expires_at)
+        self._inflight = {}            # key -> Future
+        self._lock = threading.Lock()
+        self.stats_counters = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    @staticmethod
+    def key(lat, lon, forecast_type, timezone="auto"):
+        return (snap(lat), snap(lon), forecast_type, timezone)
+
+    def _lookup(self, key):
+        """Returns (payload, None) on a hit, (None, future) to wait on, or (None, None) to lead the fetch."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self.stats_counters["hits"] += 1
+                    return entry[0], None
+                del self._entries[key]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats_counters["coalesced"] += 1
+                return None, future
+            self.stats_counters["misses"] += 1
+            self._inflight[key] = Future()
+            return None, None
+
+    def _complete(self, key, forecast_type, data=None, error=None):
+        with self._lock:
+            future = self._inflight.pop(key)
+            if error is None:
+                self._entries[key] = (data, expires_at(forecast_type, data.get("utc_offset_seconds", 0)))
+                self._entries.move_to_end(key)
+                self._prune()
+        if error is None:
+            future.set_result(data)
+        else:
+            future.set_exception(error)
+
+    def get_or_fetch(self, key, fetch):
+        """fetch() → the Open-Meteo JSON (with utc_offset_seconds); called at most once per key at a time."""
+        data, future = self._lookup(key)
+        if data is not None:
+            return data
+        if future is not None:
+            return future.result()
+        try:
+            data = fetch()
+        except Exception as err:
+            self._complete(key, key[2], error=err)
+            raise
+        self._complete(key, key[2], data)
+        return data
+
+    async def aget_or_fetch(self, key, fetch):
+        """Same as get_or_fetch, fetch is a coroutine function."""
+        data, future = self._lookup(key)
+        if data is not None:
+            return data
+        if future is not None:
+            return await asyncio.wrap_future(future)
+        try:
+            data = await fetch()
+        except BaseException as err:  # incl. cancellation, so waiters are never left hanging
+            self._complete(key, key[2], error=err if isinstance(err, Exception) else RuntimeError("forecast fetch cancelled"))
+            raise
+        self._complete(key, key[2], data)
+        return data
+
+    def stats(self):
+        with self._lock:
+            lookups = self.stats_counters["hits"] + self.stats_counters["misses"] + self.stats_counters["coalesced"]
+            saved = self.stats_counters["hits"] + self.stats_counters["coalesced"]
+            return {
+                **self.stats_counters,
+                "hit_ratio": saved / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    # call with self._lock held: drop expired entries, then the oldest ones
+    def _prune(self):
+        if len(self._entries) <= self.capacity:
+            return
+        now = time.time()
+        for key in [k for k, (_, expiry) in self._entries.items() if expiry <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+
+forecast_cache = ForecastCache()
@@ -0,0 +1,172 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+# -------------------------------------------------------
+# 🔵 WMO WEATHER CODES (Open-Meteo "weathercode")
+# -------------------------------------------------------
+WMO_CODES = {
+    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
+    45: "Fog", 48: "Rime fog",
+    51: "Light drizzle", 53: "Drizzle", 55: "Dense drizzle", 56: "Freezing drizzle", 57: "Dense freezing drizzle",
+    61: "Light rain", 63: "Rain", 65: "Heavy rain", 66: "Freezing rain", 67: "Heavy freezing rain",
+    71: "Light snow", 73: "Snow", 75: "Heavy snow", 77: "Snow grains",
+    80: "Light showers", 81: "Showers", 82: "Violent showers", 85: "Snow showers", 86: "Heavy snow showers",
+    95: "Thunderstorm", 96: "Thunderstorm with hail", 99: "Thunderstorm with heavy hail",
+}
+
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MAX_HOURS = 48  # longest hourly window sent to the summary prompt
+
+
+def weather_label(code):
+    if code is None:
+        return "Unknown"
+    return WMO_CODES.get(int(code), f"Code {int(code)}")
+
+
+def _range(values, digits=0):
+    values = [v for v in values if v is not None]
+    if not values:
+        return "-"
+    low, high = round(min(values), digits), round(max(values), digits)
+    fmt = f"{{:.{digits}f}}"
+    return fmt.format(low) if low == high else f"{fmt.format(low)}–{fmt.format(high)}"
+
+
+def _local_now(data):
+    offset = timedelta(seconds=data.get("utc_offset_seconds", 0))
+    return (datetime.now(timezone.utc) + offset).replace(tzinfo=None)
+
+
+# -------------------------------------------------------
+# 🔵 TIME WINDOW FROM THE QUESTION
+# -------------------------------------------------------
+# Same cues as the intent rules: "tonight", "this afternoon",
+# "next 6 hours", "tomorrow", "friday", "weekend", "next 3 days".
+# No cue → next 24 hours (hourly) / all days (daily).
+# -------------------------------------------------------
+def hourly_window(text, now):
+    text = (text or "").lower()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    match = re.search(r"\b(?:next|in|within)\s+(\d+)\s+hours?\b", text)
+    if match:
+        return hour, hour + timedelta(hours=min(int(match.group(1)), MAX_HOURS))
+    if "tomorrow" in text:
+        start = today + timedelta(days=1)
+        for name, (a, b) in (("morning", (6, 12)), ("afternoon", (12, 18)), ("evening", (18, 24)), ("night", (18, 30))):
+            if name in text:
+                return start + timedelta(hours=a), start + timedelta(hours=b)
+        return start, start + timedelta(days=1)
+    for name, (a, b) in (("tonight", (18, 30)), ("this morning", (6, 12)), ("afternoon", (12, 18)),
+                         ("evening", (18, 24)), ("night", (18, 30))):
+        if name in text:
+            start, end = today + timedelta(hours=a), today + timedelta(hours=b)
+            if end > hour:
+                return max(start, hour), end
+    return hour, hour + timedelta(hours=24)
+
+
+def daily_window(text, today):
+    """Returns the list of dates (datetime.date) the question is about, or None for all days."""
+    text = (text or "").lower()
+    if "day after tomorrow" in text:
+        return [today + timedelta(days=2)]
+    if "tomorrow" in text:
+        return [today + timedelta(days=1)]
+    match = re.search(r"\b(?:next|coming)\s+(\d+)\s+days\b|\b(\d+)[- ]day\b", text)
+    if match:
+        days = int(match.group(1) or match.group(2))
+        return [today + timedelta(days=i) for i in range(days)]
+    if "weekend" in text:
+        # Friday–Sunday covers both the Fri/Sat and the Sat/Sun weekend;
+        # on a weekend day that is the rest of the current one
+        first = next(i for i in range(7) if (today + timedelta(days=i)).weekday() >= 4)
+        return [today + timedelta(days=i) for i in range(first, first + 3) if (today + timedelta(days=i)).weekday() >= 4]
+    named = [i for i, name in enumerate(DAY_NAMES) if re.search(rf"\b{name}\b", text)]
+    if named:
+        return [today + timedelta(days=(weekday - today.weekday()) % 7) for weekday in named]
+    if re.search(r"\btoday\b", text):
+        return [today]
+    return None
+
+
+# -------------------------------------------------------
+# 🔵 REDUCERS
+# -------------------------------------------------------
+# Turn the raw Open-Meteo section into a short table for the
+# summary prompt instead of pasting the full arrays:
+# - current → one row
+# - hourly  → the asked window in 3 h periods (6 h past 24 h)
+# - daily   → only the asked days
+# -------------------------------------------------------
+def reduce_current(data):
+    current = data["current"]
+    units = data.get("current_units", {})
+    return (
+        f"Current weather (local time {current.get('time', '')}):\n"
+        f"temperature {current.get('temperature_2m')}{units.get('temperature_2m', '°C')}, "
+        f"wind {current.get('wind_speed_10m')} {units.get('wind_speed_10m', 'km/h')}, "
+        f"{weather_label(current.get('weathercode'))}"
+    )
+
+
+def reduce_hourly(data, text):
+    hourly = data["hourly"]
+    units = data.get("hourly_units", {})
+    start, end = hourly_window(text, _local_now(data))
+    rows = [
+        (datetime.fromisoformat(t), i) for i, t in enumerate(hourly["time"])
+        if start <= datetime.fromisoformat(t) < end
+    ]
+    if not rows:
+        return "No hourly forecast available for the requested time."
+    period = 3 if (end - start) <= timedelta(hours=24) else 6
+    lines = [
+        f"Hourly forecast (local time, {units.get('temperature_2m', '°C')}, precipitation in {units.get('precipitation', 'mm')}), "
+        f"{start:%a %d %b %H:%M} → {end:%a %d %b %H:%M}",
+        "period | temp | feels like | precip | conditions",
+    ]
+    for p in range(0, len(rows), period):
+        chunk = rows[p:p + period]
+        idx = [i for _, i in chunk]
+        codes = [hourly["weathercode"][i] for i in idx if hourly["weathercode"][i] is not None]
+        last = chunk[-1][0] + timedelta(hours=1)
+        lines.append(
+            f"{chunk[0][0]:%a %H}–{last:%H}h | "
+            f"{_range([hourly['temperature_2m'][i] for i in idx])} | "
+            f"{_range([hourly['apparent_temperature'][i] for i in idx])} | "
+            f"{sum(hourly['precipitation'][i] or 0 for i in idx):.1f} | "
+            f"{weather_label(max(codes) if codes else None)}"  # higher WMO code ≈ worse weather
+        )
+    return "\n".join(lines)
+
+
+def reduce_daily(data, text):
+    daily = data["daily"]
+    units = data.get("daily_units", {})
+    wanted = daily_window(text, _local_now(data).date())
+    lines = [
+        f"Daily forecast ({units.get('temperature_2m_max', '°C')}, precipitation in {units.get('precipitation_sum', 'mm')})",
+        "day | min–max | precip | conditions",
+    ]
+    for i, t in enumerate(daily["time"]):
+        day = datetime.fromisoformat(t).date()
+        if wanted is not None and day not in wanted:
+            continue
+        lines.append(
+            f"{day:%a %d %b} | {daily['temperature_2m_min'][i]}–{daily['temperature_2m_max'][i]} | "
+            f"{daily['precipitation_sum'][i]} | {weather_label(daily['weathercode'][i])}"
+        )
+    if len(lines) == 2:
+        return "No daily forecast available for the requested days."
+    return "\n".join(lines)
+
+
+def reduce_forecast(forecast_type, data, text=None):
+    """Full Open-Meteo response → compact text table for the summary prompt."""
+    if forecast_type == "current":
+        return reduce_current(data)
+    if forecast_type == "hourly":
+        return reduce_hourly(data, text)
+    return reduce_daily(data, text)
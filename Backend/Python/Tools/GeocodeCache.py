@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocode_cache.sqlite3"))
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "4096"))  # entries kept in memory
+
+
+def normalize(name) -> str:
+    """'  São   Paulo ' → 'sao paulo' (accents, case and spacing do not matter)."""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().replace(",", " ").split())
+
+
+def cache_key(city, country=None) -> str:
+    return f"{normalize(city)}|{normalize(country)}"
+
+
+# -------------------------------------------------------
+# 🔵 GEOCODE CACHE
+# -------------------------------------------------------
+# City → {"lat", "lon", "country"} for get_location:
+# - in-memory LRU (OrderedDict) in front of
+# - a SQLite table on disk, so the cache survives restarts
+# Keys are normalized city + country ("cairo|egypt"); a lookup
+# without a country uses "cairo|". Only successful lookups are
+# stored, and only under the country the geocoder returned: a
+# "Paris, Texas" request answered with Paris, France must not
+# make later "paris|texas" lookups hit France. Coordinates of
+# a city do not change, so no expiry.
+# -------------------------------------------------------
+class GeocodeCache:
+    def __init__(self, path=GEOCODE_CACHE_PATH, capacity=GEOCODE_CACHE_SIZE):
+        self.capacity = capacity
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats_counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " key TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL,"
+            " country TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, city, country=None, count=True):
+        """count=False: lookup that is not a user request (prewarm), kept out of stats()."""
+        key = cache_key(city, country)
+        with self._lock:
+            location = self._memory.get(key)
+            if location is not None:
+                self._memory.move_to_end(key)
+                self._count("memory_hits", count)
+                return dict(location)
+            row = self._db.execute("SELECT lat, lon, country FROM geocode WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count("misses", count)
+                return None
+            location = {"lat": row[0], "lon": row[1], "country": row[2]}
+            self._remember(key, location)
+            self._count("disk_hits", count)
+            return dict(location)
+
+    def put(self, city, country, location):
+        """
+        Store a parse_location() result under city+resolved country, and
+        under city+requested country only when the two agree (or none was asked).
+        """
+        keys = {cache_key(city, location["country"])}
+        if not country or normalize(country) == normalize(location["country"]):
+            keys.add(cache_key(city, country))
+        entry = {"lat": location["lat"], "lon": location["lon"], "country": location["country"]}
+        with self._lock:
+            for key in keys:
+                self._remember(key, entry)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO geocode (key, lat, lon, country, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(key, entry["lat"], entry["lon"], entry["country"], time.time()) for key in keys],
+            )
+            self._db.commit()
+
+    def prewarm(self, cities, fetch):
+        """
+        cities: iterable of "City" or "City, Country" strings.
+        fetch(city) → parse_location()-style dict; only called for cities not cached yet.
+        Returns the number of cities fetched from the API.
+        """
+        fetched = 0
+        for line in cities:
+            city, _, country = line.partition(",")
+            city, country = city.strip(), country.strip() or None
+            if not city or self.get(city, country, count=False) is not None:
+                continue
+            location = fetch(city)
+            if isinstance(location, dict) and "error" not in location:
+                self.put(city, country, location)
+                fetched += 1
+        return fetched
+
+    def stats(self):
+        with self._lock:
+            hits = self.stats_counters["memory_hits"] + self.stats_counters["disk_hits"]
+            lookups = hits + self.stats_counters["misses"]
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+            return {
+                **self.stats_counters,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    # call with self._lock held
+    def _count(self, counter, count):
+        if count:
+            self.stats_counters[counter] += 1
+
+    # call with self._lock held
+    def _remember(self, key, location):
+        self._memory[key] = location
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+
+geocode_cache = GeocodeCache()
@@ -0,0 +1,127 @@
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlencode, urlsplit
+import HttpClient
+from dotenv import load_dotenv
+
+load_dotenv()
+GMAIL_API_BASE = os.getenv("GMAIL_API_BASE", "https://gmail.googleapis.com").rstrip("/")
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))              # Gmail allows 100, recommends ≤ 50
+GMAIL_FETCH_CONCURRENCY = int(os.getenv("GMAIL_FETCH_CONCURRENCY", "8"))  # fallback: parallel single GETs
+
+MESSAGES_PATH = "/gmail/v1/users/me/messages"
+BATCH_URL = f"{GMAIL_API_BASE}/batch/gmail/v1"
+# only what parse_all_emails_as_string reads: headers + (nested) body data
+MESSAGE_FIELDS = "id,payload(mimeType,headers(name,value),body/data,parts)"
+RETRYABLE = {429, 500, 502, 503, 504}
+
+_fallback_pool = ThreadPoolExecutor(max_workers=GMAIL_FETCH_CONCURRENCY, thread_name_prefix="gmail-fetch")
+
+
+def message_url(msg_id="", base=GMAIL_API_BASE):
+    return f"{base}{MESSAGES_PATH}/{msg_id}".rstrip("/")
+
+
+# -------------------------------------------------------
+# 🔵 GMAIL BATCH FETCH
+# -------------------------------------------------------
+# GET messages/{id} for many ids in one HTTPS round-trip:
+# POST /batch/gmail/v1 with a multipart/mixed body, one
+# "application/http" part per message, answered by a
+# multipart/mixed response in the same order (Content-ID).
+# Messages the batch could not return (whole batch failed,
+# or a part came back 429/5xx) are fetched with bounded
+# parallel single GETs instead.
+# -------------------------------------------------------
+def build_batch_body(ids, params, boundary):
+    query = urlencode(params)
+    lines = []
+    for i, msg_id in enumerate(ids):
+        lines += [
+            f"--{boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <item-{i}>",
+            "",
+            f"GET {MESSAGES_PATH}/{msg_id}?{query} HTTP/1.1",
+            "",
+            "",
+        ]
+    lines.append(f"--{boundary}--")
+    return "\r\n".join(lines).encode()
+
+
+def parse_batch_response(content_type, body):
+    """multipart/mixed batch response → {item index: (status, json or None)}."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    results = {}
+    for part in message.iter_parts():
+        content_id = (part.get("Content-ID") or "").strip("<>")
+        index = int(content_id.rsplit("-", 1)[-1]) if content_id else len(results)
+        raw = part.get_payload(decode=True) or part.get_payload().encode()
+        status_line, _, rest = raw.partition(b"\r\n") if b"\r\n" in raw else raw.partition(b"\n")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            status = None
+        _, _, inner_body = rest.partition(b"\r\n\r\n") if b"\r\n\r\n" in rest else rest.partition(b"\n\n")
+        try:
+            data = json.loads(inner_body) if status == 200 else None
+        except ValueError:
+            data, status = None, None
+        results[index] = (status, data)
+    return results
+
+
+def fetch_one(access_token, msg_id, params):
+    response = HttpClient.get(message_url(msg_id), headers={"Authorization": f"Bearer {access_token}"}, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def batch_get_messages(access_token, ids, params=None):
+    """Returns the message resources for ids, in the same order (missing ones are skipped)."""
+    params = params or {"format": "full", "fields": MESSAGE_FIELDS}
+    found = {}
+    retry = []
+    for start in range(0, len(ids), GMAIL_BATCH_SIZE):
+        chunk = ids[start:start + GMAIL_BATCH_SIZE]
+        boundary = f"batch_{uuid.uuid4().hex}"
+        try:
+            response = HttpClient.post(
+                BATCH_URL,
+                data=build_batch_body(chunk, params, boundary),
+                headers={
+                    "Authorization": f"Bearer {access_token}",
+                    "Content-Type": f"multipart/mixed; boundary={boundary}",
+                },
+            )
+            if response.status_code != 200:
+                raise ValueError(f"batch request failed ({response.status_code})")
+            results = parse_batch_response(response.headers["Content-Type"], response.content)
+        except Exception as e:
+            print(f"❌ Gmail batch failed, falling back to parallel fetch: {e}")
+            retry.extend(chunk)
+            continue
+        for i, msg_id in enumerate(chunk):
+            status, data = results.get(i, (None, None))
+            if data is not None:
+                found[msg_id] = data
+            elif status is None or status in RETRYABLE:
+                retry.append(msg_id)
+            else:
+                print(f"❌ Gmail message {msg_id} skipped ({status})")
+
+    if retry:
+        futures = {msg_id: _fallback_pool.submit(fetch_one, access_token, msg_id, params) for msg_id in retry}
+        for msg_id, future in futures.items():
+            try:
+                found[msg_id] = future.result()
+            except Exception as e:
+                print(f"❌ Error fetching Gmail message {msg_id}: {e}")
+    return [found[msg_id] for msg_id in ids if msg_id in found]
@@ -0,0 +1,144 @@
+import base64
+import codecs
+import os
+import re
+from html.parser import HTMLParser
+from dotenv import load_dotenv
+
+load_dotenv()
+MAIL_BODY_CHARS = int(os.getenv("MAIL_BODY_CHARS", "2000"))         # text kept per email
+MAIL_TOTAL_CHARS = int(os.getenv("MAIL_TOTAL_CHARS", "12000"))      # text kept for all emails of one answer
+MAIL_MAX_SCAN_BYTES = int(os.getenv("MAIL_MAX_SCAN_BYTES", "524288"))  # raw bytes decoded per part at most
+CHUNK_B64 = 16384  # base64 characters decoded per step (multiple of 4)
+TRUNCATED = " … [truncated]"
+
+SKIP_TAGS = {"script", "style", "head", "title", "noscript", "template", "svg"}
+BLOCK_TAGS = {
+    "p", "div", "br", "tr", "li", "ul", "ol", "table", "section", "article", "header", "footer",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "hr", "center",
+}
+
+
+class BudgetReached(Exception):
+    pass
+
+
+# -------------------------------------------------------
+# 🔵 BOUNDED HTML → TEXT
+# -------------------------------------------------------
+# Stdlib HTMLParser fed chunk by chunk: text inside
+# script/style/head is dropped, block tags become line
+# breaks, and parsing stops as soon as `budget` characters
+# of text were collected, so a 2 MB newsletter costs about
+# as much as a short mail.
+# -------------------------------------------------------
+class BoundedTextExtractor(HTMLParser):
+    def __init__(self, budget):
+        super().__init__(convert_charrefs=True)
+        self.budget = budget
+        self.size = 0
+        self.parts = []
+        self.skip = 0
+        self.truncated = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self.skip:
+            return
+        text = " ".join(data.split())
+        if not text:
+            return
+        if self.size + len(text) >= self.budget:
+            self.parts.append(text[:self.budget - self.size])
+            self.size = self.budget
+            self.truncated = True
+            raise BudgetReached()
+        self.parts.append(text + " ")
+        self.size += len(text) + 1
+
+    def text(self):
+        return tidy("".join(self.parts))
+
+
+def tidy(text):
+    text = re.sub(r"[ \t ‌​]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def iter_decoded(body_data, max_bytes=MAIL_MAX_SCAN_BYTES):
+    """Decode Gmail's base64url body a chunk at a time (UTF-8), stopping after max_bytes."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    body_data = body_data.rstrip("=")
+    limit = min(len(body_data), (max_bytes + 2) // 3 * 4)
+    for start in range(0, limit, CHUNK_B64):
+        chunk = body_data[start:min(start + CHUNK_B64, limit)]
+        chunk += "=" * (-len(chunk) % 4)
+        yield decoder.decode(base64.urlsafe_b64decode(chunk))
+    yield decoder.decode(b"", final=True)
+
+
+def html_to_text(body_data, budget):
+    """(text, truncated) from a base64url HTML part."""
+    parser = BoundedTextExtractor(budget)
+    try:
+        for chunk in iter_decoded(body_data):
+            parser.feed(chunk)
+        parser.close()
+    except BudgetReached:
+        pass
+    text = parser.text()
+    return text[:budget], parser.truncated or len(text) > budget
+
+
+def plain_to_text(body_data, budget):
+    """(text, truncated) from a base64url text/plain part; only decodes about budget bytes."""
+    max_bytes = budget * 4 + 4  # ≤ 4 UTF-8 bytes per character
+    collected, size = [], 0
+    for chunk in iter_decoded(body_data, max_bytes=max_bytes):
+        collected.append(chunk)
+        size += len(chunk)
+        if size > budget:
+            break
+    text = "".join(collected)
+    truncated = len(text) > budget or len(body_data.rstrip("=")) * 3 // 4 > max_bytes
+    return tidy(text[:budget]), truncated
+
+
+def find_part(payload, mime_type):
+    """Depth-first first part of mime_type that has body data."""
+    if payload.get("mimeType") == mime_type and payload.get("body", {}).get("data"):
+        return payload
+    for part in payload.get("parts", []) or []:
+        found = find_part(part, mime_type)
+        if found:
+            return found
+    return None
+
+
+def body_text(payload, budget=MAIL_BODY_CHARS):
+    """Readable body of a Gmail payload (text/plain preferred over HTML), at most budget chars."""
+    if budget <= 0:
+        return "", True
+    part = find_part(payload, "text/plain")
+    if part:
+        return plain_to_text(part["body"]["data"], budget)
+    part = find_part(payload, "text/html")
+    if part:
+        return html_to_text(part["body"]["data"], budget)
+    return "", False
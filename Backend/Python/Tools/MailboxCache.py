@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import HttpClient
+from dotenv import load_dotenv
+from Tools.GmailBatch import GMAIL_API_BASE, MESSAGE_FIELDS, batch_get_messages
+
+load_dotenv()
+# outside the source tree, owner-only: the databases hold full email bodies
+MAILBOX_CACHE_DIR = os.getenv("MAILBOX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".ai_assistant", "mailbox_cache"))
+MAILBOX_CACHE_TTL = float(os.getenv("MAILBOX_CACHE_TTL", "1800"))        # idle seconds before a mailbox is purged
+MAILBOX_INITIAL_SYNC = int(os.getenv("MAILBOX_INITIAL_SYNC", "50"))      # unread messages pulled on the first sync
+MAILBOX_SYNC_INTERVAL = float(os.getenv("MAILBOX_SYNC_INTERVAL", "15"))  # seconds between history.list calls
+
+USER_URL = f"{GMAIL_API_BASE}/gmail/v1/users/me"
+# messages.get fields for the cache: what the parser needs + label / ordering info
+CACHE_FIELDS = "id,labelIds,internalDate," + MESSAGE_FIELDS.split(",", 1)[1]
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+
+class HistoryExpired(Exception):
+    """startHistoryId is too old for history.list (404) → full resync."""
+
+
+# -------------------------------------------------------
+# 🔵 LOCAL MAILBOX CACHE (per user, SQLite)
+# -------------------------------------------------------
+# messages: id → message resource (json), unread flag, date
+# meta:     history_id, complete (every unread message of the
+#           mailbox is cached), last_sync
+#
+# unread(access_token, n):
+# - first call: profile.historyId, then list + batch-fetch
+#   the newest unread messages (initial sync)
+# - later calls: history.list from the stored historyId,
+#   apply the deltas (new mail, read/unread, deletions) and
+#   fetch only messages not cached yet; skipped entirely when
+#   the last sync is younger than MAILBOX_SYNC_INTERVAL
+# - then answer from SQLite
+# One lock per user, so a sync never runs twice at once.
+# Files are 0600 in a 0700 directory. purge_idle() (scheduler
+# job) closes and deletes mailboxes unused for
+# MAILBOX_CACHE_TTL, including files left by older processes.
+# -------------------------------------------------------
+class MailboxCache:
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_user(cls, user_email):
+        key = user_email.strip().lower()
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(key, MAILBOX_CACHE_DIR)
+            return cls._instances[key]
+
+    @classmethod
+    def purge_idle(cls, ttl=None, directory=None):
+        """Scheduler job: close and delete mailboxes idle for ttl seconds. Returns how many were purged."""
+        ttl = MAILBOX_CACHE_TTL if ttl is None else ttl
+        directory = directory or MAILBOX_CACHE_DIR
+        purged = 0
+        with cls._instances_lock:
+            for key, cache in list(cls._instances.items()):
+                if time.monotonic() - cache.last_used > ttl and cache.purge(blocking=False):
+                    del cls._instances[key]
+                    purged += 1
+            open_paths = {cache.path for cache in cls._instances.values()}
+        # databases of earlier processes (or of users not seen since)
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if name.endswith(".sqlite3") and path not in open_paths and time.time() - os.path.getmtime(path) > ttl:
+                    os.remove(path)
+                    purged += 1
+        return purged
+
+    def __init__(self, user_email, directory=MAILBOX_CACHE_DIR):
+        name = hashlib.sha256(user_email.encode()).hexdigest()[:32]
+        self.directory = directory
+        self.path = os.path.join(directory, f"{name}.sqlite3")
+        self.last_used = time.monotonic()
+        self._lock = threading.Lock()
+        self._db = None
+        self._open()
+
+    def _open(self):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600))  # create owner-only before SQLite does
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " id TEXT PRIMARY KEY, internal_date INTEGER NOT NULL, unread INTEGER NOT NULL, data TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS unread_by_date ON messages (unread, internal_date DESC);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+        self._db.commit()
+
+    def purge(self, blocking=True):
+        """Close the connection and delete the database; False if a sync holds it (blocking=False)."""
+        if not self._lock.acquire(blocking):
+            return False
+        try:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            for path in (self.path, self.path + "-journal"):
+                if os.path.exists(path):
+                    os.remove(path)
+            return True
+        finally:
+            self._lock.release()
+
+    # ---- public ----
+    def unread(self, access_token, max_count=10):
+        """Newest max_count unread message resources, synced with Gmail as needed."""
+        with self._lock:
+            self.last_used = time.monotonic()
+            if self._db is None:
+                self._open()  # purged while the caller held this instance
+            self.sync(access_token, max_count)
+            rows = self._db.execute(
+                "SELECT data FROM messages WHERE unread = 1 ORDER BY internal_date DESC LIMIT ?", (max_count,)
+            ).fetchall()
+            return [json.loads(row[0]) for row in rows]
+
+    def sync(self, access_token, max_count):
+        history_id = self._meta("history_id")
+        if history_id is None:
+            self._initial_sync(access_token, max(max_count, MAILBOX_INITIAL_SYNC))
+            return
+        if time.time() - float(self._meta("last_sync") or 0) >= MAILBOX_SYNC_INTERVAL:
+            try:
+                self._apply_history(access_token, history_id)
+            except HistoryExpired:
+                print("mailbox history expired, resyncing")
+                self._db.execute("DELETE FROM messages")
+                self._initial_sync(access_token, max(max_count, MAILBOX_INITIAL_SYNC))
+                return
+        cached = self._db.execute("SELECT COUNT(*) FROM messages WHERE unread = 1").fetchone()[0]
+        if cached < max_count and self._meta("complete") != "1":
+            # fewer unread cached than asked for (mail was read, or a bigger n) → top up
+            self._top_up(access_token, max_count)
+
+    # ---- Gmail calls ----
+    def _headers(self, access_token):
+        return {"Authorization": f"Bearer {access_token}"}
+
+    def _list_unread(self, access_token, max_count):
+        response = HttpClient.get(
+            f"{USER_URL}/messages", headers=self._headers(access_token),
+            params={"q": "is:unread", "maxResults": max_count, "fields": "messages/id"},
+        )
+        response.raise_for_status()
+        return [m["id"] for m in response.json().get("messages", [])]
+
+    def _fetch(self, access_token, ids):
+        cached = {row[0] for row in self._db.execute(
+            f"SELECT id FROM messages WHERE id IN ({','.join('?' * len(ids))})", ids
+        )} if ids else set()
+        missing = [msg_id for msg_id in ids if msg_id not in cached]
+        if not missing:
+            return []
+        return batch_get_messages(access_token, missing, {"format": "full", "fields": CACHE_FIELDS})
+
+    def _initial_sync(self, access_token, max_count):
+        # historyId first: anything that changes while listing is replayed by the next history.list
+        profile = HttpClient.get(f"{USER_URL}/profile", headers=self._headers(access_token), params={"fields": "historyId"})
+        profile.raise_for_status()
+        history_id = profile.json()["historyId"]
+        self._top_up(access_token, max_count)
+        self._set_meta(history_id=history_id, last_sync=time.time())
+
+    def _top_up(self, access_token, max_count):
+        ids = self._list_unread(access_token, max_count)
+        self._store(self._fetch(access_token, ids))
+        # a short list means the mailbox has no more unread mail; history.list keeps it that way
+        self._set_meta(complete=int(len(ids) < max_count))
+
+    def _apply_history(self, access_token, history_id):
+        added, label_changes, deleted = [], {}, set()
+        params = {"startHistoryId": history_id, "historyTypes": HISTORY_TYPES, "maxResults": 500}
+        latest = history_id
+        while True:
+            response = HttpClient.get(f"{USER_URL}/history", headers=self._headers(access_token), params=params)
+            if response.status_code == 404:
+                raise HistoryExpired()
+            response.raise_for_status()
+            data = response.json()
+            latest = data.get("historyId", latest)
+            for record in data.get("history", []):
+                for item in record.get("messagesAdded", []):
+                    if "UNREAD" in item["message"].get("labelIds", []):
+                        added.append(item["message"]["id"])
+                for item in record.get("labelsAdded", []):
+                    if "UNREAD" in item.get("labelIds", []):
+                        label_changes[item["message"]["id"]] = 1
+                for item in record.get("labelsRemoved", []):
+                    if "UNREAD" in item.get("labelIds", []):
+                        label_changes[item["message"]["id"]] = 0
+                for item in record.get("messagesDeleted", []):
+                    deleted.add(item["message"]["id"])
+            if not data.get("nextPageToken"):
+                break
+            params["pageToken"] = data["nextPageToken"]
+
+        marked_unread = [msg_id for msg_id, unread in label_changes.items() if unread]
+        self._store(self._fetch(access_token, [m for m in dict.fromkeys(added + marked_unread) if m not in deleted]))
+        self._db.executemany("UPDATE messages SET unread = ? WHERE id = ?", [(u, m) for m, u in label_changes.items()])
+        self._db.executemany("DELETE FROM messages WHERE id = ?", [(m,) for m in deleted])
+        self._db.execute("DELETE FROM messages WHERE unread = 0")  # only unread mail is ever served
+        self._set_meta(history_id=latest, last_sync=time.time())
+
+    # ---- SQLite ----
+    def _store(self, messages):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO messages (id, internal_date, unread, data) VALUES (?, ?, ?, ?)",
+            [(m["id"], int(m.get("internalDate", 0)), int("UNREAD" in m.get("labelIds", ["UNREAD"])), json.dumps(m))
+             for m in messages],
+        )
+        self._db.commit()
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in values.items()]
+        )
+        self._db.commit()
@@ -1,108 +1,58 @@
 import base64
 import json
-import requests
+import HttpClient
+from Tools.TokenManager import token_manager
+from Tools.GmailBatch import batch_get_messages, message_url
+from Tools.MailboxCache import MailboxCache
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import os
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import re
-from bs4 import BeautifulSoup
-from dateutil.parser import isoparse  # safer ISO parser
+from Tools.MailText import MAIL_BODY_CHARS, MAIL_TOTAL_CHARS, TRUNCATED, body_text
 
 load_dotenv()
 
-CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
-TOKEN_URI = os.getenv("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
-
 class MailToolOAuth:
-    def __init__(self, access_token: str, refresh_token: str, token_expiry: str, Bearer_TOKEN: str):
+    def __init__(self, access_token: str, refresh_token: str, token_expiry: str, Bearer_TOKEN: str, user_email: str = None):
         """
         Initialize Gmail OAuth mail tool.
         access_token: current google access token
         refresh_token: long-lived refresh token
         token_expiry: ISO timestamp when access token expires
+        user_email: selects the local mailbox cache (None → always read from Gmail)
         """
         self.access_token = access_token
         self.refresh_token = refresh_token
         self.token_expiry = token_expiry
         self.Bearer_TOKEN = Bearer_TOKEN  # Placeholder for Bearer token if needed
+        self.user_email = user_email
 
     # -------------------------------------------------------
     # 🔁 AUTO REFRESH TOKEN
     # -------------------------------------------------------
+    # Handled by the process-wide TokenManager: one in-flight
+    # refresh per user, saved to Node (NODE_PORT) and patched
+    # into the credential cache of all of the user's sessions.
+    # -------------------------------------------------------
     def refresh_google_token(self, refresh_token: str):
-        try:
-            data = {
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-                "refresh_token": refresh_token,
-                "grant_type": "refresh_token",
-            }
-
-            response = requests.post(TOKEN_URI, data=data)
-            response.raise_for_status()
-
-            token_data = response.json()
-
-            new_access_token = token_data["access_token"]
-            expires_in = token_data.get("expires_in", 3600)
-
-            # ALWAYS CREATE TZ-AWARE EXPIRY
-            expiry_time = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
-            if expiry_time.tzinfo is None:
-                expiry_time = expiry_time.replace(tzinfo=timezone.utc)
-            else:
-                expiry_time = expiry_time.astimezone(timezone.utc)
-
-            # 🔁 Save to Node.js backend
-            url = f"http://localhost:5000/api/v1/fastapi/setUserOAuthInfo"
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": self.Bearer_TOKEN
-            }
-            payload = {
-                "access_token": new_access_token,
-                "refresh_token": refresh_token,
-                "access_token_expiry": expiry_time.isoformat(),
-                "is_authenticated": True
-            }
-            backend_response = requests.post(url, headers=headers, json=payload)
-            if backend_response.status_code == 200:
-                print("✅ User OAuth info set successfully in Node.js backend.")
-            else:
-                print("❌ Failed to set User OAuth info in Node.js backend:", backend_response.text)
-
-            return {
-                "access_token": new_access_token,
-                "expiry": expiry_time.isoformat()
-            }
-
-        except Exception as e:
-            print(f"❌ Error refreshing token: {e}")
+        result = token_manager.refresh(refresh_token, self.Bearer_TOKEN)
+        if result is None:
             return None
+        new_access_token, expiry = result
+        return {
+            "access_token": new_access_token,
+            "expiry": expiry
+        }
     
     def ensure_access_token(self):
-        # expiry_time = datetime.fromisoformat(self.token_expiry)
-        # now = datetime.now(timezone.utc)
-        expiry_time = isoparse(self.token_expiry)  # parses ISO with tz correctly
-        now = datetime.now(timezone.utc)
-        print(f"Current time: {now}, Token expiry: {expiry_time}",flush=True)
-
-        # Refresh if token expired or close to expiry
-        if now >= expiry_time:
-            print("🔄 Access token expired — refreshing...")
-
-            new_token = self.refresh_google_token(self.refresh_token)
-            if not new_token:
-                return False
-
-            self.access_token = new_token["access_token"]
-            self.token_expiry = new_token["expiry"]
-
-            print("🔄 Token refreshed successfully")
-
+        # refreshes in the background shortly before expiry; only an
+        # expired token makes this call wait for Google
+        result = token_manager.ensure(self.access_token, self.refresh_token, self.token_expiry, self.Bearer_TOKEN)
+        if result is None:
+            return False
+        self.access_token, self.token_expiry = result
         return True
 
     # -------------------------------------------------------
@@ -127,13 +77,13 @@ class MailToolOAuth:
                 message.as_bytes()
             ).decode()
 
-            url = "https://gmail.googleapis.com/gmail/v1/users/me/messages/send"
+            url = message_url("send")
             headers = {"Authorization": f"Bearer {self.access_token}",
                        "Content-Type": "application/json"}
 
             payload = {"raw": raw_message}
 
-            response = requests.post(url, headers=headers, json=payload)
+            response = HttpClient.post(url, headers=headers, json=payload)
 
             if response.status_code == 200:
                 return f"✅ Email sent to {to_email}"
@@ -156,30 +106,32 @@ class MailToolOAuth:
             return "❌ Failed to refresh token. Cannot read emails."
 
         try:
+            if self.user_email:
+                # served from the synced local copy, only history deltas hit Gmail
+                raw_messages = MailboxCache.for_user(self.user_email).unread(self.access_token, max_count)
+                if not raw_messages:
+                    return "📭 No unread emails."
+                return parse_all_emails_as_string(raw_messages)
+
             # Search unread messages
-            url = "https://gmail.googleapis.com/gmail/v1/users/me/messages"
+            url = message_url()
             params = {
                 "q": "is:unread",
-                "maxResults": max_count
+                "maxResults": max_count,
+                "fields": "messages/id",
             }
             headers = {"Authorization": f"Bearer {self.access_token}"}
 
-            search_response = requests.get(
+            search_response = HttpClient.get(
                 url, headers=headers, params=params
             ).json()
 
             if "messages" not in search_response:
                 return "📭 No unread emails."
 
-            raw_messages = []
-
-            # Fetch each unread email
-            for msg in search_response["messages"]:
-                msg_id = msg["id"]
-                msg_url = f"https://gmail.googleapis.com/gmail/v1/users/me/messages/{msg_id}"
-                msg_data = requests.get(msg_url, headers=headers).json()
-
-                raw_messages.append(msg_data)
+            # one batch round-trip for all messages (see Tools/GmailBatch.py)
+            ids = [msg["id"] for msg in search_response["messages"]]
+            raw_messages = batch_get_messages(self.access_token, ids)
 
             return parse_all_emails_as_string(raw_messages)
 
@@ -217,44 +169,26 @@ class MailToolOAuth:
     #     }
 
 
-def extract_body(payload):
+def extract_body(payload, budget=MAIL_BODY_CHARS):
     """
-    Recursively extract text/plain or text/html body.
+    Recursively extract text/plain (preferred) or text/html body,
+    cut to budget characters (see Tools/MailText.py).
     """
-    if "parts" in payload:
-        for part in payload["parts"]:
-            result = extract_body(part)
-            if result:
-                return result
-
-    mime_type = payload.get("mimeType", "")
-    body_data = payload.get("body", {}).get("data", "")
-
-    if not body_data:
-        return ""
-
-    decoded = base64.urlsafe_b64decode(body_data).decode(errors="ignore")
-
-    # Prefer text/plain
-    if mime_type == "text/plain":
-        return decoded
-
-    # If HTML, clean it
-    if mime_type == "text/html":
-        soup = BeautifulSoup(decoded, "html.parser")
-        return soup.get_text(separator="\n")
-
-    return ""
+    text, truncated = body_text(payload, budget)
+    return text + TRUNCATED if truncated and text else text
     
     # # -------------------------------------------------------------------
     # # 📨 Helper to parse Gmail API email payload to one single string
     # # -------------------------------------------------------------------
-def parse_all_emails_as_string(messages):
+def parse_all_emails_as_string(messages, per_email=MAIL_BODY_CHARS, total=MAIL_TOTAL_CHARS):
     """
     Takes a list of Gmail messages (full payloads)
     and returns a single clean string.
+    Every body is capped at per_email characters and all bodies
+    together at total; once that is used up only headers are listed.
     """
     output = []
+    remaining = total
 
     for msg_data in messages:
         headers = msg_data["payload"]["headers"]
@@ -269,12 +203,13 @@ def parse_all_emails_as_string(messages):
         subject = get_header("Subject")
         date = get_header("Date")
 
-        body = extract_body(msg_data["payload"])
-        if not body.strip():
-            body = "(No body)"
-
-        # Remove repeated whitespace
-        body = re.sub(r"\n\s*\n", "\n\n", body).strip()
+        if remaining > 0:
+            body = extract_body(msg_data["payload"], min(per_email, remaining))
+            remaining -= len(body)
+            if not body.strip():
+                body = "(No body)"
+        else:
+            body = "(Body omitted: size limit reached)"
 
         # Build the combined email text
         email_text = (
@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import HttpClient
+from dateutil.parser import isoparse
+from dotenv import load_dotenv
+from Tools.CredentialCache import credential_cache
+
+load_dotenv()
+CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+TOKEN_URI = os.getenv("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
+node_port = os.getenv("NODE_PORT")
+SET_OAUTH_URL = f"http://localhost:{node_port}/api/v1/fastapi/setUserOAuthInfo"
+
+TOKEN_REFRESH_EARLY = float(os.getenv("TOKEN_REFRESH_EARLY", "300"))    # seconds before expiry: refresh in background
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "30"))   # seconds before expiry: treat as expired
+TOKEN_ACTIVE_WINDOW = float(os.getenv("TOKEN_ACTIVE_WINDOW", "1800"))   # seconds: users the periodic job keeps fresh
+TOKEN_REFRESH_WORKERS = int(os.getenv("TOKEN_REFRESH_WORKERS", "2"))
+TOKEN_MAX_BEARERS = int(os.getenv("TOKEN_MAX_BEARERS", "8"))            # Bearer tokens remembered per user
+
+# Node refused the Bearer token itself: another one of the user may still work
+REJECTED_BEARER = {401, 403}
+
+
+def parse_expiry(value):
+    expiry = value if isinstance(value, datetime) else isoparse(value)
+    return expiry.replace(tzinfo=timezone.utc) if expiry.tzinfo is None else expiry.astimezone(timezone.utc)
+
+
+def request_new_token(refresh_token):
+    """Google token endpoint → (access_token, tz-aware expiry)."""
+    response = HttpClient.post(TOKEN_URI, data={
+        "client_id": CLIENT_ID,
+        "client_secret": CLIENT_SECRET,
+        "refresh_token": refresh_token,
+        "grant_type": "refresh_token",
+    })
+    response.raise_for_status()
+    token_data = response.json()
+    expiry = datetime.now(timezone.utc) + timedelta(seconds=token_data.get("expires_in", 3600))
+    return token_data["access_token"], expiry
+
+
+def save_token(Bearer_TOKEN, access_token, refresh_token, expiry):
+    """Persist the refreshed token in the Node backend (setUserOAuthInfo), returns the status."""
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": Bearer_TOKEN
+    }
+    payload = {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "access_token_expiry": expiry.isoformat(),
+        "is_authenticated": True
+    }
+    response = HttpClient.post(SET_OAUTH_URL, headers=headers, json=payload)
+    if response.status_code == 200:
+        print("✅ User OAuth info set successfully in Node.js backend.")
+    else:
+        print("❌ Failed to set User OAuth info in Node.js backend:", response.text)
+    return response.status_code
+
+
+# -------------------------------------------------------
+# 🔵 OAUTH TOKEN MANAGER
+# -------------------------------------------------------
+# One entry per Google refresh_token (= per connected user):
+# - ensure() returns a usable access token; inside the last
+#   TOKEN_REFRESH_EARLY seconds it starts a refresh in the
+#   background and keeps using the current token, only an
+#   (almost) expired token makes the caller wait
+# - single flight: all sessions / threads of a user share
+#   one in-flight refresh (a concurrent.futures.Future)
+# - the new token is written to Node once, with the Bearer
+#   token of the request that triggered the refresh (then the
+#   user's other recent ones if Node rejects it), and patched
+#   into the credential cache of every session of that user
+# - at most TOKEN_MAX_BEARERS recent Bearer tokens per user
+# - refresh_due() (scheduler job) keeps active users fresh
+# -------------------------------------------------------
+class TokenManager:
+    def __init__(self, fetch=request_new_token, save=save_token, workers=TOKEN_REFRESH_WORKERS):
+        self.fetch = fetch
+        self.save = save
+        # refresh_token -> {"access_token", "expiry", "future", "last_used",
+        #                  "Bearer_TOKENs": OrderedDict Bearer -> last use, most recent last}
+        self._users = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="token-refresh")
+        self.stats = {"refreshes": 0, "background": 0, "coalesced": 0, "failures": 0}
+
+    def _entry(self, refresh_token, access_token, expiry, Bearer_TOKEN):
+        """Get / create the user's entry, keeping whichever token expires last. Call with self._lock held."""
+        entry = self._users.get(refresh_token)
+        if entry is None:
+            entry = self._users[refresh_token] = {
+                "access_token": access_token, "expiry": expiry, "future": None, "Bearer_TOKENs": OrderedDict(), "last_used": 0.0,
+            }
+        elif expiry > entry["expiry"]:
+            entry["access_token"], entry["expiry"] = access_token, expiry
+        entry["last_used"] = time.monotonic()
+        bearers = entry["Bearer_TOKENs"]
+        bearers[Bearer_TOKEN] = entry["last_used"]
+        bearers.move_to_end(Bearer_TOKEN)
+        while len(bearers) > TOKEN_MAX_BEARERS:
+            bearers.popitem(last=False)
+        return entry
+
+    def _start_refresh(self, refresh_token, entry, background, Bearer_TOKEN=None):
+        """Return the in-flight refresh Future for this user, starting one if needed. Call with self._lock held."""
+        if entry["future"] is not None:
+            self.stats["coalesced"] += 1
+            return entry["future"]
+        future = entry["future"] = Future()
+        self.stats["background" if background else "refreshes"] += 1
+        self._pool.submit(self._refresh, refresh_token, entry, future, Bearer_TOKEN)
+        return future
+
+    def _save(self, entry, Bearer_TOKEN, access_token, refresh_token, expiry):
+        """Write the new token to Node with the triggering Bearer token, then the most recent others on 401/403 / errors."""
+        with self._lock:
+            candidates = [Bearer_TOKEN] if Bearer_TOKEN else []
+            candidates += [b for b in reversed(entry["Bearer_TOKENs"]) if b != Bearer_TOKEN]
+        for candidate in candidates:
+            try:
+                status = self.save(candidate, access_token, refresh_token, expiry)
+            except Exception as e:
+                print(f"❌ Error saving refreshed token: {e}")
+                continue
+            if status not in REJECTED_BEARER:
+                return
+            with self._lock:
+                entry["Bearer_TOKENs"].pop(candidate, None)  # stale session token, stop using it
+
+    def _refresh(self, refresh_token, entry, future, Bearer_TOKEN=None):
+        try:
+            access_token, expiry = self.fetch(refresh_token)
+        except Exception as e:
+            print(f"❌ Error refreshing token: {e}")
+            with self._lock:
+                entry["future"] = None
+                self.stats["failures"] += 1
+            future.set_result(None)
+            return
+        with self._lock:
+            entry["access_token"], entry["expiry"], entry["future"] = access_token, expiry, None
+            tokens = list(entry["Bearer_TOKENs"])
+        for token in tokens:
+            credential_cache.update(token, access_token=access_token, access_token_expiry=expiry.isoformat())
+        self._save(entry, Bearer_TOKEN, access_token, refresh_token, expiry)
+        future.set_result((access_token, expiry))
+
+    def ensure(self, access_token, refresh_token, expiry, Bearer_TOKEN):
+        """Returns (access_token, expiry iso) that is valid now, or None if the refresh failed."""
+        expiry = parse_expiry(expiry)
+        with self._lock:
+            entry = self._entry(refresh_token, access_token, expiry, Bearer_TOKEN)
+            remaining = (entry["expiry"] - datetime.now(timezone.utc)).total_seconds()
+            if remaining > TOKEN_REFRESH_EARLY:
+                return entry["access_token"], entry["expiry"].isoformat()
+            if remaining > TOKEN_REFRESH_MARGIN:
+                self._start_refresh(refresh_token, entry, background=True, Bearer_TOKEN=Bearer_TOKEN)
+                return entry["access_token"], entry["expiry"].isoformat()
+            future = self._start_refresh(refresh_token, entry, background=False, Bearer_TOKEN=Bearer_TOKEN)
+        return self._result(future)
+
+    def refresh(self, refresh_token, Bearer_TOKEN):
+        """Force a refresh now (shared with any refresh already running). Returns (access_token, expiry iso) or None."""
+        with self._lock:
+            entry = self._entry(refresh_token, None, datetime.min.replace(tzinfo=timezone.utc), Bearer_TOKEN)
+            future = self._start_refresh(refresh_token, entry, background=False, Bearer_TOKEN=Bearer_TOKEN)
+        return self._result(future)
+
+    def _result(self, future):
+        result = future.result()
+        if result is None:
+            return None
+        return result[0], result[1].isoformat()
+
+    def refresh_due(self):
+        """Scheduler job: background-refresh recently active users whose token is about to expire."""
+        now = datetime.now(timezone.utc)
+        started = 0
+        with self._lock:
+            for refresh_token, entry in list(self._users.items()):
+                if time.monotonic() - entry["last_used"] > TOKEN_ACTIVE_WINDOW:
+                    if entry["future"] is None:
+                        del self._users[refresh_token]  # idle user, forget the token
+                    continue
+                bearers = entry["Bearer_TOKENs"]
+                for Bearer_TOKEN, last_used in list(bearers.items()):
+                    if time.monotonic() - last_used > TOKEN_ACTIVE_WINDOW:
+                        del bearers[Bearer_TOKEN]  # that session is gone
+                if (entry["expiry"] - now).total_seconds() <= TOKEN_REFRESH_EARLY and entry["future"] is None:
+                    # most recently used Bearer token saves it
+                    self._start_refresh(refresh_token, entry, background=True, Bearer_TOKEN=next(reversed(bearers), None))
+                    started += 1
+        return started
+
+
+token_manager = TokenManager()
@@ -0,0 +1,280 @@
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from dotenv import load_dotenv
+from Tools.GeocodeCache import GEOCODE_CACHE_PATH, normalize
+
+load_dotenv()
+WEATHER_INTENT_LOCAL = os.getenv("WEATHER_INTENT_LOCAL", "true").lower() == "true"
+WEATHER_GAZETTEER = os.getenv("WEATHER_GAZETTEER")  # optional extra "City, Country" per line
+
+
+# -------------------------------------------------------
+# 🔵 GAZETTEER
+# -------------------------------------------------------
+# normalized city → country, spelled the way the Open-Meteo
+# geocoder reports it (WeatherTool compares the two). Where a
+# name exists in several countries, the entry is the one the
+# geocoder returns first. Extended at load time with the
+# cities already in the geocode cache and WEATHER_GAZETTEER.
+# -------------------------------------------------------
+CITIES = {
+    # Egypt
+    "cairo": "Egypt", "giza": "Egypt", "alexandria": "Egypt", "new cairo": "Egypt", "6th of october": "Egypt",
+    "sheikh zayed": "Egypt", "port said": "Egypt", "suez": "Egypt", "ismailia": "Egypt", "mansoura": "Egypt",
+    "tanta": "Egypt", "zagazig": "Egypt", "damietta": "Egypt", "faiyum": "Egypt", "minya": "Egypt",
+    "asyut": "Egypt", "sohag": "Egypt", "luxor": "Egypt", "aswan": "Egypt", "hurghada": "Egypt",
+    "sharm el sheikh": "Egypt", "marsa alam": "Egypt", "dahab": "Egypt", "el gouna": "Egypt",
+    "marsa matruh": "Egypt", "el alamein": "Egypt", "banha": "Egypt", "beni suef": "Egypt", "qena": "Egypt",
+    # Middle East / Africa
+    "riyadh": "Saudi Arabia", "jeddah": "Saudi Arabia", "mecca": "Saudi Arabia", "medina": "Saudi Arabia",
+    "dammam": "Saudi Arabia", "dubai": "United Arab Emirates", "abu dhabi": "United Arab Emirates",
+    "sharjah": "United Arab Emirates", "doha": "Qatar", "kuwait city": "Kuwait", "manama": "Bahrain",
+    "muscat": "Oman", "amman": "Jordan", "beirut": "Lebanon", "damascus": "Syria", "baghdad": "Iraq",
+    "tehran": "Iran", "istanbul": "Turkey", "ankara": "Turkey", "antalya": "Turkey", "izmir": "Turkey",
+    "jerusalem": "Israel", "tel aviv": "Israel", "gaza": "Palestinian Territory", "khartoum": "Sudan",
+    "tripoli": "Libya", "tunis": "Tunisia", "algiers": "Algeria", "casablanca": "Morocco",
+    "marrakesh": "Morocco", "rabat": "Morocco", "lagos": "Nigeria", "nairobi": "Kenya",
+    "addis ababa": "Ethiopia", "johannesburg": "South Africa", "cape town": "South Africa", "accra": "Ghana",
+    # Europe
+    "london": "United Kingdom", "manchester": "United Kingdom", "birmingham": "United Kingdom",
+    "liverpool": "United Kingdom", "edinburgh": "United Kingdom", "glasgow": "United Kingdom",
+    "dublin": "Ireland", "paris": "France", "nice": "France", "marseille": "France", "lyon": "France", "berlin": "Germany",
+    "munich": "Germany", "hamburg": "Germany", "frankfurt": "Germany", "cologne": "Germany",
+    "madrid": "Spain", "barcelona": "Spain", "valencia": "Spain", "seville": "Spain", "lisbon": "Portugal",
+    "porto": "Portugal", "rome": "Italy", "milan": "Italy", "naples": "Italy", "venice": "Italy",
+    "florence": "Italy", "amsterdam": "The Netherlands", "rotterdam": "The Netherlands",
+    "brussels": "Belgium", "zurich": "Switzerland", "geneva": "Switzerland", "vienna": "Austria",
+    "prague": "Czechia", "warsaw": "Poland", "krakow": "Poland", "budapest": "Hungary",
+    "bucharest": "Romania", "sofia": "Bulgaria", "athens": "Greece", "copenhagen": "Denmark",
+    "stockholm": "Sweden", "oslo": "Norway", "helsinki": "Finland", "moscow": "Russia",
+    "saint petersburg": "Russia", "kyiv": "Ukraine",
+    # Americas
+    "new york": "United States", "los angeles": "United States", "chicago": "United States",
+    "houston": "United States", "miami": "United States", "san francisco": "United States",
+    "seattle": "United States", "boston": "United States", "washington": "United States",
+    "las vegas": "United States", "atlanta": "United States", "dallas": "United States",
+    "toronto": "Canada", "vancouver": "Canada", "montreal": "Canada", "mexico city": "Mexico",
+    "sao paulo": "Brazil", "rio de janeiro": "Brazil", "buenos aires": "Argentina", "lima": "Peru",
+    "bogota": "Colombia", "santiago": "Chile",
+    # Asia / Oceania
+    "tokyo": "Japan", "osaka": "Japan", "kyoto": "Japan", "seoul": "South Korea", "beijing": "China",
+    "shanghai": "China", "hong kong": "Hong Kong", "singapore": "Singapore", "bangkok": "Thailand",
+    "kuala lumpur": "Malaysia", "jakarta": "Indonesia", "manila": "Philippines", "hanoi": "Vietnam",
+    "mumbai": "India", "delhi": "India", "new delhi": "India", "bangalore": "India", "karachi": "Pakistan",
+    "lahore": "Pakistan", "dhaka": "Bangladesh", "sydney": "Australia", "melbourne": "Australia",
+    "auckland": "New Zealand",
+}
+
+# accepted spellings of a country → the geocoder's name
+COUNTRY_ALIASES = {
+    "usa": "United States", "america": "United States", "united states of america": "United States",
+    "uk": "United Kingdom", "england": "United Kingdom", "britain": "United Kingdom", "great britain": "United Kingdom",
+    "scotland": "United Kingdom", "uae": "United Arab Emirates", "emirates": "United Arab Emirates",
+    "ksa": "Saudi Arabia", "netherlands": "The Netherlands", "holland": "The Netherlands",
+    "czech republic": "Czechia", "korea": "South Korea", "palestine": "Palestinian Territory",
+    "turkiye": "Turkey", "the netherlands": "The Netherlands",
+}
+
+# city names that are also everyday words: only trusted after "in/for/at ..."
+COMMON_WORD_CITIES = {"nice", "reading", "bath", "mobile", "split", "hope", "male"}
+
+# words that may follow "in/for/at" without naming a place
+NON_PLACE_WORDS = {
+    "the", "a", "an", "my", "our", "your", "this", "that", "these", "next", "coming", "general", "here",
+    "there", "celsius", "fahrenheit", "degrees", "detail", "details", "short", "total", "advance", "case",
+    "about", "least", "once", "order", "time", "mind", "it", "me", "us", "now", "today", "tonight",
+    "tomorrow", "morning", "afternoon", "evening", "night", "noon", "midnight", "week", "weekend",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "hours", "days",
+    "minutes", "an hour", "outside", "home", "work", "school", "town", "city", "all", "any", "some",
+    "you", "him", "her", "them", "sure", "please", "bed", "fact", "addition", "advance",
+} | {str(n) for n in range(100)}
+
+# real places ("Of", Turkey) that are far more often plain words: never
+# learned from the geocode cache, so "weather of the day" finds no city
+FUNCTION_WORDS = {"of", "in", "on", "at", "to", "by", "as", "is", "be", "do", "so", "no", "or", "and", "for"}
+
+
+# -------------------------------------------------------
+# 🔵 TEMPORAL RULES
+# -------------------------------------------------------
+# (forecast_type, pattern). No cue at all → "current", the
+# same default WeatherRequestSchema asks the LLM to use.
+# Cues of two different types → ambiguous → LLM fallback.
+# "today" asks about the whole day (high/low, rain later), so
+# it is a daily cue; "later today" stays hourly.
+# -------------------------------------------------------
+DAYS = r"(monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+TEMPORAL_RULES = [
+    ("daily", re.compile(
+        rf"\b(tomorrow|day after tomorrow|this week|next week|weekend|week|weekly|daily|next (few|\d+|two|three|four|five|six|seven) days|"
+        rf"(\d+|two|three|four|five|six|seven)[- ]day|coming days|(?<!later )today|{DAYS})\b", re.I)),
+    ("hourly", re.compile(
+        r"\b(tonight|this (morning|afternoon|evening)|later( today| on)?|hourly|hour by hour|next (few|\d+|couple of) hours|"
+        r"in (an|\d+|a few|a couple of) hours?|at \d{1,2}(:\d{2})?\s*(am|pm)?|(\d{1,2}(:\d{2})?\s*(am|pm))|rest of (the )?day)\b", re.I)),
+    ("current", re.compile(r"\b(now|right now|at the moment|current(ly)?|outside|at present)\b", re.I)),
+]
+
+# lookahead, so "for tomorrow in Smallville" yields both phrases
+PLACE_CUE = re.compile(r"\b(?:in|for|at|near|around)\s+(?=([^\s,.!?;]+(?:\s+[^\s,.!?;]+){0,3}))", re.I)
+
+
+def _strip_accents(text):
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _tokens(text):
+    """Lowercase words with commas kept as their own token."""
+    return re.findall(r"[\w'-]+|,", _strip_accents(text).casefold())
+
+
+def canonical_country(name) -> str:
+    """'UK' / 'united kingdom' → 'united kingdom', for comparing a requested country with the geocoder's."""
+    key = normalize(name)
+    return normalize(COUNTRY_ALIASES.get(key, key))
+
+
+def load_gazetteer(geocode_path=GEOCODE_CACHE_PATH, extra_path=WEATHER_GAZETTEER):
+    cities = dict(CITIES)
+    if extra_path and os.path.exists(extra_path):
+        with open(extra_path, encoding="utf-8") as f:
+            for line in f:
+                city, _, country = line.partition(",")
+                if city.strip() and country.strip() and not line.startswith("#"):
+                    cities.setdefault(normalize(city), country.strip())
+    # cities users asked for before ("cairo|egypt" keys in the geocode cache)
+    if geocode_path and os.path.exists(geocode_path):
+        try:
+            with sqlite3.connect(geocode_path) as db:
+                for key, country in db.execute("SELECT key, country FROM geocode"):
+                    city, _, requested = key.partition("|")
+                    if city in FUNCTION_WORDS or city in NON_PLACE_WORDS:
+                        continue
+                    if city and (not requested or normalize(country) == requested):
+                        cities.setdefault(city, country)
+        except sqlite3.Error as e:
+            print(f"❌ Could not read geocode cache for the gazetteer: {e}")
+    return cities
+
+
+# -------------------------------------------------------
+# 🔵 LOCAL WEATHER INTENT EXTRACTOR
+# -------------------------------------------------------
+# extract(text) returns the same fields WeatherRequestSchema
+# asks Gemini for, or None when the text is ambiguous:
+# - a place-like phrase ("in Smallville") that is not in the
+#   gazetteer, or "City, <unknown country>"
+# - two different cities
+# - temporal cues of different forecast types
+# -------------------------------------------------------
+class WeatherIntentExtractor:
+    def __init__(self, cities=None):
+        self.cities = cities if cities is not None else load_gazetteer()
+        self.countries = {normalize(c): c for c in self.cities.values()}
+        self.countries.update(COUNTRY_ALIASES)
+        self.max_words = max(len(name.split()) for name in list(self.cities) + list(self.countries))
+        self.stats = {"local": 0, "fallback": 0}
+
+    def _match(self, words, i, table):
+        """Longest name in table starting at words[i] → (name, length) or (None, 0)."""
+        for n in range(min(self.max_words, len(words) - i), 0, -1):
+            name = " ".join(words[i:i + n])
+            if name in table:
+                return name, n
+        return None, 0
+
+    def _places(self, text):
+        words = _tokens(text)
+        cities, countries = [], []
+        i = 0
+        while i < len(words):
+            city, n = self._match(words, i, self.cities)
+            if city and (city not in COMMON_WORD_CITIES or (i and words[i - 1] in {"in", "for", "at", "near"})):
+                country = None
+                j = i + n
+                # "Paris, France" / "Paris in France"
+                if j < len(words) and words[j] in {",", "in"} and j + 1 < len(words):
+                    country_name, m = self._match(words, j + 1, self.countries)
+                    if country_name:
+                        country = self.countries[country_name]
+                        j += 1 + m
+                    elif words[j] == ",":
+                        return None, None  # "Paris, Texas": unknown qualifier
+                cities.append((city, country))
+                i = j
+                continue
+            country_name, n = self._match(words, i, self.countries)
+            if country_name:
+                countries.append(self.countries[country_name])
+                i += n
+                continue
+            i += 1
+        return cities, countries
+
+    def _unknown_place(self, text):
+        """True if a phrase after in/for/at/... looks like a place the gazetteer does not know."""
+        for match in PLACE_CUE.finditer(_strip_accents(text)):
+            words = normalize(match.group(1)).split()
+            if not words or words[0] in NON_PLACE_WORDS or " ".join(words[:2]) in NON_PLACE_WORDS:
+                continue
+            known, _ = self._match(words, 0, self.cities)
+            if known is None:
+                known, _ = self._match(words, 0, self.countries)
+            if known is None and not re.fullmatch(r"\d.*", words[0]):
+                return True
+        return False
+
+    def forecast_type(self, text):
+        found = {forecast_type for forecast_type, pattern in TEMPORAL_RULES if pattern.search(text)}
+        if len(found) > 1:
+            return None
+        return found.pop() if found else "current"
+
+    def extract(self, text):
+        result = self._extract(text)
+        self.stats["local" if result else "fallback"] += 1
+        return result
+
+    def _extract(self, text):
+        if not text or not text.strip():
+            return None
+        forecast_type = self.forecast_type(text)
+        if forecast_type is None:
+            return None
+        cities, countries = self._places(text)
+        if cities is None or len({city for city, _ in cities}) > 1:
+            return None
+        if not cities:
+            if countries or self._unknown_place(text):
+                return None  # a country alone or an unknown place → let the LLM decide
+            return {"has_city": False, "city_name": "", "country": "", "forecast_type": forecast_type, "confidence_score": 0.9}
+        city, country = cities[0]
+        if self._unknown_place(text):
+            return None
+        return {
+            "has_city": True,
+            "city_name": city.title(),
+            "country": country or self.cities[city],
+            "forecast_type": forecast_type,
+            "confidence_score": 0.9,
+        }
+
+
+_extractor = None
+_lock = threading.Lock()
+
+
+def extract_weather_intent(text):
+    """Local intent or None (→ ask Gemini with WeatherRequestSchema). Gazetteer is loaded on first use."""
+    global _extractor
+    if not WEATHER_INTENT_LOCAL:
+        return None
+    if _extractor is None:
+        # reached from threadpool workers: build the gazetteer once
+        with _lock:
+            if _extractor is None:
+                _extractor = WeatherIntentExtractor()
+    return _extractor.extract(text)
@@ -1,7 +1,12 @@
 from google import genai
 from google.genai import types
 # from google.generativeai.types import FunctionDeclaration, Tool
-import requests
+import HttpClient
+import GeminiClient
+from Tools.GeocodeCache import geocode_cache
+from Tools.ForecastCache import ForecastCache, forecast_cache, snap
+from Tools.WeatherIntent import extract_weather_intent, canonical_country
+from Tools.ForecastReducer import reduce_forecast
 import os
 from dotenv import load_dotenv
 from typing import Literal, Dict
@@ -61,143 +66,230 @@ load_dotenv()
 api_key = os.getenv("LLM_API_KEY")
 
 
-def get_open_meteo_forecast(lat:float, lon:float,forecast_type: Literal["hourly", "daily","current"] = "current") -> Dict:
+def forecast_params(lat, lon, forecast_type):
     # Default to Cairo if no coordinates provided
     lat = lat if lat is not None else 30.0444
     lon = lon if lon is not None else 31.2357
-    base_url = "https://api.open-meteo.com/v1/forecast"
     params = {
         "latitude": lat,
         "longitude": lon,
         "timezone": "auto",
         # "current":"temperature_2m,wind_speed_10m"
     }
+    if forecast_type == "hourly":
+        params["hourly"] = "temperature_2m,apparent_temperature,precipitation,weathercode"
+    elif forecast_type == "daily":
+        params["daily"] = "temperature_2m_max,temperature_2m_min,precipitation_sum,weathercode"
+    elif forecast_type == "current":
+        params["current"] = "temperature_2m,wind_speed_10m,weathercode"
+    else:
+        raise ValueError("forecast_type must be 'hourly' or 'daily'.")
+    return params
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+
+def cached_forecast_params(lat, lon, forecast_type):
+    """forecast_params() with the coordinates snapped to the cache grid, plus the cache key."""
+    params = forecast_params(lat, lon, forecast_type)
+    params["latitude"], params["longitude"] = snap(params["latitude"]), snap(params["longitude"])
+    key = ForecastCache.key(params["latitude"], params["longitude"], forecast_type, params["timezone"])
+    return params, key
+
+def get_open_meteo_forecast(lat:float, lon:float,forecast_type: Literal["hourly", "daily","current"] = "current", userInput: str = None) -> Dict:
     try:
-        if forecast_type == "hourly":
-            params["hourly"] = "temperature_2m,apparent_temperature,precipitation,weathercode"
-        elif forecast_type == "daily":
-            params["daily"] = "temperature_2m_max,temperature_2m_min,precipitation_sum,weathercode"
-        elif forecast_type == "current":
-            params["current"] = "temperature_2m,wind_speed_10m,weathercode"
-        else:
-            raise ValueError("forecast_type must be 'hourly' or 'daily'.")
-
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if forecast_type == "hourly":
-            return data["hourly"]
-        elif forecast_type == "daily":
-            return data["daily"]
-        else :
-            return data["current"]
+        params, key = cached_forecast_params(lat, lon, forecast_type)
+
+        def fetch():
+            response = HttpClient.get(FORECAST_URL, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        data = forecast_cache.get_or_fetch(key, fetch)
+        if userInput is not None:
+            # compact table of the asked window instead of the raw arrays
+            return reduce_forecast(forecast_type, data, userInput)
+        return data[forecast_type]
     except Exception as err:
         print({"error at weather api": f"Request failed: {str(err)}"})
         return "error in weather response, please try again"
 
-def get_location(city) -> dict:
-    "converts city name to lon, lat"
-    base_url = "https://geocoding-api.open-meteo.com/v1/search"
-    params = {
+async def get_open_meteo_forecast_async(lat:float, lon:float,forecast_type: Literal["hourly", "daily","current"] = "current", userInput: str = None) -> Dict:
+    try:
+        params, key = cached_forecast_params(lat, lon, forecast_type)
+
+        async def fetch():
+            response = await HttpClient.aget(FORECAST_URL, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        data = await forecast_cache.aget_or_fetch(key, fetch)
+        if userInput is not None:
+            # compact table of the asked window instead of the raw arrays
+            return reduce_forecast(forecast_type, data, userInput)
+        return data[forecast_type]
+    except Exception as err:
+        print({"error at weather api": f"Request failed: {str(err)}"})
+        return "error in weather response, please try again"
+
+def geocoding_params(city):
+    return {
         "name": city,
         "count": 1,
         "language": "en",
         "format":"json"
     }
+
+def parse_location(data):
+    if not data.get("results"):
+        return {"error": "City not found. Please check the name and try again."}
+    result = data["results"][0]
+    # print(result)
+    return {
+        'lon': result['longitude'],
+        'lat': result['latitude'],
+        'country': result['country']
+    }
+
+def fetch_location(city) -> dict:
+    "geocoding API call, no cache"
     try:
-        response = requests.get(base_url, params=params)
+        response = HttpClient.get(GEOCODING_URL, params=geocoding_params(city))
         response.raise_for_status()
-        data = response.json()
-        if not data.get("results"):
-            return {"error": "City not found. Please check the name and try again."}
-        result = data["results"][0]
-        # print(result)
-        response = {
-            'lon': result['longitude'],
-            'lat': result['latitude'],
-            'country': result['country']
-        }
-        return response
+        return parse_location(response.json())
     except Exception as err:
         print({"error at geocoding api": f"Request failed: {str(err)}"})
         return "error in location conversion, please try again"
 
+def get_location(city, country=None) -> dict:
+    "converts city name to lon, lat (cached, see Tools/GeocodeCache.py)"
+    location = geocode_cache.get(city, country)
+    if location is not None:
+        return location
+    location = fetch_location(city)
+    if isinstance(location, dict) and "error" not in location:
+        geocode_cache.put(city, country, location)
+    return location
+
+async def get_location_async(city, country=None) -> dict:
+    "converts city name to lon, lat without blocking the event loop"
+    location = geocode_cache.get(city, country)
+    if location is not None:
+        return location
+    try:
+        response = await HttpClient.aget(GEOCODING_URL, params=geocoding_params(city))
+        response.raise_for_status()
+        location = parse_location(response.json())
+    except Exception as err:
+        print({"error at geocoding api": f"Request failed: {str(err)}"})
+        return "error in location conversion, please try again"
+    if "error" not in location:
+        geocode_cache.put(city, country, location)
+    return location
+
+def prewarm_geocode_cache(path):
+    """Load one "City" or "City, Country" per line into the geocode cache (blank lines / # comments ignored)."""
+    with open(path, encoding="utf-8") as f:
+        cities = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    # fetch_location, not get_location: prewarm lookups stay out of /weather/stats
+    fetched = geocode_cache.prewarm(cities, fetch_location)
+    print(f"geocode cache pre-warmed: {fetched} new of {len(cities)} cities")
+    return fetched
+
+
+def summary_prompt(userInput, current_datetime, lat, lon, forecast_data):
+    return types.Content(
+        role="user",
+        parts=[
+            types.Part.from_text(
+                text=
+                    "You are a helpful and friendly weather assistant. Your task is to analyze the provided weather forecast data "
+                    "and generate a clear, human-readable summary that answers the user's question. "
+                    "Always use a warm, easy-to-understand tone, and focus on making the response personalized and relevant.\n\n"
+
+                    "Customize your response using the user's location and time:\n"
+                    f"- Latitude: {lat}\n"
+                    f"- Longitude: {lon}\n"
+                    f"- Current Date and Time: {current_datetime}\n\n"
+
+                    "Use the forecast data below to generate your answer. Include actionable or practical advice if appropriate "
+                    "(e.g., bring an umbrella, wear light clothing).\n\n"
+
+                    "--- Weather Forecast Data ---\n"
+                    f"{forecast_data}\n\n"
+
+                    "--- User Question ---\n"
+                    f"{userInput}"
+            )
+        ]
+    )
+
+WEATHER_INTENT_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": WeatherRequestSchema
+}
+
 
 class WeatherTool:
     if not api_key:
         raise ValueError("Missing LLM_API_KEY. Did you forget to set it in your .env file?")
-    def __init__(self):
-        self.LLMmodel = genai.Client(api_key=api_key)
-        # genai.configure(api_key=api_key)
-        # self.LLMmodel = genai.GenerativeModel(
-        #     model_name="models/gemini-2.5-flash",
-        # )
+    @property
+    def LLMmodel(self):
+        # process-wide client, created on first use
+        return GeminiClient.get_client()
+
+    # -------------------------------------------------------
+    # 🔵 WEATHER INTENT (city / country / forecast_type)
+    # -------------------------------------------------------
+    # Local gazetteer + temporal rules first (Tools/WeatherIntent.py);
+    # Gemini with WeatherRequestSchema only when that is ambiguous.
+    # -------------------------------------------------------
+    def weather_intent(self, messages, userInput):
+        intent = extract_weather_intent(userInput)
+        if intent is not None:
+            return intent
+        city_name_response = self.LLMmodel.models.generate_content(
+            model="gemini-2.5-flash",
+            contents = messages,
+            config=WEATHER_INTENT_CONFIG
+        )
+        return json.loads(city_name_response.text)
+
+    async def weather_intent_async(self, messages, userInput):
+        intent = extract_weather_intent(userInput)
+        if intent is not None:
+            return intent
+        city_name_response = await self.LLMmodel.aio.models.generate_content(
+            model="gemini-2.5-flash",
+            contents = messages,
+            config=WEATHER_INTENT_CONFIG
+        )
+        return json.loads(city_name_response.text)
+
     def get_weather_response(self,userInput,current_datetime,lat:float=None,lon:float=None) -> dict:
         try:
             messages = [types.Content(role="user", parts=[types.Part.from_text(text=userInput)])]
         
-            city_name_response = self.LLMmodel.models.generate_content(
-                model="gemini-2.5-flash",
-                contents = messages,
-                config={
-                    "response_mime_type": "application/json",
-                    "response_schema": WeatherRequestSchema
-                }
-            )
-            temp = json.loads(city_name_response.text)
+            temp = self.weather_intent(messages, userInput)
             has_city = temp.get("has_city")
             # lon = lat = None
             if has_city:
                 city = temp.get("city_name")
                 expected_country = temp.get("country")
-                converted_city_response = get_location(city)
-                if converted_city_response["country"].lower() == expected_country.lower():
+                converted_city_response = get_location(city, expected_country)
+                if canonical_country(converted_city_response["country"]) == canonical_country(expected_country):
                     lon = converted_city_response["lon"]
                     lat = converted_city_response["lat"]
                 else:
                     return "Error: Country mismatch. Please specify the country more clearly."
 
-            # response = self.LLMmodel.generate_content(
-            #     messages,
-            #     generation_config={
-            #         "response_mime_type": "application/json",
-            #         "response_schema": RequestType
-            #     }
-            # )
-            # result = json.loads(response.text)
             forecast_type = temp.get("forecast_type")
             # description = result.get("description", "No description provided")
             confidence_score = temp.get("confidence_score")
             print(f"[Routing Decision]: {forecast_type} | Confidence: {confidence_score}")
-            forecast_data = get_open_meteo_forecast(lat,lon,forecast_type)
+            forecast_data = get_open_meteo_forecast(lat,lon,forecast_type,userInput)
             print(f"Weather Api response: ",forecast_data)
-            messages.append(
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(
-                            text=
-                                "You are a helpful and friendly weather assistant. Your task is to analyze the provided weather forecast data "
-                                "and generate a clear, human-readable summary that answers the user's question. "
-                                "Always use a warm, easy-to-understand tone, and focus on making the response personalized and relevant.\n\n"
-
-                                "Customize your response using the user's location and time:\n"
-                                f"- Latitude: {lat}\n"
-                                f"- Longitude: {lon}\n"
-                                f"- Current Date and Time: {current_datetime}\n\n"
-
-                                "Use the forecast data below to generate your answer. Include actionable or practical advice if appropriate "
-                                "(e.g., bring an umbrella, wear light clothing).\n\n"
-
-                                "--- Weather Forecast Data ---\n"
-                                f"{forecast_data}\n\n"
-
-                                "--- User Question ---\n"
-                                f"{userInput}"
-                        )
-                    ]
-                )
-            )
+            messages.append(summary_prompt(userInput, current_datetime, lat, lon, forecast_data))
             response = self.LLMmodel.models.generate_content(
                 model="gemini-2.5-flash",
                 contents = messages,
@@ -209,6 +301,63 @@ class WeatherTool:
             print({"error at weather llm call": f"Request failed: {str(err)}"})
             return "error in weather llm call, please try again"
 
+    async def weather_messages_async(self,userInput,current_datetime,lat:float=None,lon:float=None):
+        """
+        Runs the intent extraction + geocoding + forecast steps and returns
+        (messages, None) ready for the summary call, or (None, error_text).
+        """
+        messages = [types.Content(role="user", parts=[types.Part.from_text(text=userInput)])]
+
+        temp = await self.weather_intent_async(messages, userInput)
+        if temp.get("has_city"):
+            city = temp.get("city_name")
+            expected_country = temp.get("country")
+            converted_city_response = await get_location_async(city, expected_country)
+            if canonical_country(converted_city_response["country"]) == canonical_country(expected_country):
+                lon = converted_city_response["lon"]
+                lat = converted_city_response["lat"]
+            else:
+                return None, "Error: Country mismatch. Please specify the country more clearly."
+
+        forecast_type = temp.get("forecast_type")
+        print(f"[Routing Decision]: {forecast_type} | Confidence: {temp.get('confidence_score')}")
+        forecast_data = await get_open_meteo_forecast_async(lat,lon,forecast_type,userInput)
+        print(f"Weather Api response: ",forecast_data)
+        messages.append(summary_prompt(userInput, current_datetime, lat, lon, forecast_data))
+        return messages, None
+
+    async def get_weather_response_async(self,userInput,current_datetime,lat:float=None,lon:float=None) -> dict:
+        """Same as get_weather_response, using the async Gemini client and HTTP client."""
+        try:
+            messages, error = await self.weather_messages_async(userInput,current_datetime,lat,lon)
+            if error:
+                return error
+            response = await self.LLMmodel.aio.models.generate_content(
+                model="gemini-2.5-flash",
+                contents = messages,
+            )
+            return response.text
+        except Exception as err:
+            print({"error at weather llm call": f"Request failed: {str(err)}"})
+            return "error in weather llm call, please try again"
+
+    async def stream_weather_response_async(self,userInput,current_datetime,lat:float=None,lon:float=None):
+        """Async generator: yields the weather summary text chunk by chunk as Gemini streams it."""
+        try:
+            messages, error = await self.weather_messages_async(userInput,current_datetime,lat,lon)
+            if error:
+                yield error
+                return
+            async for chunk in await self.LLMmodel.aio.models.generate_content_stream(
+                model="gemini-2.5-flash",
+                contents = messages,
+            ):
+                if chunk.text:
+                    yield chunk.text
+        except Exception as err:
+            print({"error at weather llm call": f"Request failed: {str(err)}"})
+            yield "error in weather llm call, please try again"
+
 
 # userInput = input("Ask your weather-related question:")
 # print(f"LLM response:",WeatherTool().get_weather_response(userInput))
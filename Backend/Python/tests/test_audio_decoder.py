@@ -0,0 +1,63 @@
+import io
+import os
+import stat
+import sys
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("dotenv")
+from AudioProcessing import AudioDecoder
+from AudioProcessing.AudioDecoder import AudioDecodeError, iter_decode_audio
+
+# stands in for ffmpeg: passes the input through as "decoded" samples; input starting
+# with b"MOOV" cannot be read from a pipe (like mp4 with the index at the end)
+FAKE_FFMPEG = """#!{python}
+import shutil, sys
+source = sys.argv[sys.argv.index("-i") + 1]
+stream = sys.stdin.buffer if source == "pipe:0" else open(source, "rb")
+head = stream.read(4)
+if head == b"MOOV" and source == "pipe:0":
+    sys.stderr.write("moov atom not found")
+    sys.exit(1)
+if head == b"JUNK":
+    sys.exit(1)
+sys.stdout.buffer.write(head[4:] if head == b"MOOV" else head)
+shutil.copyfileobj(stream, sys.stdout.buffer)
+"""
+
+
+@pytest.fixture(autouse=True)
+def fake_ffmpeg(tmp_path, monkeypatch):
+    if os.name != "posix":
+        pytest.skip("fake ffmpeg is a shebang script")
+    path = tmp_path / "ffmpeg"
+    path.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(AudioDecoder, "FFMPEG_BINARY", str(path))
+
+
+def samples(seconds):
+    return np.arange(int(seconds * AudioDecoder.SAMPLE_RATE), dtype=np.float32)
+
+
+def test_file_object_is_decoded_in_pieces():
+    audio = samples(5.5)
+    chunks = list(iter_decode_audio(io.BytesIO(audio.tobytes())))
+    assert [len(c) for c in chunks] == [16000] * 5 + [8000]
+    assert np.array_equal(np.concatenate(chunks), audio)
+
+
+def test_bytes_still_work():
+    audio = samples(1)
+    assert np.array_equal(np.concatenate(list(iter_decode_audio(audio.tobytes()))), audio)
+
+
+def test_seekable_fallback_for_file_objects():
+    audio = samples(2)
+    upload = io.BytesIO(b"MOOV" + audio.tobytes())
+    assert np.array_equal(np.concatenate(list(iter_decode_audio(upload))), audio)
+
+
+def test_undecodable_input_raises():
+    with pytest.raises(AudioDecodeError):
+        list(iter_decode_audio(io.BytesIO(b"JUNK" * 10)))
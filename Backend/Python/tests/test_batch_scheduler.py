@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("dotenv")
+from AudioProcessing.BatchScheduler import MicroBatcher
+
+
+def test_results_go_back_to_each_caller():
+    batcher = MicroBatcher(lambda items, key: [f"{key}:{item}" for item in items], max_batch=4, max_wait_ms=20)
+    futures = [batcher.submit(i, key="en") for i in range(6)]
+    assert [f.result(timeout=2) for f in futures] == [f"en:{i}" for i in range(6)]
+    batcher.stop()
+
+
+def test_short_result_list_fails_every_caller():
+    batcher = MicroBatcher(lambda items, key: items[:1], max_batch=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=2)
+    batcher.stop()
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("dotenv")
+from Tools.GeocodeCache import GeocodeCache
+
+PARIS_FRANCE = {"lat": 48.85, "lon": 2.35, "country": "France"}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GeocodeCache(path=str(tmp_path / "geocode.sqlite3"))
+
+
+def test_put_stores_under_the_returned_country_only(cache):
+    # "Paris, Texas" answered with Paris, France
+    cache.put("Paris", "Texas", PARIS_FRANCE)
+    assert cache.get("Paris", "Texas") is None
+    assert cache.get("Paris", "France") == PARIS_FRANCE
+
+
+def test_put_keeps_the_requested_key_when_countries_agree(cache):
+    cache.put("Paris", None, PARIS_FRANCE)
+    cache.put("paris", "france", PARIS_FRANCE)
+    assert cache.get("Paris") == PARIS_FRANCE
+    assert cache.get("PARIS", "France") == PARIS_FRANCE
+
+
+def test_prewarm_does_not_count_lookups(cache):
+    calls = []
+
+    def fetch(city):
+        calls.append(city)
+        return PARIS_FRANCE
+
+    assert cache.prewarm(["Paris, France", "Paris, France"], fetch) == 1
+    assert calls == ["Paris"]
+    stats = cache.stats()
+    assert stats["misses"] == stats["memory_hits"] == stats["disk_hits"] == 0
+
+    cache.get("Paris", "France")
+    assert cache.stats()["memory_hits"] == 1
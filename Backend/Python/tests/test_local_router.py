@@ -0,0 +1,59 @@
+import os
+import stat
+import pytest
+
+pytest.importorskip("dotenv")
+from Routing.LocalRouter import LocalRouter
+
+
+@pytest.fixture
+def router():
+    return LocalRouter(log_path=None, min_training=10**9)  # rules only
+
+
+@pytest.mark.parametrize("text", [
+    "what's the weather in Cairo?",
+    "hi, what's the forecast for tomorrow",
+    "will it rain tomorrow?",
+    "is it cold outside",
+    "how many degrees is it in Berlin",
+    "check my unread emails",
+    "read my new mails",
+    "send a message to ali@example.com",
+])
+def test_tool_phrasings(router, text):
+    assert router.route(text)[0] == "tool_call"
+
+
+@pytest.mark.parametrize("text", [
+    "I have a cold today",
+    "she has two degrees in physics",
+    "mail the package to my brother",
+    "the rainy season novel was great",
+])
+def test_everyday_words_are_not_tool_calls(router, text):
+    assert router.route(text)[0] is None
+
+
+def test_llm_latency_is_averaged_over_router_calls(router):
+    router.route("something the rules do not know")  # fallback, single_call mode: no router call
+    router.route("another unknown message")
+    router.record("another unknown message", "direct_model_response", 0.99, llm_latency=0.2)
+    stats = router.stats()
+    assert stats["llm_fallbacks"] == 2
+    assert stats["llm_router_calls"] == 1
+    assert stats["avg_llm_latency_ms"] == pytest.approx(200)
+
+
+def test_log_is_private_and_bounded(tmp_path, monkeypatch):
+    from Routing import LocalRouter as router_module
+    monkeypatch.setattr(router_module, "ROUTER_LOG_MAX_LINES", 10)
+    path = tmp_path / "private" / "router.jsonl"
+    router = LocalRouter(log_path=str(path))
+    for i in range(25):
+        router.record(f"message {i}", "direct_model_response")
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) <= 10
+    assert "message 24" in lines[-1]
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
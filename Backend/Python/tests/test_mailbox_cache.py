@@ -0,0 +1,114 @@
+import os
+import stat
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("httpx")
+pytest.importorskip("dotenv")
+from Tools import MailboxCache as mailbox_module
+from Tools.MailboxCache import MailboxCache
+
+
+class Response:
+    def __init__(self, data, status_code=200):
+        self._data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class FakeGmail:
+    """messages.list / profile / history.list / batch get over an in-memory mailbox."""
+
+    def __init__(self, unread_count):
+        self.unread = {f"m{i}": i for i in range(unread_count)}  # id → internalDate
+        self.history = []
+        self.history_id = 100
+
+    def mark_read(self, ids):
+        for msg_id in ids:
+            del self.unread[msg_id]
+        self.history_id += 1
+        self.history.append({"id": self.history_id, "labelsRemoved": [
+            {"message": {"id": msg_id}, "labelIds": ["UNREAD"]} for msg_id in ids
+        ]})
+
+    def get(self, url, headers=None, params=None):
+        if url.endswith("/profile"):
+            return Response({"historyId": str(self.history_id)})
+        if url.endswith("/messages"):
+            newest = sorted(self.unread, key=self.unread.get, reverse=True)[:params["maxResults"]]
+            return Response({"messages": [{"id": msg_id} for msg_id in newest]})
+        if url.endswith("/history"):
+            start = int(params["startHistoryId"])
+            return Response({"historyId": str(self.history_id), "history": [h for h in self.history if h["id"] > start]})
+        raise AssertionError(url)
+
+    def batch_get(self, access_token, ids, params):
+        return [{"id": msg_id, "labelIds": ["UNREAD"], "internalDate": str(self.unread[msg_id])} for msg_id in ids]
+
+
+@pytest.fixture
+def gmail(monkeypatch):
+    fake = FakeGmail(unread_count=30)
+    monkeypatch.setattr(mailbox_module.HttpClient, "get", fake.get)
+    monkeypatch.setattr(mailbox_module, "batch_get_messages", fake.batch_get)
+    monkeypatch.setattr(mailbox_module, "MAILBOX_INITIAL_SYNC", 10)
+    monkeypatch.setattr(mailbox_module, "MAILBOX_SYNC_INTERVAL", 0)
+    return fake
+
+
+def ids(messages):
+    return [m["id"] for m in messages]
+
+
+def test_mark_read_then_same_n_returns_full_inbox(gmail, tmp_path):
+    cache = MailboxCache("user@example.com", directory=str(tmp_path))
+    first = cache.unread("token", 10)
+    assert ids(first) == [f"m{i}" for i in range(29, 19, -1)]
+
+    gmail.mark_read(["m29", "m28", "m27"])
+    again = cache.unread("token", 10)
+    assert ids(again) == [f"m{i}" for i in range(26, 16, -1)]
+
+
+def test_small_mailbox_is_not_relisted(gmail, tmp_path, monkeypatch):
+    gmail.unread = {"m0": 0, "m1": 1}
+    cache = MailboxCache("user@example.com", directory=str(tmp_path))
+    assert ids(cache.unread("token", 10)) == ["m1", "m0"]
+
+    calls = []
+    monkeypatch.setattr(mailbox_module.HttpClient, "get", lambda url, **kwargs: calls.append(url) or gmail.get(url, **kwargs))
+    assert ids(cache.unread("token", 10)) == ["m1", "m0"]
+    assert not [url for url in calls if url.endswith("/messages")]
+
+
+def test_database_is_private(gmail, tmp_path):
+    cache = MailboxCache("user@example.com", directory=str(tmp_path / "mail"))
+    cache.unread("token", 5)
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(tmp_path / "mail").st_mode) == 0o700
+
+
+def test_idle_mailboxes_are_purged(gmail, tmp_path, monkeypatch):
+    directory = str(tmp_path / "mail")
+    monkeypatch.setattr(MailboxCache, "_instances", {})
+    monkeypatch.setattr(mailbox_module, "MAILBOX_CACHE_DIR", directory)
+    cache = MailboxCache.for_user("user@example.com")
+    cache.unread("token", 5)
+    assert os.path.exists(cache.path)
+
+    assert MailboxCache.purge_idle(ttl=3600) == 0
+    cache.last_used -= 7200
+    assert MailboxCache.purge_idle(ttl=3600) == 1
+    assert not os.path.exists(cache.path)
+    assert MailboxCache.for_user("user@example.com") is not cache
+
+    # the caller that still holds the purged instance gets a fresh database
+    assert [m["id"] for m in cache.unread("token", 2)] == ["m29", "m28"]
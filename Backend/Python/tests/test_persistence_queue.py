@@ -0,0 +1,98 @@
+import json
+import os
+import stat
+import threading
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("httpx")
+pytest.importorskip("dotenv")
+import PersistenceQueue
+from PersistenceQueue import WriteBehindQueue, token_id
+
+
+class Backend:
+    """send() stand-in: fails the first `failures` calls with `status`, records what got through."""
+
+    def __init__(self, failures=0, status=500):
+        self.failures = failures
+        self.status = status
+        self.calls = 0
+        self.stored = []
+        self.lock = threading.Lock()
+
+    def __call__(self, Token, batch):
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.failures:
+                return self.status
+            self.stored.extend(batch)
+            return 200
+
+
+def messages(start, count):
+    return [{"role": "user", "content": f"message {i}"} for i in range(start, start + count)]
+
+
+def make_queue(tmp_path, backend, **kwargs):
+    kwargs.setdefault("base_backoff", 0.01)
+    kwargs.setdefault("max_backoff", 0.05)
+    return WriteBehindQueue(send=backend, workers=2, dead_letter_path=str(tmp_path / "dead" / "letters.jsonl"), **kwargs)
+
+
+def read_dead_letters(tmp_path):
+    with open(tmp_path / "dead" / "letters.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(PersistenceQueue.random, "uniform", lambda a, b: b)
+    queue = WriteBehindQueue(send=Backend(), workers=0, base_backoff=2, max_backoff=30)
+    assert [queue._backoff(n) for n in range(1, 7)] == [2, 4, 8, 16, 30, 30]
+
+
+def test_retries_keep_message_order(tmp_path):
+    backend = Backend(failures=3)
+    queue = make_queue(tmp_path, backend)
+    queue.enqueue("Bearer a", messages(0, 3))
+    queue.enqueue("Bearer a", messages(3, 3))  # lands while the first batch is retried
+    assert queue.flush(timeout=5)
+    assert backend.stored == messages(0, 6)
+    assert queue.stats["retries"] == 3
+    assert queue.stats["dead_lettered"] == 0
+
+
+def test_permanent_failure_is_dead_lettered_without_the_token(tmp_path):
+    queue = make_queue(tmp_path, Backend(failures=1, status=401))
+    queue.enqueue("Bearer secret-token", messages(0, 2))
+    assert queue.flush(timeout=5)
+    records = read_dead_letters(tmp_path)
+    assert [r["user"] for r in records] == [token_id("Bearer secret-token")]
+    assert records[0]["history"] == messages(0, 2)
+    assert "secret-token" not in (tmp_path / "dead" / "letters.jsonl").read_text(encoding="utf-8")
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(tmp_path / "dead" / "letters.jsonl").st_mode) == 0o600
+
+
+def test_retries_exhausted_are_dead_lettered(tmp_path):
+    queue = make_queue(tmp_path, Backend(failures=100), max_retries=2)
+    queue.enqueue("Bearer a", messages(0, 1))
+    assert queue.flush(timeout=5)
+    assert queue.stats["retries"] == 2
+    assert queue.stats["dead_lettered"] == 1
+    assert len(read_dead_letters(tmp_path)) == 1
+
+
+def test_replay_delivers_and_clears_dead_letters(tmp_path):
+    failing = make_queue(tmp_path, Backend(failures=100, status=400))
+    failing.enqueue("Bearer old", messages(0, 2))
+    failing.enqueue("Bearer other", messages(5, 1))
+    assert failing.flush(timeout=5)
+    failing.stop()
+
+    backend = Backend()
+    queue = make_queue(tmp_path, backend)
+    assert queue.replay("Bearer new", user=token_id("Bearer old")) == 2
+    assert queue.flush(timeout=5)
+    assert backend.stored == messages(0, 2)
+    assert [r["user"] for r in read_dead_letters(tmp_path)] == [token_id("Bearer other")]
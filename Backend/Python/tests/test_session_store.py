@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta
+from SessionStore import SessionStore
+
+
+def test_release_reports_eviction():
+    store = SessionStore()
+    store.add("Bearer a", object(), now=datetime.now() - timedelta(minutes=5))
+    [entry] = store.claim_expired(timedelta(minutes=1))
+    assert store.release(entry, touch=False, evict=True) is True
+    assert "Bearer a" not in store
+
+
+def test_release_keeps_session_checked_out_again():
+    store = SessionStore()
+    store.add("Bearer a", object(), now=datetime.now() - timedelta(minutes=5))
+    [entry] = store.claim_expired(timedelta(minutes=1))
+    store.checkout("Bearer a", object)  # a request picks the session up during the sweep
+    assert store.release(entry, touch=False, evict=True) is False
+    assert "Bearer a" in store
@@ -0,0 +1,110 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("dotenv")
+from AudioProcessing.AudioDecoder import SAMPLE_RATE
+from AudioProcessing.StreamingSTT import EnergyVAD, PCMDecoder, PolyphaseResampler, StreamingTranscriber, merge_overlap, transcribe_chunked
+
+rng = np.random.default_rng(0)
+
+
+def speech(seconds, steady=False):
+    # noise with a 4 Hz syllable envelope (dips between "words" like real speech), or without dips
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.1 if steady else 0.2 * np.abs(np.sin(2 * np.pi * 2 * t))
+    return (envelope * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def silence(seconds):
+    return (0.001 * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+
+def durations(audio, chunk=0.1):
+    # fake model: the "text" of a segment is its length in seconds
+    step = int(chunk * SAMPLE_RATE)
+    transcriber = StreamingTranscriber(lambda array: f"{len(array) / SAMPLE_RATE:.2f}", partials=False)
+    for i in range(0, len(audio), step):
+        transcriber.feed(audio[i:i + step])
+    transcriber.flush()
+    return [float(text) for text in transcriber.finals]
+
+
+@pytest.mark.parametrize("steady", [False, True])
+def test_audio_starting_with_speech_is_kept(steady):
+    audio = np.concatenate([speech(5, steady), silence(1), speech(3, steady), silence(1)])
+    segments = durations(audio)
+    assert len(segments) == 2
+    assert segments[0] >= 5.0
+    assert 3.0 <= segments[1] < 5.0
+
+
+def test_vad_detects_speech_from_the_first_frame():
+    vad = EnergyVAD()
+    frames = speech(4.8, steady=True).reshape(-1, 480)
+    assert all(vad.is_speech(frame) for frame in frames)
+
+
+def test_leading_silence_is_dropped():
+    segments = durations(np.concatenate([silence(4), speech(2), silence(1)]))
+    assert len(segments) == 1
+    assert segments[0] < 4.0
+
+
+def test_long_speech_is_cut_below_the_window():
+    segments = durations(np.concatenate([speech(60), silence(1)]))
+    assert len(segments) >= 3
+    assert max(segments) <= 25.0
+
+
+def test_partials_while_speaking():
+    transcriber = StreamingTranscriber(lambda array: "partial text")
+    events = transcriber.feed(speech(5))
+    assert any(event["type"] == "partial" for event in events)
+
+
+def test_chunked_mode_returns_joined_text():
+    audio = np.concatenate([speech(2), silence(1), speech(2), silence(1)])
+    chunks = (audio[i:i + SAMPLE_RATE] for i in range(0, len(audio), SAMPLE_RATE))
+    assert transcribe_chunked(lambda array: "word", chunks) == "word word"
+
+
+def test_merge_overlap_drops_repeated_words():
+    assert merge_overlap("see you at the station", "the station tomorrow") == "tomorrow"
+    assert merge_overlap("hello there", "general kenobi") == "general kenobi"
+
+
+def tone(frequency, rate, seconds=1.0):
+    t = np.arange(int(seconds * rate)) / rate
+    return np.sin(2 * np.pi * frequency * t).astype(np.float32)
+
+
+def rms(x):
+    return float(np.sqrt(np.mean(x[500:-500] ** 2)))
+
+
+@pytest.mark.parametrize("rate", [48000, 44100, 22050, 8000])
+def test_resampler_frames_join_without_seams(rate):
+    audio = tone(440, rate, 2)
+    whole = PolyphaseResampler(rate)(audio)
+    resampler, pieces, i = PolyphaseResampler(rate), [], 0
+    for size in rng.integers(1, 3000, 10000):
+        pieces.append(resampler(audio[i:i + size]))
+        i += size
+        if i >= len(audio):
+            break
+    assert len(whole) == 2 * SAMPLE_RATE
+    assert np.allclose(np.concatenate(pieces), whole, atol=1e-6)
+    assert rms(whole) == pytest.approx(np.sqrt(0.5), rel=0.01)
+
+
+@pytest.mark.parametrize("rate", [48000, 44100])
+def test_resampler_filters_above_the_new_nyquist(rate):
+    # 10 kHz cannot be represented at 16 kHz; linear interpolation folds it down to 6 kHz
+    assert rms(PolyphaseResampler(rate)(tone(10000, rate))) < 0.02
+
+
+def test_pcm_decoder_carries_split_samples():
+    pcm = (tone(440, SAMPLE_RATE) * 20000).astype(np.int16).tobytes()
+    decode = PCMDecoder("s16le")
+    out = np.concatenate([decode(pcm[i:i + 777]) for i in range(0, len(pcm), 777)])
+    assert np.allclose(out, np.frombuffer(pcm, dtype=np.int16) / 32768.0)
@@ -0,0 +1,136 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("httpx")
+pytest.importorskip("dateutil")
+from Tools import TokenManager as token_module
+from Tools.TokenManager import TokenManager
+
+
+def valid():
+    return (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+
+
+def new_token(refresh_token):
+    return "fresh-access", datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+def test_refresh_is_saved_with_the_callers_bearer():
+    saved = []
+    manager = TokenManager(fetch=new_token, save=lambda bearer, *args: saved.append(bearer) or 200)
+    manager.ensure("access", "refresh", valid(), "Bearer old-session")
+    manager.ensure("access", "refresh", valid(), "Bearer new-session")
+    manager.refresh("refresh", "Bearer caller")
+    assert saved[-1] == "Bearer caller"
+
+
+def test_rejected_bearer_falls_back_to_the_others():
+    saved = []
+
+    def save(bearer, *args):
+        saved.append(bearer)
+        return 401 if bearer == "Bearer expired-session" else 200
+
+    manager = TokenManager(fetch=new_token, save=save)
+    manager.ensure("access", "refresh", valid(), "Bearer live-session")
+    assert manager.refresh("refresh", "Bearer expired-session") is not None
+    assert saved == ["Bearer expired-session", "Bearer live-session"]
+    assert "Bearer expired-session" not in manager._users["refresh"]["Bearer_TOKENs"]
+
+
+def test_bearer_tokens_are_capped(monkeypatch):
+    monkeypatch.setattr(token_module, "TOKEN_MAX_BEARERS", 3)
+    manager = TokenManager(fetch=new_token, save=lambda *args: 200)
+    for i in range(10):
+        manager.ensure("access", "refresh", valid(), f"Bearer {i}")
+    assert list(manager._users["refresh"]["Bearer_TOKENs"]) == ["Bearer 7", "Bearer 8", "Bearer 9"]
+
+
+class TokenEndpoint:
+    """fetch() stand-in for Google's token endpoint: slow, counts calls."""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.started = threading.Event()
+
+    def __call__(self, refresh_token):
+        with self.lock:
+            self.calls += 1
+        self.started.set()
+        time.sleep(self.delay)
+        return f"fresh-{self.calls}", datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+def expires_in(seconds):
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+def run_concurrently(call, count=10):
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(lambda i: call(i), range(count)))
+
+
+def test_concurrent_ensure_shares_one_refresh():
+    endpoint = TokenEndpoint()
+    manager = TokenManager(fetch=endpoint, save=lambda *args: 200)
+    results = run_concurrently(lambda i: manager.ensure("old", "refresh", expires_in(-60), f"Bearer {i}"))
+    assert endpoint.calls == 1
+    assert {token for token, _ in results} == {"fresh-1"}
+    assert manager.stats["coalesced"] == 9
+
+
+def test_concurrent_refresh_shares_one_refresh():
+    endpoint = TokenEndpoint()
+    manager = TokenManager(fetch=endpoint, save=lambda *args: 200)
+    results = run_concurrently(lambda i: manager.refresh("refresh", f"Bearer {i}"))
+    assert endpoint.calls == 1
+    assert len(set(results)) == 1
+
+
+def test_early_refresh_runs_in_the_background():
+    endpoint = TokenEndpoint(delay=0.2)
+    manager = TokenManager(fetch=endpoint, save=lambda *args: 200)
+    expiry = expires_in(token_module.TOKEN_REFRESH_EARLY / 2)
+    start = time.monotonic()
+    assert manager.ensure("current", "refresh", expiry, "Bearer a")[0] == "current"  # no waiting
+    assert time.monotonic() - start < 0.1
+    assert endpoint.started.wait(1)
+    time.sleep(0.3)
+    assert manager.ensure("current", "refresh", expiry, "Bearer a")[0] == "fresh-1"
+    assert endpoint.calls == 1
+    assert manager.stats["background"] == 1
+
+
+def test_valid_token_is_not_refreshed():
+    endpoint = TokenEndpoint()
+    manager = TokenManager(fetch=endpoint, save=lambda *args: 200)
+    assert manager.ensure("current", "refresh", valid(), "Bearer a")[0] == "current"
+    assert endpoint.calls == 0
+
+
+def test_ensure_and_refresh_return_the_same_types():
+    manager = TokenManager(fetch=new_token, save=lambda *args: 200)
+    ensured = manager.ensure("old", "refresh", expires_in(-60), "Bearer a")
+    refreshed = manager.refresh("refresh", "Bearer a")
+    assert isinstance(ensured[1], str) and isinstance(refreshed[1], str)
+
+
+def test_save_errors_try_the_other_bearers():
+    saved = []
+
+    def save(bearer, *args):
+        saved.append(bearer)
+        if bearer == "Bearer broken":
+            raise ConnectionError("node down for this one")
+        return 200
+
+    manager = TokenManager(fetch=new_token, save=save)
+    manager.ensure("access", "refresh", valid(), "Bearer other")
+    manager.refresh("refresh", "Bearer broken")
+    assert saved == ["Bearer broken", "Bearer other"]